@@ -0,0 +1,54 @@
+# Microbenchmark: regex parse on every roll (old roll_damage) vs cached DiceExpr
+# vs one inverse-CDF draw from a damage_tables.DamageTable
+#   python benchmarks/bench_dice.py
+
+import random
+import re
+import sys
+import timeit
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+
+from damage_tables import damage_table  # noqa: E402
+from dice import parse_dice  # noqa: E402
+
+N = 200_000
+
+def legacy_roll_damage(rng: random.Random, base_expr: str, is_crit: bool) -> int:
+    """
+    The pre-DiceExpr roll_damage: parse the string on every hit.
+    """
+    expr = base_expr.replace(" ", "")
+    m = re.fullmatch(r"(\d+)d(\d+)([+-]\d+)?", expr)
+    if not m:
+        raise ValueError(f"Bad damage expr: {expr}")
+    n = int(m.group(1))
+    d = int(m.group(2))
+    mod = int(m.group(3)) if m.group(3) else 0
+    if is_crit:
+        n *= 2
+    return sum(rng.randint(1, d) for _ in range(n)) + mod
+
+def ns_per_roll(fn) -> float:
+    best = min(timeit.repeat(fn, number=N, repeat=5))
+    return best / N * 1e9
+
+def main():
+    rng = random.Random(1)
+    print(f"{'expr':<10}{'crit':<6}{'legacy ns':>12}{'DiceExpr ns':>14}{'table ns':>11}{'speedup':>10}")
+    for expr in ("1d8+3", "2d8+2", "1d6+0", "2d6+0"):
+        d = parse_dice(expr)
+        for crit in (False, True):
+            old = ns_per_roll(lambda: legacy_roll_damage(rng, expr, crit))
+            if crit:
+                new = ns_per_roll(lambda: d.roll_crit(rng))
+            else:
+                new = ns_per_roll(lambda: d.roll(rng))
+            table = damage_table(expr, "crit" if crit else "normal")
+            tab = ns_per_roll(lambda: table.sample(rng))
+            print(f"{expr:<10}{str(crit):<6}{old:>12.0f}{new:>14.0f}{tab:>11.0f}{old / tab:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
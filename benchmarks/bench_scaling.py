@@ -0,0 +1,56 @@
+# Scaling benchmark: scalar engine cost per turn as the encounter grows from 8 to 200 combatants
+#   python benchmarks/bench_scaling.py
+#
+# Synthetic encounters (no database): 1 PC for every 3 monsters, PCs with Fighter-like stats,
+# monsters Goblins. If the per-turn cost stays flat as the encounter grows, a turn does
+# O(1) bookkeeping; if it grows linearly, something scans every combatant on every turn.
+
+import random
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+
+from combat_engine import Combatant, Encounter, simulate_battle  # noqa: E402
+
+SIZES = (8, 16, 32, 64, 128, 200)
+MIN_SECONDS = 1.0  # per size
+
+def make_encounter(n: int) -> Encounter:
+    n_pcs = max(1, n // 4)
+    combatants = [
+        Combatant(name=f"Fighter_{i + 1:03d}", side="party", template_type="pc", pc_id=None, monster_key=None,
+                  ac=18, hp_start=28, init_mod=1, attack_bonus=5, damage_dice="1d8+3", crits_on="19-20")
+        for i in range(n_pcs)
+    ] + [
+        Combatant(name=f"Goblin_{i + 1:03d}", side="monsters", template_type="monster", pc_id=None, monster_key=None,
+                  ac=15, hp_start=7, init_mod=2, attack_bonus=4, damage_dice="1d6+2")
+        for i in range(n - n_pcs)
+    ]
+    return Encounter(combatants=tuple(combatants), round_cap=50)
+
+def measure(encounter: Encounter) -> tuple[int, int, float]:
+    """
+    Run battles for at least MIN_SECONDS. Returns (battles, turns, seconds).
+    """
+    rng = random.Random(1)
+    battles = turns = 0
+    t0 = time.perf_counter()
+    while True:
+        result = simulate_battle(encounter, rng)
+        battles += 1
+        turns += sum(st.attacks for st in result.participants)
+        elapsed = time.perf_counter() - t0
+        if elapsed >= MIN_SECONDS:
+            return battles, turns, elapsed
+
+def main():
+    print(f"{'combatants':>10}{'battles/s':>12}{'turns/battle':>14}{'ns/turn':>10}")
+    for n in SIZES:
+        battles, turns, elapsed = measure(make_encounter(n))
+        print(f"{n:>10}{battles / elapsed:>12,.0f}{turns / battles:>14.1f}{elapsed / turns * 1e9:>10,.0f}")
+
+if __name__ == "__main__":
+    main()
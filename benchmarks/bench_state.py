@@ -0,0 +1,105 @@
+# Per-run combatant state: legacy dict layout vs __slots__ CombatantState (new / reset) vs array columns
+#   python benchmarks/bench_state.py
+#
+# 1) setup cost and bytes allocated per run (8 combatants)
+# 2) read + write of one hot field (hp) in a loop
+# 3) whole battles with fresh vs reused CombatantState buffers
+
+import random
+import sys
+import timeit
+import tracemalloc
+from array import array
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+
+from bench_scaling import make_encounter  # noqa: E402
+from combat_engine import CombatantState, new_states, simulate_battle  # noqa: E402
+
+N = 100_000
+BATTLES = 20_000
+
+COUNTERS = ("init_roll_d20", "init_total", "init_order", "damage_dealt", "damage_taken", "attacks", "hits",
+            "crits", "opening_burst_triggered", "hunters_mark_cast", "hunters_mark_bonus_damage")
+
+def legacy_participants(combatants) -> list[dict]:
+    """
+    The pre-CombatantState layout: one dict per participant with static stats copied in.
+    """
+    return [{
+        "name": c.name, "side": c.side, "template_type": c.template_type, "pc_id": c.pc_id,
+        "monster_key": c.monster_key, "ac": c.ac, "hp_start": c.hp_start, "hp": c.hp_start,
+        "init_mod": c.init_mod, "attack_bonus": c.attack_bonus, "damage_dice": c.damage_dice,
+        "crits_on": c.crits_on, "features": c.features, "alive": 1,
+        **{k: 0 for k in COUNTERS},
+    } for c in combatants]
+
+class ArrayState:
+    """
+    Struct-of-arrays alternative: one array('l') per counter, reset by slice copy.
+    """
+
+    def __init__(self, combatants):
+        self.hp_start = array("l", [c.hp_start for c in combatants])
+        self.zeros = array("l", [0] * len(combatants))
+        self.hp = array("l", self.hp_start)
+        self.counters = {k: array("l", self.zeros) for k in COUNTERS}
+
+    def reset(self):
+        self.hp[:] = self.hp_start
+        for col in self.counters.values():
+            col[:] = self.zeros
+
+def us_per_call(fn, number: int = N) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+def bytes_allocated(fn) -> int:
+    tracemalloc.start()
+    keep = fn()  # noqa: F841  (keep it alive while measuring)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+def main():
+    encounter = make_encounter(8)
+    cs = encounter.combatants
+    states = new_states(encounter)
+    arrays = ArrayState(cs)
+
+    def reset_states():
+        for st in states:
+            st.reset()
+
+    print("1) per-run setup (8 combatants)")
+    print(f"{'layout':<28}{'us/run':>10}{'bytes':>10}")
+    for label, fn, alloc in (
+        ("dict per participant", lambda: legacy_participants(cs), lambda: legacy_participants(cs)),
+        ("CombatantState()", lambda: [CombatantState(c) for c in cs], lambda: [CombatantState(c) for c in cs]),
+        ("CombatantState.reset()", reset_states, lambda: reset_states()),
+        ("array columns, reset()", arrays.reset, lambda: arrays.reset()),
+    ):
+        print(f"{label:<28}{us_per_call(fn):>10.2f}{bytes_allocated(alloc):>10}")
+
+    print("\n2) hot field access: hp -= 1 on one combatant")
+    d = legacy_participants(cs)[3]
+    st = states[3]
+    hp = arrays.hp
+    for label, stmt, env in (
+        ("dict['hp']", "d['hp'] -= 1", {"d": d}),
+        ("slots .hp", "st.hp -= 1", {"st": st}),
+        ("array hp[i]", "hp[3] -= 1", {"hp": hp}),
+    ):
+        ns = min(timeit.repeat(stmt, globals=env, number=2_000_000, repeat=5)) / 2_000_000 * 1e9
+        print(f"{label:<28}{ns:>10.1f} ns")
+
+    print("\n3) whole battles")
+    rng = random.Random(1)
+    fresh = us_per_call(lambda: simulate_battle(encounter, rng), BATTLES)
+    reused = us_per_call(lambda: simulate_battle(encounter, rng, states), BATTLES)
+    print(f"{'fresh states':<28}{fresh:>10.1f} us/battle")
+    print(f"{'reused states':<28}{reused:>10.1f} us/battle ({(fresh - reused) / fresh:.1%} faster)")
+
+if __name__ == "__main__":
+    main()
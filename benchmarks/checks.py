@@ -0,0 +1,112 @@
+# Consistency checks: fixed-seed runs that must agree, exit status 1 if any does not
+#   python benchmarks/checks.py
+#   python benchmarks/checks.py --only vector
+#
+# Runs on the same fixture database as suite.py (in memory, or a temp file where a script needs
+# a path), so it needs no real database and gives the same answer on every machine. Checks that
+# need numpy are skipped without it.
+#
+#   vector    vector_engine.equivalence_check at a fixed seed: every run and participant mean of
+#             the vector engine within z_limit (Welch) of the scalar engine
+#   columnar  simulate_combat.py --columnar-dir on the scalar engine: the store holds as many
+#             simulation_run / participant_run / first_round_events rows as SQLite
+
+import argparse
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+sys.path.insert(0, str(PROJECT_ROOT / "benchmarks"))
+
+from encounter_loader import load_encounter  # noqa: E402
+import simulate_combat  # noqa: E402
+from simulate_combat import ENCOUNTER_NAME  # noqa: E402
+from suite import fixture_db  # noqa: E402
+
+VECTOR_RUNS = 20_000
+VECTOR_SEED = 1
+Z_LIMIT = 4.0
+COLUMNAR_RUNS = 250     # not a multiple of the batch size, so close() flushes a partial chunk
+COLUMNAR_BATCH_SIZE = 100
+
+class Skip(Exception):
+    pass
+
+# -------------------------
+# Checks (each returns a list of failure messages, empty = passed)
+# -------------------------
+
+def check_vector() -> list[str]:
+    try:
+        from vector_engine import equivalence_check
+    except ImportError as e:
+        raise Skip(e)
+    conn = fixture_db()
+    _, encounter = load_encounter(conn, ENCOUNTER_NAME)
+    conn.close()
+    ok, report = equivalence_check(encounter, runs=VECTOR_RUNS, seed=VECTOR_SEED, z_limit=Z_LIMIT)
+    return [f"{metric}: scalar {s_mean:.4f}, vector {v_mean:.4f}, z={z:+.2f}"
+            for metric, s_mean, v_mean, z in report if abs(z) > Z_LIMIT]
+
+def check_columnar() -> list[str]:
+    try:
+        from columnar_store import load_store
+    except ImportError as e:
+        raise Skip(e)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "checks.sqlite"
+        fixture_db(str(db)).close()
+        simulate_combat.main(["--runs", str(COLUMNAR_RUNS), "--seed", "1", "--batch-size", str(COLUMNAR_BATCH_SIZE),
+                              "--columnar-dir", str(Path(tmp) / "store"), "--db", str(db)])
+        store = load_store(Path(tmp) / "store")
+        conn = sqlite3.connect(db)
+        failures = []
+        for table in ("simulation_run", "participant_run", "first_round_events"):
+            expected = conn.execute(f"SELECT COUNT(*) FROM {table};").fetchone()[0]
+            if store.rows(table) != expected:
+                failures.append(f"{table}: {store.rows(table)} rows in the store, {expected} in SQLite")
+        conn.close()
+    return failures
+
+CHECKS = {
+    "vector": check_vector,
+    "columnar": check_columnar,
+}
+
+# -------------------------
+# Main
+# -------------------------
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fixed-seed consistency checks between engines and result sinks.")
+    parser.add_argument("--only", action="append", choices=tuple(CHECKS), help="run only these checks (repeatable)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    failed = 0
+    for name, check in CHECKS.items():
+        if args.only and name not in args.only:
+            continue
+        try:
+            failures = check()
+        except Skip as e:
+            print(f"[{name}] skipped ({e})")
+            continue
+        if failures:
+            failed += 1
+            print(f"[{name}] FAILED")
+            for line in failures:
+                print(f"  {line}")
+        else:
+            print(f"[{name}] ok")
+    if failed:
+        print(f"{failed} check(s) failed.")
+        raise SystemExit(1)
+    print("✅ All checks passed.")
+
+if __name__ == "__main__":
+    main()
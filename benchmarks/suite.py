@@ -0,0 +1,354 @@
+# Benchmark suite with JSON baselines and a regression check
+#   python benchmarks/suite.py run --save benchmarks/baselines/reference.json
+#   python benchmarks/suite.py run --quick --save /tmp/now.json
+#   python benchmarks/suite.py compare benchmarks/baselines/reference.json /tmp/now.json --threshold 0.15
+#
+# Measures dice rolls, the initiative sort, one battle, the full N-run pipeline (simulate, SQLite
+# sink, run_wide, cubes) on an in-memory database, the ETL loaders (needs pandas, skipped without)
+# and every statement in sql/analysis_queries.sql at 10k / 100k / 1M runs. The query datasets
+# simulate up to TILE_RUNS runs and repeat them (new run_ids) up to the size, since latency
+# depends on row counts, not on the runs being distinct. Sizes above 10k go to a temp file.
+#
+# Every result is a time (lower is better). compare exits with status 1 if any benchmark is
+# slower than the baseline by more than --threshold. Baselines are machine-specific: compare
+# runs from the same machine (the platform is stored with each file).
+
+import argparse
+import csv
+import json
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from datetime import datetime, timezone
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+
+from build_cubes import build_cubes  # noqa: E402
+from combat_engine import ENGINE_VERSION, new_states, roll_initiative, simulate_battle  # noqa: E402
+from damage_tables import damage_table  # noqa: E402
+from dice import parse_dice  # noqa: E402
+from encounter_loader import load_encounter  # noqa: E402
+from parallel_runner import run_parallel  # noqa: E402
+from result_sink import SqliteResultSink  # noqa: E402
+from run_wide import refresh_run_wide  # noqa: E402
+from simulate_combat import ENCOUNTER_NAME, derive_seed, run_battle  # noqa: E402
+from simulation_batch import finish_batch, start_batch  # noqa: E402
+
+SCHEMA_PATH = PROJECT_ROOT / "sql" / "schema.sql"
+QUERIES_PATH = PROJECT_ROOT / "sql" / "analysis_queries.sql"
+PC_TEMPLATES_CSV = PROJECT_ROOT / "data" / "raw" / "pc_templates.csv"
+
+QUERY_SIZES = (10_000, 100_000, 1_000_000)
+TILE_RUNS = 10_000      # simulated runs per query dataset, repeated up to the size
+PIPELINE_RUNS = 5_000
+THRESHOLD = 0.10
+# results below this (per unit) are too small to time reliably: shown, never flagged
+NOISE_FLOOR = {"ms": 1.0}
+
+# SRD stats, as etl_load_monsters_goblin_bugbear.py loads them
+MONSTERS = [
+    ("Bugbear", 16, 27, 2, 4, "2d8+2"),
+    ("Goblin", 15, 7, 2, 4, "1d6+2"),
+]
+PCS = [
+    ("Fighter", "PC_FTR_CHAMPION_L3"),
+    ("Rogue",   "PC_ROG_ASSASSIN_L3"),
+    ("Ranger",  "PC_RGR_GLOOMSTALKER_L3"),
+]
+
+# -------------------------
+# Fixtures
+# -------------------------
+
+def apply_schema(conn: sqlite3.Connection):
+    try:
+        conn.executescript(SCHEMA_PATH.read_text(encoding="utf-8"))
+    except sqlite3.OperationalError as e:
+        # the trailing RENAME COLUMN only applies to databases created before it
+        if "party_downed_before_first_monster_turn" not in str(e):
+            raise
+
+def fixture_db(path: str = ":memory:") -> sqlite3.Connection:
+    """
+    Schema, PC templates, Goblin / Bugbear and the base encounter: what the bootstrap,
+    ETL and seed scripts put in a new database.
+    """
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA foreign_keys = ON;")
+    apply_schema(conn)
+    with open(PC_TEMPLATES_CSV, newline="", encoding="utf-8") as f:
+        rows = [{("class_name" if k == "class" else k): v for k, v in r.items()} for r in csv.DictReader(f)]
+    cols = list(rows[0])
+    conn.executemany(f"INSERT INTO dim_pc_template ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))});",
+                     [tuple(r[c] for c in cols) for r in rows])
+    conn.executemany("""
+        INSERT INTO dim_monster (monster_name, armor_class, hit_points, dex_mod, attack_bonus, damage_dice)
+        VALUES (?, ?, ?, ?, ?, ?);
+    """, MONSTERS)
+    et_id = conn.execute("""
+        INSERT INTO encounter_template (name, description, target_selection_pc, target_selection_mon, round_cap)
+        VALUES (?, 'benchmark fixture', 'bugbear_first', 'lowest_hp', 20);
+    """, (ENCOUNTER_NAME,)).lastrowid
+    keys = dict(conn.execute("SELECT monster_name, monster_key FROM dim_monster;").fetchall())
+    members = [("party", slot, pc_id, None) for slot, pc_id in PCS]
+    members += [("monsters", f"Goblin_{i}", None, keys["Goblin"]) for i in range(1, 5)]
+    members += [("monsters", "Bugbear", None, keys["Bugbear"])]
+    conn.executemany("""
+        INSERT INTO encounter_template_member (encounter_template_id, side, slot_name, pc_id, monster_key, quantity)
+        VALUES (?, ?, ?, ?, ?, 1);
+    """, [(et_id,) + m for m in members])
+    conn.commit()
+    return conn
+
+def run_pipeline(conn: sqlite3.Connection, runs: int, master_seed: int = 1) -> int:
+    """
+    simulate_combat.py's default path (scalar engine, one process): runs -> SQLite -> run_wide -> cubes.
+    """
+    et_id, encounter = load_encounter(conn, ENCOUNTER_NAME)
+    notes = json.dumps({"phase": "combat", "master_seed": master_seed}, separators=(",", ":"))
+    batch_id = start_batch(conn, et_id, "combat", engine="scalar", master_seed=master_seed, params={"runs": runs})
+    sink = SqliteResultSink(conn)
+    seeds = [derive_seed(master_seed, i) for i in range(runs)]
+    for run_values, participant_rows, first_round_row in run_parallel(run_battle, encounter, seeds):
+        sink.add_run((et_id,) + run_values + (notes, batch_id), participant_rows, first_round_row)
+    sink.close()
+    finish_batch(conn, batch_id, runs)
+    refresh_run_wide(conn)
+    build_cubes(conn, batch_id)
+    return batch_id
+
+def tile_runs(conn: sqlite3.Connection, size: int):
+    """
+    Repeat the stored runs (run_id shifted past the last one) until there are `size` of them.
+    """
+    base = conn.execute("SELECT MAX(run_id) FROM simulation_run;").fetchone()[0]
+    for table in ("simulation_run", "participant_run", "first_round_events"):
+        cols = [r[1] for r in conn.execute(f"PRAGMA table_info({table});")]
+        select = ", ".join("run_id + :shift" if c == "run_id" else c for c in cols)
+        sql = f"INSERT INTO {table} ({', '.join(cols)}) SELECT {select} FROM {table} WHERE run_id <= :last;"
+        for copy in range(1, -(-size // base)):
+            last = min(base, size - copy * base)
+            conn.execute(sql, {"shift": copy * base, "last": last})
+    conn.commit()
+    refresh_run_wide(conn)
+
+def analysis_statements() -> list[tuple[str, str]]:
+    """
+    (label, sql) for every statement in analysis_queries.sql, labelled by the "--- X) ..." header above it.
+    """
+    statements, label, buf = [], None, []
+    in_header = False
+    for line in QUERIES_PATH.read_text(encoding="utf-8").splitlines():
+        if line.startswith("---"):
+            title = line.strip("- ").strip()
+            # only the first line of a comment block names the query ("=====" banners reset)
+            if title and not title.startswith("=") and not in_header:
+                label = title.split(")")[0].strip("( ") if ")" in title else title
+            in_header = bool(title) and not title.startswith("=")
+            continue
+        in_header = False
+        buf.append(line)
+        text = "\n".join(buf)
+        if sqlite3.complete_statement(text):
+            if text.strip().strip(";").strip():
+                n = sum(1 for lab, _ in statements if lab.split("#")[0] == label)
+                statements.append((f"{label}#{n + 1}" if n else label, text))
+            buf = []
+    return statements
+
+# -------------------------
+# Benchmarks (each yields (name, value, unit))
+# -------------------------
+
+def best_ns(fn, number: int, repeat: int = 5) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1e9
+
+def bench_dice(quick: bool):
+    rng = random.Random(1)
+    n = 20_000 if quick else 200_000
+    for expr in ("1d8+3", "2d8+2"):
+        d = parse_dice(expr)
+        yield f"dice {expr} roll", best_ns(lambda: d.roll(rng), n), "ns"
+        yield f"dice {expr} roll_crit", best_ns(lambda: d.roll_crit(rng), n), "ns"
+        for variant in ("normal", "crit"):
+            t = damage_table(expr, variant)
+            yield f"damage table {expr} {variant} sample", best_ns(lambda: t.sample(rng), n), "ns"
+
+def bench_engine(quick: bool):
+    conn = fixture_db()
+    _, encounter = load_encounter(conn, ENCOUNTER_NAME)
+    conn.close()
+    states = new_states(encounter)
+    rng = random.Random(1)
+    yield "initiative sort (8 combatants)", best_ns(lambda: roll_initiative(states, rng), 2_000 if quick else 20_000), "ns"
+    yield "battle", best_ns(lambda: simulate_battle(encounter, rng, states), 500 if quick else 5_000) / 1e3, "us"
+
+def bench_pipeline(quick: bool):
+    runs = PIPELINE_RUNS // 5 if quick else PIPELINE_RUNS
+    conn = fixture_db()
+    t = time.perf_counter()
+    run_pipeline(conn, runs)
+    elapsed = time.perf_counter() - t
+    conn.close()
+    yield f"pipeline {runs} runs (in-memory SQLite)", elapsed / runs * 1e6, "us/run"
+
+def bench_etl(quick: bool):
+    try:
+        import etl_load_monsters_goblin_bugbear
+        import etl_load_pc_templates_upsert
+    except ImportError as e:
+        print(f"  skipping ETL benchmarks ({e})")
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "etl.sqlite"
+        conn = sqlite3.connect(db)
+        apply_schema(conn)
+        conn.close()
+        for module in (etl_load_pc_templates_upsert, etl_load_monsters_goblin_bugbear):
+            # the ETL scripts write to their module-level DB_PATH
+            module.DB_PATH = db
+            t = time.perf_counter()
+            module.main()
+            yield f"etl {module.__name__}", (time.perf_counter() - t) * 1e3, "ms"
+
+def size_label(size: int) -> str:
+    return f"{size // 1_000_000}M" if size >= 1_000_000 else f"{size // 1_000}k"
+
+def bench_queries(quick: bool, sizes: tuple[int, ...]):
+    statements = analysis_statements()
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = fixture_db(":memory:" if size <= TILE_RUNS else str(Path(tmp) / "queries.sqlite"))
+            t = time.perf_counter()
+            run_pipeline(conn, min(size, TILE_RUNS))
+            if size > TILE_RUNS:
+                tile_runs(conn, size)
+            print(f"  {size_label(size)} dataset ready in {time.perf_counter() - t:.1f}s")
+            repeat = 3 if size <= 100_000 else 1
+            for label, sql in statements:
+                best = float("inf")
+                for _ in range(repeat):
+                    t = time.perf_counter()
+                    conn.execute(sql).fetchall()
+                    best = min(best, time.perf_counter() - t)
+                yield f"query {label} @{size_label(size)}", best * 1e3, "ms"
+            conn.close()
+
+# -------------------------
+# run / compare
+# -------------------------
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(args) -> dict:
+    sizes = (QUERY_SIZES[0],) if args.quick else tuple(args.sizes or QUERY_SIZES)
+    groups = {
+        "dice": lambda: bench_dice(args.quick),
+        "engine": lambda: bench_engine(args.quick),
+        "pipeline": lambda: bench_pipeline(args.quick),
+        "etl": lambda: bench_etl(args.quick),
+        "queries": lambda: bench_queries(args.quick, sizes),
+    }
+    results = {}
+    for group, bench in groups.items():
+        if args.only and group not in args.only:
+            continue
+        print(f"[{group}]")
+        for name, value, unit in bench():
+            results[name] = {"value": value, "unit": unit}
+            print(f"  {name:<52}{value:>14,.2f} {unit}")
+    return {
+        "meta": {
+            "created_at_utc": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "git_commit": git_commit(),
+            "engine_version": ENGINE_VERSION,
+            "python_version": platform.python_version(),
+            "platform": platform.platform(terse=True),
+            "quick": args.quick,
+            "query_sizes": list(sizes),
+        },
+        "results": results,
+    }
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """
+    Print a comparison table; returns the names of benchmarks slower than baseline * (1 + threshold).
+    """
+    if baseline["meta"].get("platform") != current["meta"].get("platform"):
+        print(f"Note: baseline from {baseline['meta'].get('platform')}, current from {current['meta'].get('platform')}")
+    regressions = []
+    print(f"{'benchmark':<52}{'baseline':>12}{'current':>12}{'change':>9}")
+    for name, base in baseline["results"].items():
+        cur = current["results"].get(name)
+        if cur is None:
+            print(f"{name:<52}{base['value']:>12,.2f}{'missing':>12}")
+            continue
+        change = cur["value"] / base["value"] - 1 if base["value"] else 0.0
+        status = ""
+        if base["value"] < NOISE_FLOOR.get(base["unit"], 0):
+            status = "(below noise floor)" if abs(change) > threshold else ""
+        elif change > threshold:
+            status = "REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            status = "faster"
+        print(f"{name:<52}{base['value']:>12,.2f}{cur['value']:>12,.2f}{change:>+9.1%} {status}")
+    for name in current["results"].keys() - baseline["results"].keys():
+        print(f"{name:<52}{'new':>12}{current['results'][name]['value']:>12,.2f}")
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Simulator benchmark suite with JSON baselines.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="run the benchmarks")
+    p_run.add_argument("--quick", action="store_true", help="fewer iterations, 1k-run pipeline, 10k query dataset only")
+    p_run.add_argument("--only", action="append", choices=("dice", "engine", "pipeline", "etl", "queries"),
+                       help="run only these groups (repeatable)")
+    p_run.add_argument("--sizes", type=int, nargs="+", help=f"query dataset sizes in runs (default {QUERY_SIZES})")
+    p_run.add_argument("--save", type=Path, help="write the results JSON here")
+    p_run.add_argument("--compare", type=Path, metavar="BASELINE", help="compare with this baseline afterwards")
+    p_run.add_argument("--threshold", type=float, default=THRESHOLD)
+
+    p_cmp = sub.add_parser("compare", help="compare two result files")
+    p_cmp.add_argument("baseline", type=Path)
+    p_cmp.add_argument("current", type=Path)
+    p_cmp.add_argument("--threshold", type=float, default=THRESHOLD,
+                       help=f"allowed slowdown as a fraction (default {THRESHOLD})")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "run":
+        current = run(args)
+        if args.save is not None:
+            args.save.parent.mkdir(parents=True, exist_ok=True)
+            args.save.write_text(json.dumps(current, indent=2) + "\n", encoding="utf-8")
+            print(f"Results written to {args.save}")
+        if args.compare is None:
+            return
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+    else:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        current = json.loads(args.current.read_text(encoding="utf-8"))
+
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than baseline by more than {args.threshold:.0%}.")
+        raise SystemExit(1)
+    print(f"✅ No regressions beyond {args.threshold:.0%}.")
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,29 @@
 
+--- Runs are filtered through simulation_batch (indexed simulation_run.batch_id).
+--- The headline queries cover combat batches of the base encounter only: sweep cells
+--- (phase 'sweep'), targeting variants and horde templates are other encounter templates.
+--- To look at one of those, change the name; for a single experiment add
+--- "AND sb.batch_id = <id>" (see Z below).
+
+--- Z) Batches / experiments ---
+SELECT batch_id, phase, engine, engine_version, master_seed, runs, started_at_utc, finished_at_utc, params_json
+FROM simulation_batch
+ORDER BY batch_id DESC;
+
 --- A) Outcome distribution ---
 
 SELECT winner, COUNT(*) AS n
-FROM simulation_run
-WHERE notes_flags_json LIKE '%"phase":"combat"%'
+FROM simulation_run sr
+JOIN simulation_batch sb ON sb.batch_id = sr.batch_id
+WHERE sb.phase = 'combat'
+  AND sb.encounter_template_id = (SELECT encounter_template_id FROM encounter_template WHERE name = 'L3 Trio vs 4 Goblins + 1 Bugbear')
 GROUP BY winner;
 --- A-1) Win rate ---
 SELECT AVG(party_victory) AS party_win_rate
-FROM simulation_run
-WHERE notes_flags_json LIKE '%"phase":"combat"%';
+FROM simulation_run sr
+JOIN simulation_batch sb ON sb.batch_id = sr.batch_id
+WHERE sb.phase = 'combat'
+  AND sb.encounter_template_id = (SELECT encounter_template_id FROM encounter_template WHERE name = 'L3 Trio vs 4 Goblins + 1 Bugbear');
 
 --- A-2) Party initiative sum vs win rate ---
 WITH party_init AS (
@@ -16,8 +31,10 @@ WITH party_init AS (
     sr.run_id,
     SUM(pr.init_total) AS party_init
   FROM simulation_run sr
+  JOIN simulation_batch sb ON sb.batch_id = sr.batch_id
   JOIN participant_run pr ON pr.run_id = sr.run_id
-  WHERE sr.notes_flags_json LIKE '%"phase":"combat"%'
+  WHERE sb.phase = 'combat'
+    AND sb.encounter_template_id = (SELECT encounter_template_id FROM encounter_template WHERE name = 'L3 Trio vs 4 Goblins + 1 Bugbear')
     AND pr.side = 'party'
   GROUP BY sr.run_id
 )
@@ -37,8 +54,10 @@ WITH party_init AS (
     sr.run_id,
     SUM(pr.init_total) AS party_init
   FROM simulation_run sr
+  JOIN simulation_batch sb ON sb.batch_id = sr.batch_id
   JOIN participant_run pr ON pr.run_id = sr.run_id
-  WHERE sr.notes_flags_json LIKE '%"phase":"combat"%'
+  WHERE sb.phase = 'combat'
+    AND sb.encounter_template_id = (SELECT encounter_template_id FROM encounter_template WHERE name = 'L3 Trio vs 4 Goblins + 1 Bugbear')
     AND pr.side = 'party'
   GROUP BY sr.run_id
 )
@@ -62,7 +81,9 @@ WITH rb AS (
   FROM participant_run r
   JOIN participant_run b ON r.run_id = b.run_id
   JOIN simulation_run sr ON sr.run_id = r.run_id
-  WHERE sr.notes_flags_json LIKE '%"phase":"combat"%'
+  JOIN simulation_batch sb ON sb.batch_id = sr.batch_id
+  WHERE sb.phase = 'combat'
+    AND sb.encounter_template_id = (SELECT encounter_template_id FROM encounter_template WHERE name = 'L3 Trio vs 4 Goblins + 1 Bugbear')
     AND r.name = 'Rogue'
     AND b.name = 'Bugbear'
 )
@@ -88,7 +109,9 @@ SELECT
   COUNT(*) AS runs
 FROM first_round_events fre
 JOIN simulation_run sr ON sr.run_id = fre.run_id
-WHERE sr.notes_flags_json LIKE '%"phase":"combat"%'
+JOIN simulation_batch sb ON sb.batch_id = sr.batch_id
+WHERE sb.phase = 'combat'
+  AND sb.encounter_template_id = (SELECT encounter_template_id FROM encounter_template WHERE name = 'L3 Trio vs 4 Goblins + 1 Bugbear')
 GROUP BY dmg_bucket
 ORDER BY runs DESC;
 
@@ -102,7 +125,9 @@ SELECT
   sr.rounds_taken
 FROM first_round_events fre
 JOIN simulation_run sr ON sr.run_id = fre.run_id
-WHERE sr.notes_flags_json LIKE '%"phase":"combat"%';
+JOIN simulation_batch sb ON sb.batch_id = sr.batch_id
+WHERE sb.phase = 'combat'
+  AND sb.encounter_template_id = (SELECT encounter_template_id FROM encounter_template WHERE name = 'L3 Trio vs 4 Goblins + 1 Bugbear');
 
 --- D) Did opening burst correlate with winning? ---
 SELECT
@@ -112,7 +137,9 @@ SELECT
   COUNT(*) AS runsrate
 FROM participant_run pr
 JOIN simulation_run sr ON sr.run_id = pr.run_id
-WHERE sr.notes_flags_json LIKE '%"phase":"combat"%'
+JOIN simulation_batch sb ON sb.batch_id = sr.batch_id
+WHERE sb.phase = 'combat'
+  AND sb.encounter_template_id = (SELECT encounter_template_id FROM encounter_template WHERE name = 'L3 Trio vs 4 Goblins + 1 Bugbear')
   AND pr.name = 'Rogue'
 GROUP BY opening_burst_triggered;
 
@@ -127,7 +154,9 @@ SELECT
   COUNT(*) AS runs
 FROM participant_run pr
 JOIN simulation_run sr ON sr.run_id = pr.run_id
-WHERE sr.notes_flags_json LIKE '%"phase":"combat"%'
+JOIN simulation_batch sb ON sb.batch_id = sr.batch_id
+WHERE sb.phase = 'combat'
+  AND sb.encounter_template_id = (SELECT encounter_template_id FROM encounter_template WHERE name = 'L3 Trio vs 4 Goblins + 1 Bugbear')
 GROUP BY pr.side, pr.name
 ORDER BY avg_damage_dealt DESC;
 
@@ -151,7 +180,9 @@ SELECT
   AVG(sr.rounds_taken) AS avg_rounds,
   COUNT(*) AS runs
 FROM simulation_run sr
-WHERE sr.notes_flags_json LIKE '%"phase":"combat"%';
+JOIN simulation_batch sb ON sb.batch_id = sr.batch_id
+WHERE sb.phase = 'combat'
+  AND sb.encounter_template_id = (SELECT encounter_template_id FROM encounter_template WHERE name = 'L3 Trio vs 4 Goblins + 1 Bugbear');
 
 --- G) Average damage dealt by participant, split by win/loss ---
 SELECT
@@ -163,7 +194,9 @@ SELECT
   COUNT(*) AS runs
 FROM participant_run pr
 JOIN simulation_run sr ON sr.run_id = pr.run_id
-WHERE sr.notes_flags_json LIKE '%"phase":"combat"%'
+JOIN simulation_batch sb ON sb.batch_id = sr.batch_id
+WHERE sb.phase = 'combat'
+  AND sb.encounter_template_id = (SELECT encounter_template_id FROM encounter_template WHERE name = 'L3 Trio vs 4 Goblins + 1 Bugbear')
 GROUP BY sr.party_victory, pr.side, pr.name
 ORDER BY sr.party_victory DESC, pr.side, avg_damage_dealt DESC;
 
@@ -175,7 +208,9 @@ SELECT
   AVG(CASE WHEN damage_dealt_total > 0 THEN 1.0 * hunters_mark_bonus_damage / damage_dealt_total ELSE 0 END) AS avg_hm_share
 FROM participant_run pr
 JOIN simulation_run sr ON sr.run_id = pr.run_id
-WHERE sr.notes_flags_json LIKE '%"phase":"combat"%'
+JOIN simulation_batch sb ON sb.batch_id = sr.batch_id
+WHERE sb.phase = 'combat'
+  AND sb.encounter_template_id = (SELECT encounter_template_id FROM encounter_template WHERE name = 'L3 Trio vs 4 Goblins + 1 Bugbear')
   AND pr.name = 'Ranger';
 
 --- I) Rogue: average damage when burst triggers vs not ---
@@ -187,7 +222,9 @@ SELECT
   COUNT(*) AS runs
 FROM participant_run pr
 JOIN simulation_run sr ON sr.run_id = pr.run_id
-WHERE sr.notes_flags_json LIKE '%"phase":"combat"%'
+JOIN simulation_batch sb ON sb.batch_id = sr.batch_id
+WHERE sb.phase = 'combat'
+  AND sb.encounter_template_id = (SELECT encounter_template_id FROM encounter_template WHERE name = 'L3 Trio vs 4 Goblins + 1 Bugbear')
   AND pr.name = 'Rogue'
 GROUP BY opening_burst_triggered;
 
@@ -204,7 +241,9 @@ SELECT
   COUNT(*) AS rows
 FROM participant_run pr
 JOIN simulation_run sr ON sr.run_id = pr.run_id
-WHERE sr.notes_flags_json LIKE '%"phase":"combat"%'
+JOIN simulation_batch sb ON sb.batch_id = sr.batch_id
+WHERE sb.phase = 'combat'
+  AND sb.encounter_template_id = (SELECT encounter_template_id FROM encounter_template WHERE name = 'L3 Trio vs 4 Goblins + 1 Bugbear')
   AND pr.side = 'monsters'
 GROUP BY monster_type
 ORDER BY avg_damage_dealt DESC;
@@ -246,12 +285,195 @@ SELECT
   pr.hunters_mark_bonus_damage
 FROM participant_run pr
 JOIN simulation_run sr ON sr.run_id = pr.run_id
-WHERE sr.notes_flags_json LIKE '%"phase":"combat"%';
+JOIN simulation_batch sb ON sb.batch_id = sr.batch_id
+WHERE sb.phase = 'combat'
+  AND sb.encounter_template_id = (SELECT encounter_template_id FROM encounter_template WHERE name = 'L3 Trio vs 4 Goblins + 1 Bugbear');
 
 
 --- Last check ---
 SELECT MIN(rounds_taken), MAX(rounds_taken)
-FROM simulation_run
-WHERE notes_flags_json LIKE '%"phase":"combat"%';
+FROM simulation_run sr
+JOIN simulation_batch sb ON sb.batch_id = sr.batch_id
+WHERE sb.phase = 'combat'
+  AND sb.encounter_template_id = (SELECT encounter_template_id FROM encounter_template WHERE name = 'L3 Trio vs 4 Goblins + 1 Bugbear');
+
+
+
+
+--- =========================================================
+--- Aggregate mode (simulate_combat.py --aggregate): same answers from agg_* tables,
+--- no per-run rows needed. These use the latest study (MAX(study_id)).
+--- =========================================================
+
+--- AGG A) Outcome distribution + win rate ---
+SELECT winner, runs, 1.0 * runs / SUM(runs) OVER () AS share
+FROM agg_outcome
+WHERE study_id = (SELECT MAX(study_id) FROM agg_study);
+
+--- AGG A-2) Party initiative sum vs win rate ---
+SELECT party_init, 1.0 * wins / runs AS win_rate, runs
+FROM agg_party_init
+WHERE study_id = (SELECT MAX(study_id) FROM agg_study)
+ORDER BY party_init;
+
+--- AGG B) Does “Rogue beats Bugbear” affect win rate? ---
+SELECT rogue_beats_bugbear, 1.0 * wins / runs AS win_rate, runs
+FROM agg_rogue_bugbear
+WHERE study_id = (SELECT MAX(study_id) FROM agg_study);
+
+--- AGG C) Alpha-strike buckets vs win rate ---
+SELECT dmg_bucket, 1.0 * wins / runs AS win_rate, runs
+FROM agg_alpha_strike
+WHERE study_id = (SELECT MAX(study_id) FROM agg_study)
+ORDER BY runs DESC;
+
+--- AGG D / I) Opening burst ---
+SELECT opening_burst_triggered, 1.0 * wins / runs AS win_rate, avg_rounds, avg_rogue_damage, runs
+FROM agg_opening_burst
+WHERE study_id = (SELECT MAX(study_id) FROM agg_study);
+
+--- AGG E) Average damage per participant (overall, recombined from the victory split) ---
+SELECT
+  side,
+  name,
+  SUM(avg_damage_dealt * runs) / SUM(runs) AS avg_damage_dealt,
+  SUM(avg_damage_taken * runs) / SUM(runs) AS avg_damage_taken,
+  1.0 * SUM(hits_sum) / SUM(runs) AS avg_hits,
+  1.0 * SUM(crits_sum) / SUM(runs) AS avg_crits,
+  SUM(runs) AS runs
+FROM agg_participant
+WHERE study_id = (SELECT MAX(study_id) FROM agg_study)
+GROUP BY side, name
+ORDER BY avg_damage_dealt DESC;
+
+--- AGG F) Per-run averages (with variance) ---
+SELECT metric, n, mean, variance
+FROM agg_run_metric
+WHERE study_id = (SELECT MAX(study_id) FROM agg_study);
 
+--- AGG G) Average damage by participant, split by win/loss ---
+SELECT party_victory, side, name, avg_damage_dealt, avg_damage_taken, runs
+FROM agg_participant
+WHERE study_id = (SELECT MAX(study_id) FROM agg_study)
+ORDER BY party_victory DESC, side, avg_damage_dealt DESC;
 
+--- AGG K) Survival rate for everyone ---
+SELECT side, name, SUM(runs) AS runs, ROUND(1.0 * SUM(alive_runs) / SUM(runs), 4) AS survival_rate
+FROM agg_participant
+WHERE study_id = (SELECT MAX(study_id) FROM agg_study)
+GROUP BY side, name
+ORDER BY side, survival_rate DESC, name;
+
+--- =========================================================
+--- Exact initiative (python src/initiative_exact.py): computed, not sampled.
+--- =========================================================
+
+--- X1) P(Rogue acts before Bugbear), random tie-break included ---
+SELECT name_a, name_b, p_a_before_b
+FROM init_exact_pairwise
+WHERE name_a = 'Rogue' AND name_b = 'Bugbear';
+
+--- X2) Initiative position distribution per participant ---
+SELECT name, init_order, ROUND(probability, 4) AS probability
+FROM init_exact_position
+ORDER BY name, init_order;
+
+--- X3) Post-stratified win rate: sampled win rate per party initiative sum,
+---     weighted by the exact probability of that sum instead of its sampled share ---
+SELECT
+  SUM(x.probability * a.wins / (1.0 * a.runs)) / SUM(x.probability) AS win_rate_stratified,
+  SUM(x.probability) AS covered_probability
+FROM init_exact_side_sum x
+JOIN agg_study s ON s.encounter_template_id = x.encounter_template_id
+JOIN agg_party_init a ON a.study_id = s.study_id AND a.party_init = x.init_sum
+WHERE x.side = 'party'
+  AND s.study_id = (SELECT MAX(study_id) FROM agg_study);
+
+--- =========================================================
+--- Wide-table versions (run_wide, one row per run, refreshed by python src/run_wide.py).
+--- Same answers as A-2, B, D, H, I without joining participant_run, each one is
+--- served from a covering index on run_wide.
+--- =========================================================
+
+--- W A-2) Party initiative sum vs win rate ---
+SELECT rw.party_init_sum AS party_init, AVG(rw.party_victory) AS win_rate, COUNT(*) AS runs
+FROM simulation_batch sb
+JOIN run_wide rw ON rw.batch_id = sb.batch_id
+WHERE sb.phase = 'combat'
+  AND sb.encounter_template_id = (SELECT encounter_template_id FROM encounter_template WHERE name = 'L3 Trio vs 4 Goblins + 1 Bugbear')
+GROUP BY rw.party_init_sum
+ORDER BY rw.party_init_sum;
+
+--- W B) Does “Rogue beats Bugbear” affect win rate? ---
+SELECT rw.rogue_beats_bugbear, AVG(rw.party_victory) AS win_rate, COUNT(*) AS runs
+FROM simulation_batch sb
+JOIN run_wide rw ON rw.batch_id = sb.batch_id
+WHERE sb.phase = 'combat'
+  AND sb.encounter_template_id = (SELECT encounter_template_id FROM encounter_template WHERE name = 'L3 Trio vs 4 Goblins + 1 Bugbear')
+GROUP BY rw.rogue_beats_bugbear;
+
+--- W D / I) Rogue opening burst vs win rate, rounds and Rogue damage ---
+SELECT
+  rw.rogue_opening_burst AS opening_burst_triggered,
+  AVG(rw.party_victory) AS win_rate,
+  AVG(rw.rounds_taken) AS avg_rounds,
+  AVG(rw.rogue_damage) AS avg_rogue_damage,
+  COUNT(*) AS runs
+FROM simulation_batch sb
+JOIN run_wide rw ON rw.batch_id = sb.batch_id
+WHERE sb.phase = 'combat'
+  AND sb.encounter_template_id = (SELECT encounter_template_id FROM encounter_template WHERE name = 'L3 Trio vs 4 Goblins + 1 Bugbear')
+GROUP BY rw.rogue_opening_burst;
+
+--- W H) Ranger: Hunter's Mark contribution ---
+SELECT
+  AVG(rw.ranger_hm_cast) AS hm_cast_rate,
+  AVG(rw.ranger_hm_bonus) AS avg_hm_bonus_damage,
+  AVG(rw.ranger_damage) AS avg_total_damage
+FROM simulation_batch sb
+JOIN run_wide rw ON rw.batch_id = sb.batch_id
+WHERE sb.phase = 'combat'
+  AND sb.encounter_template_id = (SELECT encounter_template_id FROM encounter_template WHERE name = 'L3 Trio vs 4 Goblins + 1 Bugbear');
+
+--- W Fighter's initiative vs total damage ---
+SELECT rw.fighter_init, AVG(rw.fighter_damage) AS avg_fighter_damage, COUNT(*) AS runs
+FROM simulation_batch sb
+JOIN run_wide rw ON rw.batch_id = sb.batch_id
+WHERE sb.phase = 'combat'
+  AND sb.encounter_template_id = (SELECT encounter_template_id FROM encounter_template WHERE name = 'L3 Trio vs 4 Goblins + 1 Bugbear')
+GROUP BY rw.fighter_init
+ORDER BY rw.fighter_init;
+
+--- P) Simulator performance over time (simulate_combat.py --profile) ---
+SELECT
+  pp.batch_id, pp.recorded_at_utc, pp.engine_version, pp.workers, pp.runs,
+  ROUND(pp.runs_per_s) AS runs_per_s, pp.p50_us, pp.p99_us,
+  json_extract(pp.phases_json, '$.combat_loop') AS combat_loop_s,
+  json_extract(pp.phases_json, '$.sqlite_insert') AS sqlite_insert_s,
+  pp.python_version
+FROM perf_profile pp
+ORDER BY pp.batch_id DESC;
+
+--- S) Sweep cells (python src/sweep.py): win rate and length per cell ---
+SELECT
+  sc.sweep_name, sc.params_json, sc.status, sc.runs_done,
+  AVG(sr.party_victory) AS win_rate,
+  AVG(sr.rounds_taken) AS avg_rounds
+FROM sweep_cell sc
+JOIN simulation_run sr ON sr.batch_id = sc.batch_id
+GROUP BY sc.cell_hash
+ORDER BY sc.sweep_name, sc.params_json;
+
+--- CF) Counterfactual initiative (python src/counterfactual.py): win-rate change per replayed order ---
+SELECT
+  co.batch_id, co.order_key, COUNT(*) AS runs,
+  AVG(co.party_victory - co.delta_victory) AS factual_win_rate,
+  AVG(co.delta_victory) AS avg_win_change,
+  SUM(co.delta_victory = 1) AS flipped_to_win,
+  SUM(co.delta_victory = -1) AS flipped_to_loss,
+  AVG(co.delta_rounds) AS avg_rounds_change
+FROM simulation_batch sb
+JOIN counterfactual_order co ON co.batch_id = sb.batch_id
+WHERE sb.phase = 'counterfactual' AND co.order_key <> 'factual'
+GROUP BY co.batch_id, co.order_key
+ORDER BY co.batch_id, avg_win_change DESC;
@@ -104,6 +104,22 @@ CREATE TABLE IF NOT EXISTS encounter_template_member (
 -- Simulation facts
 -- -------------------------
 
+-- One row per simulator invocation (experiment): what was run and how.
+-- Filter runs by batch / phase here instead of LIKE-scanning notes_flags_json.
+CREATE TABLE IF NOT EXISTS simulation_batch (
+  batch_id               INTEGER PRIMARY KEY,
+  encounter_template_id  INTEGER NOT NULL,
+  phase                  TEXT NOT NULL,        -- 'combat' / 'initiative_only' / 'counterfactual' / 'sweep'
+  engine                 TEXT,                 -- 'scalar' / 'vector'
+  engine_version         TEXT,                 -- combat_engine.ENGINE_VERSION
+  master_seed            INTEGER,
+  params_json            TEXT,                 -- CLI parameters, stopping rule, ...
+  runs                   INTEGER,              -- filled in when the batch finishes
+  started_at_utc         TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
+  finished_at_utc        TEXT,
+  FOREIGN KEY (encounter_template_id) REFERENCES encounter_template(encounter_template_id)
+);
+
 CREATE TABLE IF NOT EXISTS simulation_run (
   run_id                 INTEGER PRIMARY KEY,
   encounter_template_id   INTEGER NOT NULL,
@@ -117,7 +133,9 @@ CREATE TABLE IF NOT EXISTS simulation_run (
   first_monster_turn_round INTEGER DEFAULT 1,   -- sanity check field
   notes_flags_json        TEXT,                 -- JSON text: {"opening_burst_used":true,"hunters_mark_active":true}
   created_at_utc          TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
-  FOREIGN KEY (encounter_template_id) REFERENCES encounter_template(encounter_template_id)
+  batch_id                INTEGER,              -- NULL only for rows older than simulation_batch
+  FOREIGN KEY (encounter_template_id) REFERENCES encounter_template(encounter_template_id),
+  FOREIGN KEY (batch_id) REFERENCES simulation_batch(batch_id)
 );
 
 CREATE TABLE IF NOT EXISTS participant_run (
@@ -160,10 +178,330 @@ CREATE TABLE IF NOT EXISTS first_round_events (
   FOREIGN KEY (run_id) REFERENCES simulation_run(run_id) ON DELETE CASCADE
 );
 
+-- -------------------------
+-- Materialized per-run wide table (src/run_wide.py, refreshed after each batch)
+-- -------------------------
+
+-- One row per run, participant values pivoted by slot name
+CREATE TABLE IF NOT EXISTS run_wide (
+  run_id                 INTEGER PRIMARY KEY,
+  batch_id               INTEGER,
+  encounter_template_id  INTEGER NOT NULL,
+  party_victory          INTEGER NOT NULL,
+  winner                 TEXT NOT NULL,
+  rounds_taken           INTEGER NOT NULL,
+  total_damage_party     INTEGER NOT NULL,
+  total_damage_monsters  INTEGER NOT NULL,
+  bugbear_killed_round   INTEGER,
+  -- initiative
+  party_init_sum         INTEGER,
+  monsters_init_sum      INTEGER,
+  fighter_init           INTEGER,
+  rogue_init             INTEGER,
+  ranger_init            INTEGER,
+  bugbear_init           INTEGER,
+  rogue_before_bugbear   INTEGER,              -- actual turn order
+  rogue_beats_bugbear    INTEGER,              -- query B definition (no random tie-break)
+  -- damage dealt
+  fighter_damage         INTEGER,
+  rogue_damage           INTEGER,
+  ranger_damage          INTEGER,
+  bugbear_damage         INTEGER,
+  goblins_damage         INTEGER,
+  -- survival
+  fighter_alive          INTEGER,
+  rogue_alive            INTEGER,
+  ranger_alive           INTEGER,
+  party_alive            INTEGER,
+  monsters_alive         INTEGER,
+  -- features
+  rogue_opening_burst    INTEGER,
+  ranger_hm_cast         INTEGER,
+  ranger_hm_bonus        INTEGER,
+  -- first round
+  damage_party_before_first_monster_turn    INTEGER,
+  monsters_downed_before_first_monster_turn INTEGER,
+  party_downed_before_first_player_turn     INTEGER,
+  FOREIGN KEY (run_id) REFERENCES simulation_run(run_id) ON DELETE CASCADE
+);
+
+-- -------------------------
+-- Dashboard cubes (src/build_cubes.py, built per batch; averages = sum / runs)
+-- -------------------------
+
+-- win rate / damage / survival by a participant's initiative total
+CREATE TABLE IF NOT EXISTS cube_participant_init (
+  batch_id          INTEGER NOT NULL,
+  side              TEXT NOT NULL,
+  name              TEXT NOT NULL,
+  init_total        INTEGER NOT NULL,
+  party_victory     INTEGER NOT NULL CHECK (party_victory IN (0,1)),
+  runs              INTEGER NOT NULL,
+  damage_dealt_sum  INTEGER NOT NULL,
+  damage_taken_sum  INTEGER NOT NULL,
+  alive_sum         INTEGER NOT NULL,
+  hits_sum          INTEGER NOT NULL,
+  crits_sum         INTEGER NOT NULL,
+  attacks_sum       INTEGER NOT NULL,
+  PRIMARY KEY (batch_id, side, name, init_total, party_victory),
+  FOREIGN KEY (batch_id) REFERENCES simulation_batch(batch_id) ON DELETE CASCADE
+);
+
+-- win rate and distribution by party initiative sum
+CREATE TABLE IF NOT EXISTS cube_party_init (
+  batch_id             INTEGER NOT NULL,
+  party_init_sum       INTEGER NOT NULL,
+  runs                 INTEGER NOT NULL,
+  wins                 INTEGER NOT NULL,
+  rounds_sum           INTEGER NOT NULL,
+  damage_party_sum     INTEGER NOT NULL,
+  damage_monsters_sum  INTEGER NOT NULL,
+  PRIMARY KEY (batch_id, party_init_sum),
+  FOREIGN KEY (batch_id) REFERENCES simulation_batch(batch_id) ON DELETE CASCADE
+);
+
+-- alpha strike: damage before the first monster turn (query C buckets)
+CREATE TABLE IF NOT EXISTS cube_alpha_strike (
+  batch_id    INTEGER NOT NULL,
+  dmg_bucket  TEXT NOT NULL,
+  runs        INTEGER NOT NULL,
+  wins        INTEGER NOT NULL,
+  damage_sum  INTEGER NOT NULL,
+  PRIMARY KEY (batch_id, dmg_bucket),
+  FOREIGN KEY (batch_id) REFERENCES simulation_batch(batch_id) ON DELETE CASCADE
+);
+
+-- damage dealt distribution per participant (bucket = lower bound, width 5)
+CREATE TABLE IF NOT EXISTS cube_participant_damage (
+  batch_id       INTEGER NOT NULL,
+  side           TEXT NOT NULL,
+  name           TEXT NOT NULL,
+  party_victory  INTEGER NOT NULL CHECK (party_victory IN (0,1)),
+  damage_bucket  INTEGER NOT NULL,
+  runs           INTEGER NOT NULL,
+  PRIMARY KEY (batch_id, side, name, party_victory, damage_bucket),
+  FOREIGN KEY (batch_id) REFERENCES simulation_batch(batch_id) ON DELETE CASCADE
+);
+
+-- -------------------------
+-- Streaming aggregates (simulate_combat.py --aggregate, no per-run rows needed)
+-- -------------------------
+
+-- One row per aggregated study
+CREATE TABLE IF NOT EXISTS agg_study (
+  study_id               INTEGER PRIMARY KEY,
+  encounter_template_id  INTEGER NOT NULL,
+  runs                   INTEGER NOT NULL,
+  notes_flags_json       TEXT,
+  created_at_utc         TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
+  batch_id               INTEGER,
+  FOREIGN KEY (encounter_template_id) REFERENCES encounter_template(encounter_template_id),
+  FOREIGN KEY (batch_id) REFERENCES simulation_batch(batch_id)
+);
+
+-- A) outcome distribution
+CREATE TABLE IF NOT EXISTS agg_outcome (
+  study_id  INTEGER NOT NULL,
+  winner    TEXT NOT NULL CHECK (winner IN ('party','monsters','timeout')),
+  runs      INTEGER NOT NULL,
+  PRIMARY KEY (study_id, winner),
+  FOREIGN KEY (study_id) REFERENCES agg_study(study_id) ON DELETE CASCADE
+);
+
+-- F) per-run metrics: rounds_taken, total damage, alpha-strike damage (Welford mean / sample variance)
+CREATE TABLE IF NOT EXISTS agg_run_metric (
+  study_id  INTEGER NOT NULL,
+  metric    TEXT NOT NULL,
+  n         INTEGER NOT NULL,
+  mean      REAL NOT NULL,
+  variance  REAL NOT NULL,
+  PRIMARY KEY (study_id, metric),
+  FOREIGN KEY (study_id) REFERENCES agg_study(study_id) ON DELETE CASCADE
+);
+
+-- A-2 / A-3) win rate by party initiative sum
+CREATE TABLE IF NOT EXISTS agg_party_init (
+  study_id    INTEGER NOT NULL,
+  party_init  INTEGER NOT NULL,
+  runs        INTEGER NOT NULL,
+  wins        INTEGER NOT NULL,
+  PRIMARY KEY (study_id, party_init),
+  FOREIGN KEY (study_id) REFERENCES agg_study(study_id) ON DELETE CASCADE
+);
+
+-- B) Rogue beats Bugbear
+CREATE TABLE IF NOT EXISTS agg_rogue_bugbear (
+  study_id             INTEGER NOT NULL,
+  rogue_beats_bugbear  INTEGER NOT NULL CHECK (rogue_beats_bugbear IN (0,1)),
+  runs                 INTEGER NOT NULL,
+  wins                 INTEGER NOT NULL,
+  PRIMARY KEY (study_id, rogue_beats_bugbear),
+  FOREIGN KEY (study_id) REFERENCES agg_study(study_id) ON DELETE CASCADE
+);
+
+-- C) alpha-strike damage buckets
+CREATE TABLE IF NOT EXISTS agg_alpha_strike (
+  study_id    INTEGER NOT NULL,
+  dmg_bucket  TEXT NOT NULL,
+  runs        INTEGER NOT NULL,
+  wins        INTEGER NOT NULL,
+  PRIMARY KEY (study_id, dmg_bucket),
+  FOREIGN KEY (study_id) REFERENCES agg_study(study_id) ON DELETE CASCADE
+);
+
+-- D / I) Rogue opening burst
+CREATE TABLE IF NOT EXISTS agg_opening_burst (
+  study_id                 INTEGER NOT NULL,
+  opening_burst_triggered  INTEGER NOT NULL CHECK (opening_burst_triggered IN (0,1)),
+  runs                     INTEGER NOT NULL,
+  wins                     INTEGER NOT NULL,
+  avg_rounds               REAL NOT NULL,
+  avg_rogue_damage         REAL NOT NULL,
+  var_rogue_damage         REAL NOT NULL,
+  PRIMARY KEY (study_id, opening_burst_triggered),
+  FOREIGN KEY (study_id) REFERENCES agg_study(study_id) ON DELETE CASCADE
+);
+
+-- E / E-1 / G / H / J / K) per participant, split by party_victory
+CREATE TABLE IF NOT EXISTS agg_participant (
+  study_id               INTEGER NOT NULL,
+  party_victory          INTEGER NOT NULL CHECK (party_victory IN (0,1)),
+  side                   TEXT NOT NULL CHECK (side IN ('party','monsters')),
+  name                   TEXT NOT NULL,
+  runs                   INTEGER NOT NULL,
+  alive_runs             INTEGER NOT NULL,
+  attacks_sum            INTEGER NOT NULL,
+  hits_sum               INTEGER NOT NULL,
+  crits_sum              INTEGER NOT NULL,
+  opening_burst_sum      INTEGER NOT NULL,
+  hunters_mark_cast_sum  INTEGER NOT NULL,
+  hunters_mark_bonus_sum INTEGER NOT NULL,
+  avg_damage_dealt       REAL NOT NULL,
+  var_damage_dealt       REAL NOT NULL,
+  avg_damage_taken       REAL NOT NULL,
+  var_damage_taken       REAL NOT NULL,
+  PRIMARY KEY (study_id, party_victory, side, name),
+  FOREIGN KEY (study_id) REFERENCES agg_study(study_id) ON DELETE CASCADE
+);
+
+-- -------------------------
+-- Exact initiative tables (src/initiative_exact.py)
+-- -------------------------
+
+-- P(name_a acts before name_b)
+CREATE TABLE IF NOT EXISTS init_exact_pairwise (
+  encounter_template_id  INTEGER NOT NULL,
+  name_a                 TEXT NOT NULL,
+  name_b                 TEXT NOT NULL,
+  p_a_before_b           REAL NOT NULL,
+  PRIMARY KEY (encounter_template_id, name_a, name_b),
+  FOREIGN KEY (encounter_template_id) REFERENCES encounter_template(encounter_template_id)
+);
+
+-- P(name gets init_order)
+CREATE TABLE IF NOT EXISTS init_exact_position (
+  encounter_template_id  INTEGER NOT NULL,
+  name                   TEXT NOT NULL,
+  init_order             INTEGER NOT NULL,
+  probability            REAL NOT NULL,
+  PRIMARY KEY (encounter_template_id, name, init_order),
+  FOREIGN KEY (encounter_template_id) REFERENCES encounter_template(encounter_template_id)
+);
+
+-- P(sum of init_total over one side = init_sum)
+CREATE TABLE IF NOT EXISTS init_exact_side_sum (
+  encounter_template_id  INTEGER NOT NULL,
+  side                   TEXT NOT NULL CHECK (side IN ('party','monsters')),
+  init_sum               INTEGER NOT NULL,
+  probability            REAL NOT NULL,
+  PRIMARY KEY (encounter_template_id, side, init_sum),
+  FOREIGN KEY (encounter_template_id) REFERENCES encounter_template(encounter_template_id)
+);
+
+-- -------------------------
+-- Parameter sweeps (src/sweep.py)
+-- -------------------------
+
+-- One row per sweep cell. cell_hash covers the base encounter, the cell's parameters, the master
+-- seed and the engine version, so a finished cell is never simulated twice. The batch is the
+-- checkpoint: an interrupted cell resumes at the first run not stored in it.
+CREATE TABLE IF NOT EXISTS sweep_cell (
+  cell_hash              TEXT PRIMARY KEY,
+  sweep_name             TEXT NOT NULL,        -- sweep that first ran the cell
+  params_json            TEXT NOT NULL,        -- {"goblins":6,"pc_dex_delta":2,"target_selection_mon":"random",...}
+  encounter_template_id  INTEGER NOT NULL,
+  batch_id               INTEGER,
+  runs_target            INTEGER NOT NULL,
+  runs_done              INTEGER NOT NULL DEFAULT 0,
+  status                 TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending','running','complete')),
+  updated_at_utc         TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
+  FOREIGN KEY (encounter_template_id) REFERENCES encounter_template(encounter_template_id),
+  FOREIGN KEY (batch_id) REFERENCES simulation_batch(batch_id)
+);
+
+-- -------------------------
+-- Counterfactual initiative (src/counterfactual.py)
+-- -------------------------
+
+-- One row per (run, turn order): the factual battle and its replays with the same dice streams.
+-- delta_* = this order's value minus the factual battle's (0 for the factual row).
+CREATE TABLE IF NOT EXISTS counterfactual_order (
+  batch_id               INTEGER NOT NULL,
+  run_index              INTEGER NOT NULL,
+  seed                   INTEGER NOT NULL,
+  order_key              TEXT NOT NULL,        -- 'factual', 'swap:Rogue,Bugbear' or a side pattern 'PPMPMMMM'
+  turn_order             TEXT NOT NULL,        -- slot names, comma-separated
+  is_factual             INTEGER NOT NULL CHECK (is_factual IN (0,1)),  -- 1 also when a replay's order equals the rolled one
+  party_victory          INTEGER NOT NULL CHECK (party_victory IN (0,1)),
+  rounds_taken           INTEGER NOT NULL,
+  total_damage_party     INTEGER NOT NULL,
+  total_damage_monsters  INTEGER NOT NULL,
+  delta_victory          INTEGER NOT NULL,
+  delta_rounds           INTEGER NOT NULL,
+  delta_damage_party     INTEGER NOT NULL,
+  delta_damage_monsters  INTEGER NOT NULL,
+  PRIMARY KEY (batch_id, run_index, order_key),
+  FOREIGN KEY (batch_id) REFERENCES simulation_batch(batch_id) ON DELETE CASCADE
+);
+
+-- -------------------------
+-- Performance tracking (simulate_combat.py --profile, src/sim_profiler.py)
+-- -------------------------
+
+-- One row per profiled batch: headline numbers as columns, per-phase seconds and counters as JSON
+CREATE TABLE IF NOT EXISTS perf_profile (
+  batch_id               INTEGER PRIMARY KEY,
+  engine                 TEXT NOT NULL,
+  engine_version         TEXT,
+  workers                INTEGER NOT NULL,
+  runs                   INTEGER NOT NULL,
+  wall_s                 REAL NOT NULL,
+  runs_per_s             REAL,
+  p50_us                 REAL,                 -- per-run latency percentiles (setup + combat + rows)
+  p90_us                 REAL,
+  p99_us                 REAL,
+  max_us                 REAL,
+  phases_json            TEXT,                 -- {"load_encounter":0.001,"combat_loop":0.41,...}
+  counters_json          TEXT,                 -- {"rounds":...,"attacks":...,"runs":...}
+  python_version         TEXT,
+  platform               TEXT,
+  recorded_at_utc        TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
+  FOREIGN KEY (batch_id) REFERENCES simulation_batch(batch_id) ON DELETE CASCADE
+);
+
 -- -------------------------
 -- Helpful indexes
 -- -------------------------
 CREATE INDEX IF NOT EXISTS idx_simrun_encounter ON simulation_run(encounter_template_id);
+CREATE INDEX IF NOT EXISTS idx_simrun_batch ON simulation_run(batch_id);
+CREATE INDEX IF NOT EXISTS idx_batch_phase ON simulation_batch(phase, encounter_template_id);
+CREATE INDEX IF NOT EXISTS idx_participant_name ON participant_run(name, run_id);
+-- covering indexes for the run_wide extracts (batch first, then the grouping column)
+CREATE INDEX IF NOT EXISTS idx_run_wide_party_init ON run_wide(batch_id, party_init_sum, party_victory);
+CREATE INDEX IF NOT EXISTS idx_run_wide_rogue_bugbear ON run_wide(batch_id, rogue_beats_bugbear, party_victory);
+CREATE INDEX IF NOT EXISTS idx_run_wide_burst ON run_wide(batch_id, rogue_opening_burst, party_victory, rounds_taken, rogue_damage);
+CREATE INDEX IF NOT EXISTS idx_run_wide_fighter ON run_wide(batch_id, fighter_init, fighter_damage);
+CREATE INDEX IF NOT EXISTS idx_run_wide_ranger ON run_wide(batch_id, ranger_hm_cast, ranger_hm_bonus, ranger_damage);
 CREATE INDEX IF NOT EXISTS idx_participant_side ON participant_run(side);
 CREATE INDEX IF NOT EXISTS idx_participant_initorder ON participant_run(init_order);
 CREATE INDEX IF NOT EXISTS idx_participant_template ON participant_run(template_type, pc_id, monster_key);
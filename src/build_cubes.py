@@ -0,0 +1,154 @@
+"""
+Cube-build step: compact per-batch aggregate tables for the Tableau dashboard.
+
+The dashboard charts (win rate / damage by a participant's initiative, party initiative sum,
+alpha-strike buckets, damage distributions) only need counts and sums per group, so instead of
+the one-table export (one row per participant per run) Tableau reads these:
+
+    cube_participant_init    (batch, side, name, init_total, party_victory)
+    cube_party_init          (batch, party_init_sum)
+    cube_alpha_strike        (batch, damage bucket before the first monster turn)
+    cube_participant_damage  (batch, side, name, party_victory, damage bucket of DAMAGE_BUCKET)
+
+Averages are sum / runs, win rates are wins / runs (or party_victory-weighted runs).
+simulate_combat.py builds the cubes for its batch after refreshing run_wide.
+
+    python src/build_cubes.py                      # every combat batch without cubes yet
+    python src/build_cubes.py --batch 3 --export-dir data/results/cubes
+"""
+
+import argparse
+import csv
+import sqlite3
+from pathlib import Path
+
+from run_wide import refresh_run_wide
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DB_PATH = PROJECT_ROOT / "db" / "dnd_initiative_work.sqlite"
+
+DAMAGE_BUCKET = 5  # width of the per-participant damage buckets
+
+CUBE_TABLES = ("cube_participant_init", "cube_party_init", "cube_alpha_strike", "cube_participant_damage")
+
+CUBE_SQL = {
+    "cube_participant_init": """
+        INSERT INTO cube_participant_init
+          (batch_id, side, name, init_total, party_victory, runs,
+           damage_dealt_sum, damage_taken_sum, alive_sum, hits_sum, crits_sum, attacks_sum)
+        SELECT sr.batch_id, pr.side, pr.name, pr.init_total, sr.party_victory, COUNT(*),
+               SUM(pr.damage_dealt_total), SUM(pr.damage_taken_total), SUM(pr.alive_end),
+               SUM(pr.hits_landed), SUM(pr.crits_landed), SUM(pr.attacks_made)
+        FROM simulation_run sr
+        JOIN participant_run pr ON pr.run_id = sr.run_id
+        WHERE sr.batch_id = :batch_id
+        GROUP BY pr.side, pr.name, pr.init_total, sr.party_victory;
+    """,
+    "cube_party_init": """
+        INSERT INTO cube_party_init
+          (batch_id, party_init_sum, runs, wins, rounds_sum, damage_party_sum, damage_monsters_sum)
+        SELECT batch_id, party_init_sum, COUNT(*), SUM(party_victory), SUM(rounds_taken),
+               SUM(total_damage_party), SUM(total_damage_monsters)
+        FROM run_wide
+        WHERE batch_id = :batch_id
+        GROUP BY party_init_sum;
+    """,
+    # same buckets as query C
+    "cube_alpha_strike": """
+        INSERT INTO cube_alpha_strike (batch_id, dmg_bucket, runs, wins, damage_sum)
+        SELECT
+          batch_id,
+          CASE
+            WHEN damage_party_before_first_monster_turn < 1 THEN '0'
+            WHEN damage_party_before_first_monster_turn < 5 THEN '1-4'
+            WHEN damage_party_before_first_monster_turn < 15 THEN '5-14'
+            WHEN damage_party_before_first_monster_turn < 25 THEN '15-24'
+            ELSE '25+'
+          END AS dmg_bucket,
+          COUNT(*), SUM(party_victory), SUM(damage_party_before_first_monster_turn)
+        FROM run_wide
+        WHERE batch_id = :batch_id
+          AND damage_party_before_first_monster_turn IS NOT NULL
+        GROUP BY dmg_bucket;
+    """,
+    "cube_participant_damage": f"""
+        INSERT INTO cube_participant_damage (batch_id, side, name, party_victory, damage_bucket, runs)
+        SELECT sr.batch_id, pr.side, pr.name, sr.party_victory,
+               (pr.damage_dealt_total / {DAMAGE_BUCKET}) * {DAMAGE_BUCKET} AS damage_bucket, COUNT(*)
+        FROM simulation_run sr
+        JOIN participant_run pr ON pr.run_id = sr.run_id
+        WHERE sr.batch_id = :batch_id
+        GROUP BY pr.side, pr.name, sr.party_victory, damage_bucket;
+    """,
+}
+
+def build_cubes(conn: sqlite3.Connection, batch_id: int) -> dict[str, int]:
+    """
+    (Re)build every cube for one batch in one transaction. run_wide must be up to date.
+    Returns rows written per cube table.
+    """
+    written = {}
+    try:
+        conn.execute("BEGIN IMMEDIATE;")
+        for table in CUBE_TABLES:
+            conn.execute(f"DELETE FROM {table} WHERE batch_id = ?;", (batch_id,))
+            written[table] = conn.execute(CUBE_SQL[table], {"batch_id": batch_id}).rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return written
+
+def pending_batches(conn: sqlite3.Connection) -> list[int]:
+    """
+    Finished combat and sweep batches that have no cube rows yet.
+    """
+    rows = conn.execute("""
+        SELECT sb.batch_id
+        FROM simulation_batch sb
+        WHERE sb.phase IN ('combat', 'sweep')
+          AND sb.finished_at_utc IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM cube_party_init c WHERE c.batch_id = sb.batch_id)
+        ORDER BY sb.batch_id;
+    """).fetchall()
+    return [r[0] for r in rows]
+
+def export_csv(conn: sqlite3.Connection, directory: Path):
+    """
+    Write each cube table to <directory>/<table>.csv (all batches) for a Tableau extract.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    for table in CUBE_TABLES:
+        cur = conn.execute(f"SELECT * FROM {table} ORDER BY 1, 2, 3;")
+        with open(directory / f"{table}.csv", "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow([d[0] for d in cur.description])
+            writer.writerows(cur)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build per-batch cube tables for the dashboard.")
+    parser.add_argument("--batch", type=int, action="append", help="batch_id to (re)build (repeatable; default: pending batches)")
+    parser.add_argument("--export-dir", type=Path, help="also write the cube tables as CSV here")
+    parser.add_argument("--db", type=Path, default=DB_PATH)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    conn = sqlite3.connect(args.db, timeout=30)
+    conn.execute("PRAGMA foreign_keys = ON;")
+    conn.execute("PRAGMA busy_timeout = 30000;")
+
+    refresh_run_wide(conn)
+    batches = args.batch or pending_batches(conn)
+    for batch_id in batches:
+        written = build_cubes(conn, batch_id)
+        print(f"Batch {batch_id}: " + ", ".join(f"{t}={n}" for t, n in written.items()))
+
+    if args.export_dir is not None:
+        export_csv(conn, args.export_dir)
+        print(f"Cube CSVs written to {args.export_dir}")
+    conn.close()
+    print(f"✅ Cubes built for {len(batches)} batch(es).")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""
+Chunked columnar results store: one fixed-dtype binary file per column plus a small manifest.
+
+    <dir>/manifest.json
+    <dir>/simulation_run/<column>.bin
+    <dir>/participant_run/<column>.bin
+    <dir>/first_round_events/<column>.bin
+
+Columns match the SQLite fact tables. Text columns (side, name, winner, pc_id, ...) are
+stored as integer codes with the category list in the manifest; NULL is stored as -1.
+Each flush appends one chunk to every column file and then rewrites the manifest, so a
+reader only ever sees complete chunks; reopening the store cuts off anything a crash left
+past the manifest's row counts. load_store() memory-maps the files back without
+copying, e.g. for analysis in pandas / NumPy at million-run scale.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from result_sink import (
+    DEFAULT_BATCH_SIZE,
+    FIRST_ROUND_COLUMNS,
+    PARTICIPANT_RUN_COLUMNS,
+    SIMULATION_RUN_COLUMNS,
+)
+
+MANIFEST_NAME = "manifest.json"
+FORMAT_VERSION = 3  # 3: hp / attack counts widened to <i4 (horde group rows)
+NULL = -1
+
+# dtype per column; anything listed in CATEGORICAL is stored as codes into the manifest's categories
+SCHEMA = {
+    "simulation_run": {
+        "run_id": "<i8",
+        "encounter_template_id": "<i4",
+        "seed": "<i8",
+        "party_victory": "|i1",
+        "winner": "|i1",
+        "rounds_taken": "<i2",
+        "total_damage_party": "<i4",
+        "total_damage_monsters": "<i4",
+        "bugbear_killed_round": "<i2",
+        "notes_flags_json": "<i2",
+        "batch_id": "<i8",
+    },
+    "participant_run": {
+        "run_id": "<i8",
+        "side": "|i1",
+        "name": "<i2",
+        "template_type": "|i1",
+        "pc_id": "<i2",
+        "monster_key": "<i4",
+        "hp_start": "<i4",
+        "hp_end": "<i4",
+        "alive_end": "|i1",
+        "init_roll_d20": "|i1",
+        "init_mod": "|i1",
+        "init_total": "<i2",
+        "init_order": "<i2",
+        "damage_dealt_total": "<i4",
+        "damage_taken_total": "<i4",
+        "attacks_made": "<i4",
+        "hits_landed": "<i4",
+        "crits_landed": "<i4",
+        "opening_burst_triggered": "|i1",
+        "hunters_mark_cast": "|i1",
+        "hunters_mark_bonus_damage": "<i4",
+    },
+    "first_round_events": {
+        "run_id": "<i8",
+        "damage_party_before_first_monster_turn": "<i4",
+        "monsters_downed_before_first_monster_turn": "<i2",
+        "party_downed_before_first_player_turn": "<i2",
+    },
+}
+
+CATEGORICAL = {
+    "simulation_run": ("winner", "notes_flags_json"),
+    "participant_run": ("side", "name", "template_type", "pc_id"),
+    "first_round_events": (),
+}
+
+# -------------------------
+# Writer
+# -------------------------
+
+class ColumnarResultSink:
+    """
+    Same add_run() interface as result_sink.SqliteResultSink, but appends to a columnar
+    store instead. run_ids are local to the store and continue across sessions.
+    add_block() takes vector_engine blocks directly, without building per-run tuples.
+    """
+
+    def __init__(self, directory: Path, batch_size: int = DEFAULT_BATCH_SIZE):
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be >= 1, got {batch_size}")
+        self.directory = Path(directory)
+        self.batch_size = batch_size
+        self.runs_written = 0
+        self._pending = []
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        manifest_path = self.directory / MANIFEST_NAME
+        if manifest_path.exists():
+            self.manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+            if self.manifest.get("format") != FORMAT_VERSION:
+                raise RuntimeError(f"Unsupported columnar store format in {self.directory}")
+        else:
+            self.manifest = {
+                "format": FORMAT_VERSION,
+                "next_run_id": 1,
+                "tables": {
+                    table: {
+                        "rows": 0,
+                        "columns": {
+                            col: {"dtype": dtype, **({"categories": []} if col in CATEGORICAL[table] else {})}
+                            for col, dtype in cols.items()
+                        },
+                    }
+                    for table, cols in SCHEMA.items()
+                },
+            }
+        for table in SCHEMA:
+            (self.directory / table).mkdir(exist_ok=True)
+        self._truncate_to_manifest()
+
+    # ---- row interface (scalar engine) ----
+
+    def add_run(self, run_row: tuple, participant_rows: list[tuple], first_round_row: tuple):
+        self._pending.append((run_row, participant_rows, first_round_row))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+
+        first_id = self.manifest["next_run_id"]
+        run_ids = list(range(first_id, first_id + len(self._pending)))
+
+        run_cols = list(zip(*(r for r, _, _ in self._pending)))
+        fre_cols = list(zip(*(f for _, _, f in self._pending)))
+        p_run_ids = []
+        p_rows = []
+        for run_id, (_, rows, _) in zip(run_ids, self._pending):
+            p_run_ids.extend([run_id] * len(rows))
+            p_rows.extend(rows)
+        p_cols = list(zip(*p_rows)) if p_rows else [()] * len(PARTICIPANT_RUN_COLUMNS)
+
+        self._append("simulation_run", {"run_id": run_ids, **dict(zip(SIMULATION_RUN_COLUMNS, run_cols))})
+        self._append("participant_run", {"run_id": p_run_ids, **dict(zip(PARTICIPANT_RUN_COLUMNS, p_cols))})
+        self._append("first_round_events", {"run_id": run_ids, **dict(zip(FIRST_ROUND_COLUMNS, fre_cols))})
+
+        self.manifest["next_run_id"] = first_id + len(self._pending)
+        self._write_manifest()
+        self.runs_written += len(self._pending)
+        self._pending.clear()
+
+    # ---- column interface (vector engine) ----
+
+    def add_block(self, encounter_template_id: int, encounter, block: dict, notes_flags_json: str,
+                  batch_id: int | None = None):
+        """
+        Append a vector_engine.simulate_block() result as one chunk.
+        """
+        from vector_engine import WINNER_NAMES
+
+        self.flush()
+        k, c = block["hp_end"].shape
+        first_id = self.manifest["next_run_id"]
+        run_ids = np.arange(first_id, first_id + k, dtype=np.int64)
+        cs = encounter.combatants
+
+        bugbear_round = block["bugbear_killed_round"]
+        self._append("simulation_run", {
+            "run_id": run_ids,
+            "encounter_template_id": np.full(k, encounter_template_id),
+            "seed": np.full(k, NULL),
+            "party_victory": block["party_victory"],
+            "winner": self._codes_for("simulation_run", "winner", WINNER_NAMES)[block["winner"]],
+            "rounds_taken": block["rounds_taken"],
+            "total_damage_party": block["total_damage_party"],
+            "total_damage_monsters": block["total_damage_monsters"],
+            "bugbear_killed_round": np.where(bugbear_round > 0, bugbear_round, NULL),
+            "notes_flags_json": np.full(k, self._codes_for("simulation_run", "notes_flags_json", [notes_flags_json])[0]),
+            "batch_id": np.full(k, NULL if batch_id is None else batch_id),
+        })
+
+        def per_slot(values):
+            return np.tile(np.asarray(values), k)
+
+        hp_end = block["hp_end"].ravel()
+        self._append("participant_run", {
+            "run_id": np.repeat(run_ids, c),
+            "side": per_slot(self._codes_for("participant_run", "side", [x.side for x in cs])),
+            "name": per_slot(self._codes_for("participant_run", "name", [x.name for x in cs])),
+            "template_type": per_slot(self._codes_for("participant_run", "template_type", [x.template_type for x in cs])),
+            "pc_id": per_slot(self._codes_for("participant_run", "pc_id", [x.pc_id for x in cs])),
+            "monster_key": per_slot([x.monster_key if x.monster_key is not None else NULL for x in cs]),
+            "hp_start": per_slot([x.hp_start for x in cs]),
+            "hp_end": hp_end,
+            "alive_end": hp_end > 0,
+            "init_roll_d20": block["init_roll_d20"].ravel(),
+            "init_mod": per_slot([x.init_mod for x in cs]),
+            "init_total": block["init_total"].ravel(),
+            "init_order": block["init_order"].ravel(),
+            "damage_dealt_total": block["damage_dealt"].ravel(),
+            "damage_taken_total": block["damage_taken"].ravel(),
+            "attacks_made": block["attacks"].ravel(),
+            "hits_landed": block["hits"].ravel(),
+            "crits_landed": block["crits"].ravel(),
+            "opening_burst_triggered": block["opening_burst_triggered"].ravel(),
+            "hunters_mark_cast": block["hunters_mark_cast"].ravel(),
+            "hunters_mark_bonus_damage": block["hunters_mark_bonus_damage"].ravel(),
+        })
+        self._append("first_round_events", {
+            "run_id": run_ids,
+            **{col: block[col] for col in FIRST_ROUND_COLUMNS},
+        })
+
+        self.manifest["next_run_id"] = first_id + k
+        self._write_manifest()
+        self.runs_written += k
+
+    def close(self):
+        self.flush()
+
+    # ---- internals ----
+
+    def _codes_for(self, table: str, column: str, values) -> np.ndarray:
+        categories = self.manifest["tables"][table]["columns"][column]["categories"]
+        lookup = {v: i for i, v in enumerate(categories)}
+        codes = []
+        for v in values:
+            if v is None:
+                codes.append(NULL)
+                continue
+            if v not in lookup:
+                lookup[v] = len(categories)
+                categories.append(v)
+            codes.append(lookup[v])
+        return np.array(codes, dtype=np.int64)
+
+    def _append(self, table: str, columns: dict):
+        meta = self.manifest["tables"][table]
+        n = None
+        for col, spec in meta["columns"].items():
+            values = columns[col]
+            if "categories" in spec and not isinstance(values, np.ndarray):
+                arr = self._codes_for(table, col, values)
+            elif isinstance(values, np.ndarray):
+                arr = values
+            else:
+                arr = np.array([NULL if v is None else v for v in values], dtype=np.int64)
+            arr = np.ascontiguousarray(arr, dtype=np.dtype(spec["dtype"]))
+            if n is None:
+                n = len(arr)
+            elif len(arr) != n:
+                raise ValueError(f"{table}.{col}: {len(arr)} values, expected {n}")
+            with open(self.directory / table / f"{col}.bin", "ab") as f:
+                arr.tofile(f)
+        meta["rows"] += n or 0
+
+    def _truncate_to_manifest(self):
+        # A crash between _append and _write_manifest leaves bytes the manifest does not count;
+        # cut them off so the next chunk starts at manifest.rows.
+        for table, meta in self.manifest["tables"].items():
+            for col, spec in meta["columns"].items():
+                path = self.directory / table / f"{col}.bin"
+                size = meta["rows"] * np.dtype(spec["dtype"]).itemsize
+                actual = path.stat().st_size if path.exists() else 0
+                if actual < size:
+                    raise RuntimeError(f"{path} has {actual} bytes, the manifest needs {size}")
+                if actual > size:
+                    with open(path, "r+b") as f:
+                        f.truncate(size)
+
+    def _write_manifest(self):
+        tmp = self.directory / (MANIFEST_NAME + ".tmp")
+        tmp.write_text(json.dumps(self.manifest, indent=1), encoding="utf-8")
+        os.replace(tmp, self.directory / MANIFEST_NAME)
+
+# -------------------------
+# Reader
+# -------------------------
+
+class ColumnarStore:
+    """
+    Read-only view of a columnar store. Numeric columns are np.memmap (no copy).
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.manifest = json.loads((self.directory / MANIFEST_NAME).read_text(encoding="utf-8"))
+        self._cache = {}
+
+    def rows(self, table: str) -> int:
+        return self.manifest["tables"][table]["rows"]
+
+    def column(self, table: str, column: str) -> np.ndarray:
+        key = (table, column)
+        if key not in self._cache:
+            n = self.rows(table)
+            dtype = np.dtype(self.manifest["tables"][table]["columns"][column]["dtype"])
+            if n == 0:
+                self._cache[key] = np.empty(0, dtype=dtype)
+            else:
+                self._cache[key] = np.memmap(self.directory / table / f"{column}.bin", dtype=dtype, mode="r", shape=(n,))
+        return self._cache[key]
+
+    def table(self, table: str) -> dict:
+        return {col: self.column(table, col) for col in self.manifest["tables"][table]["columns"]}
+
+    def categories(self, table: str, column: str) -> list:
+        return self.manifest["tables"][table]["columns"][column]["categories"]
+
+    def code(self, table: str, column: str, value) -> int:
+        """
+        Category code for a text value, for filtering without decoding (e.g. name == 'Rogue').
+        """
+        return self.categories(table, column).index(value)
+
+    def decode(self, table: str, column: str) -> np.ndarray:
+        """
+        Text values of a categorical column (this one does allocate).
+        """
+        cats = np.array(self.categories(table, column) + [None], dtype=object)
+        return cats[self.column(table, column)]  # NULL (-1) picks the trailing None
+
+def load_store(directory: Path) -> ColumnarStore:
+    return ColumnarStore(directory)
@@ -0,0 +1,505 @@
+"""
+Battle engine: one encounter, one RNG, one BattleResult.
+
+No database access here. Callers load the combatant stats (see encounter_loader.py)
+and decide what to do with the results, so the hot path can be benchmarked, run in worker
+processes, or used from a notebook without a database file.
+"""
+
+import hashlib
+import random
+import time
+from array import array
+from dataclasses import dataclass, field
+
+from damage_tables import DamageTable, damage_table
+from dice import DiceExpr, parse_dice
+from targeting import get_policy
+
+ROUND_CAP_DEFAULT = 20
+
+# Bump when the battle rules change, so batches run under different rules can be told apart
+ENGINE_VERSION = "3"  # 2: damage sampled from damage_tables (same distribution, different draws per seed)
+                      # 3: Hunter's Mark marks the Ranger's first target (no extra pick under random PC policies)
+
+# -------------------------
+# Inputs / outputs
+# -------------------------
+
+@dataclass(frozen=True, slots=True)
+class Combatant:
+    """
+    Static stats for one encounter slot (from dim_pc_template or dim_monster).
+    Dice, crit range and feature flags are parsed once here, not on every attack.
+    """
+    name: str                 # slot name: "Rogue", "Goblin_3"
+    side: str                 # 'party' / 'monsters'
+    template_type: str        # 'pc' / 'monster'
+    pc_id: str | None
+    monster_key: int | None
+    ac: int
+    hp_start: int
+    init_mod: int
+    attack_bonus: int
+    damage_dice: str          # e.g. "1d8+3"
+    crits_on: str = "20"      # "20" or "19-20"
+    features: str = ""
+    quantity: int = 1         # >1: a group of identical creatures sharing one initiative (hp_start each)
+    # parsed from the fields above
+    hp_total: int = field(init=False)                 # hp_start * quantity
+    damage: DiceExpr = field(init=False)
+    hit_damage: DamageTable = field(init=False)       # damage_tables 'normal' / 'crit': one draw per hit
+    crit_damage: DamageTable = field(init=False)
+    crit_min: int = field(init=False)                 # lowest natural d20 that crits
+    has_hunters_mark: bool = field(init=False)
+    has_assassinate_advantage: bool = field(init=False)
+    has_opening_burst: bool = field(init=False)
+
+    def __post_init__(self):
+        if self.quantity < 1:
+            raise ValueError(f"quantity must be >= 1, got {self.quantity} for {self.name}")
+        object.__setattr__(self, "hp_total", self.hp_start * self.quantity)
+        object.__setattr__(self, "damage", parse_dice(self.damage_dice))
+        object.__setattr__(self, "hit_damage", damage_table(self.damage_dice, "normal"))
+        object.__setattr__(self, "crit_damage", damage_table(self.damage_dice, "crit"))
+        object.__setattr__(self, "crit_min", crit_min(self.crits_on))
+        object.__setattr__(self, "has_hunters_mark", "hunters_mark" in self.features)
+        object.__setattr__(self, "has_assassinate_advantage", "assassinate_advantage" in self.features)
+        object.__setattr__(self, "has_opening_burst", "opening_burst" in self.features)
+
+@dataclass(frozen=True, slots=True)
+class Encounter:
+    combatants: tuple[Combatant, ...]
+    round_cap: int = ROUND_CAP_DEFAULT
+    # targeting policy names (targeting.POLICIES), from encounter_template
+    target_selection_pc: str = "bugbear_first"
+    target_selection_mon: str = "lowest_hp"
+    # slot names that act first, in this order, whatever they roll (initiative is still rolled)
+    acts_first: tuple[str, ...] = ()
+
+class RngStreams:
+    """
+    Independent random streams for one run, for common random numbers across engine
+    configurations (paired_compare.py): one for targeting draws and, per combatant slot name,
+    one for initiative + attack rolls and one for damage dice. Each is seeded from
+    (run seed, stream, slot name), so a combatant rolls the same numbers in every configuration
+    it appears in, whatever the others do.
+    """
+
+    def __init__(self, seed: int):
+        self.seed = seed
+        self.target = self._new("target")
+        self._streams = {}
+
+    def _new(self, *key) -> random.Random:
+        digest = hashlib.blake2b(":".join(map(str, (self.seed,) + key)).encode(), digest_size=8).digest()
+        return random.Random(int.from_bytes(digest, "big"))
+
+    def _get(self, kind: str, name: str) -> random.Random:
+        stream = self._streams.get((kind, name))
+        if stream is None:
+            stream = self._streams[(kind, name)] = self._new(kind, name)
+        return stream
+
+    def getstate(self) -> tuple:
+        """
+        Snapshot of every stream created so far (restore with setstate to replay the same draws).
+        """
+        return self.target.getstate(), {key: s.getstate() for key, s in self._streams.items()}
+
+    def setstate(self, state: tuple):
+        target, streams = state
+        self.target.setstate(target)
+        for key, s in streams.items():
+            self._get(*key).setstate(s)
+
+    def rolls(self, name: str) -> random.Random:
+        return self._get("rolls", name)
+
+    def damage(self, name: str) -> random.Random:
+        return self._get("damage", name)
+
+class CombatantState:
+    """
+    Mutable per-run state for one combatant. Static stats stay on `spec`,
+    so setting up a run is one small object per combatant and no parsing,
+    and reset() makes the same object ready for the next run.
+
+    A group (spec.quantity > 1) is one state: hp is the group total, member_hp holds
+    each creature's HP, damage goes to the front creature and counters are summed.
+    """
+    __slots__ = (
+        "spec", "hp", "init_roll_d20", "init_total", "init_order",
+        "damage_dealt", "damage_taken", "attacks", "hits", "crits",
+        "opening_burst_triggered", "hunters_mark_cast", "hunters_mark_bonus_damage",
+        "alive_n", "member_hp", "member_hp_start", "front",
+        "rng_rolls", "rng_damage",  # set at the start of every battle
+    )
+
+    def __init__(self, spec: Combatant):
+        self.spec = spec
+        if spec.quantity > 1:
+            self.member_hp_start = array("l", [spec.hp_start]) * spec.quantity
+            self.member_hp = array("l", self.member_hp_start)
+        else:
+            self.member_hp_start = self.member_hp = None
+        self.reset()
+
+    def reset(self):
+        """
+        Back to the start-of-battle values, so a state object can be reused run after run.
+        """
+        self.hp = self.spec.hp_total
+        self.alive_n = self.spec.quantity
+        self.front = 0
+        if self.member_hp is not None:
+            self.member_hp[:] = self.member_hp_start
+        self.init_roll_d20 = 0
+        self.init_total = 0
+        self.init_order = 0
+        # counters
+        self.damage_dealt = 0
+        self.damage_taken = 0
+        self.attacks = 0
+        self.hits = 0
+        self.crits = 0
+        # flags (only meaningful for some PCs)
+        self.opening_burst_triggered = 0
+        self.hunters_mark_cast = 0
+        self.hunters_mark_bonus_damage = 0
+
+    def take_damage(self, dmg: int) -> bool:
+        """
+        Apply one hit (a group takes it on its front creature; overkill is lost).
+        Returns True if a creature dropped to 0 HP.
+        """
+        if self.member_hp is None:
+            self.hp = max(0, self.hp - dmg)
+            return self.hp == 0
+        i = self.front
+        left = self.member_hp[i]
+        if dmg < left:
+            self.member_hp[i] = left - dmg
+            self.hp -= dmg
+            return False
+        self.member_hp[i] = 0
+        self.hp -= left
+        self.alive_n -= 1
+        self.front = i + 1
+        return True
+
+    @property
+    def hp_end(self) -> int:
+        return self.hp
+
+# flag bits of an event record (see simulate_battle(events=...) and event_log.py)
+EVENT_HIT = 1
+EVENT_CRIT = 2
+EVENT_HUNTERS_MARK = 4     # damage includes Hunter's Mark
+EVENT_OPENING_BURST = 8    # damage includes the opening burst
+EVENT_ADVANTAGE = 16       # d20 is the higher of two (Assassinate)
+
+@dataclass(slots=True)
+class BattleResult:
+    winner: str               # 'party' / 'monsters' / 'timeout'
+    rounds_taken: int
+    bugbear_killed_round: int | None
+    damage_party_before_first_monster_turn: int
+    monsters_downed_before_first_monster_turn: int
+    party_downed_before_first_player_turn: int
+    participants: tuple[CombatantState, ...]  # final state, same order as Encounter.combatants
+    total_damage_party: int
+    total_damage_monsters: int
+
+    @property
+    def party_victory(self) -> int:
+        return 1 if self.winner == "party" else 0
+
+# -------------------------
+# Dice helpers
+# -------------------------
+
+def roll(rng: random.Random, sides: int) -> int:
+    return rng.randint(1, sides)
+
+HUNTERS_MARK_DICE = parse_dice("1d6")
+OPENING_BURST_DICE = parse_dice("2d6")
+# what a hit samples from (one draw each)
+HUNTERS_MARK_TABLE = damage_table("1d6", "normal")
+HUNTERS_MARK_CRIT_TABLE = damage_table("1d6", "crit")
+OPENING_BURST_TABLE = damage_table("2d6", "normal")
+
+# -------------------------
+# Rules: crit ranges / features
+# -------------------------
+
+def crit_min(threshold_str: str) -> int:
+    """
+    threshold_str is '20' or '19-20' (from pc template).
+    Returns the lowest natural d20 that crits.
+    """
+    if threshold_str == "19-20":
+        return 19
+    # '20' and fallback: natural 20
+    return 20
+
+# -------------------------
+# One battle
+# -------------------------
+
+def roll_initiative(states: list[CombatantState], rng: random.Random) -> list[CombatantState]:
+    """
+    Roll d20 + init_mod for everyone and return the turn order.
+    Sort by init_total desc, then init_mod desc, then random tie-break.
+    """
+    for st in states:
+        r = roll(rng, 20)
+        st.init_roll_d20 = r
+        st.init_total = r + st.spec.init_mod
+
+    init_list = list(states)
+    rng.shuffle(init_list)
+    init_list.sort(key=lambda st: (st.init_total, st.spec.init_mod), reverse=True)
+    return number_turns(init_list)
+
+def roll_initiative_streams(states: list[CombatantState], streams: RngStreams) -> list[CombatantState]:
+    """
+    roll_initiative with each combatant's d20 and tie-break drawn from its own stream,
+    so neither depends on who else is in the fight.
+    """
+    tiebreak = {}
+    for st in states:
+        stream = streams.rolls(st.spec.name)
+        r = roll(stream, 20)
+        st.init_roll_d20 = r
+        st.init_total = r + st.spec.init_mod
+        tiebreak[id(st)] = stream.random()
+    init_list = sorted(states, key=lambda st: (st.init_total, st.spec.init_mod, tiebreak[id(st)]), reverse=True)
+    return number_turns(init_list)
+
+def put_first(init_list: list[CombatantState], names: tuple[str, ...]) -> list[CombatantState]:
+    """
+    Encounter.acts_first: move these slots to the front of the rolled order.
+    """
+    first = [st for name in names for st in init_list if st.spec.name == name]
+    return number_turns(first + [st for st in init_list if st.spec.name not in names])
+
+def number_turns(init_list: list[CombatantState]) -> list[CombatantState]:
+    for order, st in enumerate(init_list, start=1):
+        st.init_order = order
+    return init_list
+
+def new_states(encounter: Encounter) -> list[CombatantState]:
+    return [CombatantState(c) for c in encounter.combatants]
+
+def simulate_battle(encounter: Encounter, rng: random.Random,
+                    states: list[CombatantState] | None = None,
+                    events: list | None = None,
+                    marks: list | None = None,
+                    streams: RngStreams | None = None,
+                    order: tuple[str, ...] | None = None) -> BattleResult:
+    """
+    Run one battle to the end (or to encounter.round_cap) using only `rng` for randomness.
+
+    streams: optional RngStreams used instead of `rng` (common random numbers: the same run
+    seed gives every combatant the same rolls in any configuration).
+
+    order: optional slot names that replace encounter.acts_first for this battle, e.g. a full
+    turn order for a counterfactual replay (counterfactual.py). Initiative is still rolled.
+
+    states: optional per-run buffers from new_states(encounter), reset and reused instead of
+    allocated. The returned BattleResult.participants are then those same objects, so
+    read them before the next battle that reuses the buffers.
+
+    events: optional list; every attack roll appends one tuple
+    (round, actor slot, target slot, d20, flags, damage), slots indexing encounter.combatants
+    and flags made of the EVENT_* bits. Nothing is recorded (or rolled differently) without it.
+
+    marks: optional list; gets time.perf_counter_ns() once setup and initiative are done
+    (simulate_combat.py --profile splits a run's time there).
+    """
+    if states is None:
+        states = new_states(encounter)
+    else:
+        for st in states:
+            st.reset()
+    party = [st for st in states if st.spec.side == "party"]
+    monsters = [st for st in states if st.spec.side == "monsters"]
+
+    if streams is None:
+        init_list = roll_initiative(states, rng)
+        for st in states:
+            st.rng_rolls = st.rng_damage = rng
+        target_rng = rng
+    else:
+        init_list = roll_initiative_streams(states, streams)
+        for st in states:
+            st.rng_rolls = streams.rolls(st.spec.name)
+            st.rng_damage = streams.damage(st.spec.name)
+        target_rng = streams.target
+    if order is None:
+        order = encounter.acts_first
+    if order:
+        init_list = put_first(init_list, order)
+    slot_of = {id(st): i for i, st in enumerate(states)} if events is not None else None
+
+    # Target selection (see targeting.py); policies track HP / damage incrementally
+    pc_policy = get_policy(encounter.target_selection_pc)(monsters, target_rng)
+    mon_policy = get_policy(encounter.target_selection_mon)(party, target_rng)
+    if marks is not None:
+        marks.append(time.perf_counter_ns())
+
+    # -------------------------
+    # Feature state
+    # -------------------------
+    marked_target = None  # Hunter's Mark target
+    opening_burst_available = True  # Rogue bonus available once
+
+    # First-round tracking
+    damage_party_before_first_monster_turn = 0
+    monsters_downed_before_first_monster_turn = 0
+    party_downed_before_first_player_turn = 0
+    first_monster_acted = False
+    first_player_acted = False
+    bugbear_killed_round = None
+
+    # -------------------------
+    # Combat loop
+    # -------------------------
+    # Living combatants per side, decremented when someone drops to 0 HP,
+    # so the end-of-fight checks are O(1) instead of a scan per turn
+    alive = {"party": len(party), "monsters": len(monsters)}
+
+    winner = "timeout"
+    rounds_taken = 0
+
+    for round_no in range(1, encounter.round_cap + 1):
+        rounds_taken = round_no
+
+        for ap in init_list:
+            if ap.hp <= 0:
+                continue
+            a = ap.spec
+            actor_is_party = a.side == "party"
+
+            # mark the moment the first monster takes a turn
+            if not actor_is_party and not first_monster_acted:
+                first_monster_acted = True
+            if actor_is_party and not first_player_acted:
+                first_player_acted = True
+
+            if not alive["party"]:
+                winner = "monsters"
+                break
+            if not alive["monsters"]:
+                winner = "party"
+                break
+
+            target_policy, own_policy = (pc_policy, mon_policy) if actor_is_party else (mon_policy, pc_policy)
+            rolls, dice = ap.rng_rolls, ap.rng_damage
+
+            # One attack per living member (a horde group attacks once per creature still standing)
+            for _ in range(ap.alive_n):
+                # Choose target
+                tp = target_policy.pick(ap)
+
+                if tp is None:
+                    break  # the other side went down during this group's turn
+
+                # Ranger casts Hunter's Mark on its first turn of round 1, on the creature it attacks
+                if a.has_hunters_mark and round_no == 1 and ap.hunters_mark_cast == 0:
+                    marked_target = tp
+                    ap.hunters_mark_cast = 1
+
+                # Attack roll
+                ap.attacks += 1
+                d20_roll = roll(rolls, 20)
+
+                # Assassinate Advantage rule
+                used_assassinate_advantage = False
+                hm = bonus = 0
+                if a.has_assassinate_advantage and round_no == 1:
+                    # Advantage if target hasn't taken a turn yet (i.e., target init_order is after Rogue)
+                    if tp.init_order > ap.init_order:
+                        d20_roll_2 = roll(rolls, 20)
+                        d20_roll = max(d20_roll, d20_roll_2)
+                        used_assassinate_advantage = True
+
+                hit = (d20_roll + a.attack_bonus) >= tp.spec.ac
+                crit = d20_roll >= a.crit_min
+
+                if hit:
+                    ap.hits += 1
+                    if crit:
+                        ap.crits += 1
+
+                    dmg = (a.crit_damage if crit else a.hit_damage).sample(dice)
+
+                    # Hunter's Mark bonus damage (Ranger hits marked target)
+                    if a.has_hunters_mark and marked_target is tp:
+                        hm = (HUNTERS_MARK_CRIT_TABLE if crit else HUNTERS_MARK_TABLE).sample(dice)
+                        dmg += hm
+                        ap.hunters_mark_bonus_damage += hm
+
+                    # Opening burst (+2d6 once) if Rogue acts before target's first turn
+                    # Opening burst ONLY if Rogue used Assassinate Advantage on this attack, and it hits
+                    if a.has_opening_burst and opening_burst_available and used_assassinate_advantage:
+                        bonus = OPENING_BURST_TABLE.sample(dice)  # bonus dice do not crit in this simplified model
+                        dmg += bonus
+                        ap.opening_burst_triggered = 1
+                        opening_burst_available = False
+
+                    # Apply damage (to the front creature of a group)
+                    downed = tp.take_damage(dmg)
+                    if tp.hp == 0:
+                        alive[tp.spec.side] -= 1
+                    ap.damage_dealt += dmg
+                    tp.damage_taken += dmg
+                    target_policy.changed(tp)
+                    own_policy.changed(ap)
+
+                    # First-round pre-monster-turn tracking
+                    if not first_monster_acted and actor_is_party:
+                        damage_party_before_first_monster_turn += dmg
+                        if downed and tp.spec.side == "monsters":
+                            monsters_downed_before_first_monster_turn += 1
+
+                    if not first_player_acted and not actor_is_party:
+                        if downed and tp.spec.side == "party":
+                            party_downed_before_first_player_turn += 1
+
+                    # Track bugbear death
+                    if tp.spec.name == "Bugbear" and tp.hp == 0 and bugbear_killed_round is None:
+                        bugbear_killed_round = round_no
+
+                if events is not None:
+                    flags = 0
+                    if hit:
+                        flags = EVENT_HIT | (EVENT_CRIT if crit else 0) | (EVENT_HUNTERS_MARK if hm else 0) \
+                            | (EVENT_OPENING_BURST if bonus else 0)
+                    if used_assassinate_advantage:
+                        flags |= EVENT_ADVANTAGE
+                    events.append((round_no, slot_of[id(ap)], slot_of[id(tp)], d20_roll, flags, dmg if hit else 0))
+
+            # Check end-of-fight mid-round
+            if not alive["party"]:
+                winner = "monsters"
+                break
+            if not alive["monsters"]:
+                winner = "party"
+                break
+
+        if winner != "timeout":
+            break
+
+    return BattleResult(
+        winner=winner,
+        rounds_taken=rounds_taken,
+        bugbear_killed_round=bugbear_killed_round,
+        damage_party_before_first_monster_turn=damage_party_before_first_monster_turn,
+        monsters_downed_before_first_monster_turn=monsters_downed_before_first_monster_turn,
+        party_downed_before_first_player_turn=party_downed_before_first_player_turn,
+        participants=tuple(states),
+        total_damage_party=sum(p.damage_dealt for p in party),
+        total_damage_monsters=sum(m.damage_dealt for m in monsters),
+    )
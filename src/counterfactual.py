@@ -0,0 +1,199 @@
+"""
+Counterfactual initiative analysis: replay each battle with the same dice under other turn orders.
+
+A run rolls its battle once with RngStreams(seed) (combat_engine.py), so every combatant draws
+its initiative, attack and damage rolls from its own stream. The battle is then replayed from a
+snapshot of those streams with the turn order replaced, so the dice stay fixed and only the order
+changes. The state buffers are reset in place, so a replay costs one battle and nothing is rebuilt.
+
+    swap    the factual order with two slots swapped (default Rogue / Bugbear)
+    sides   every interleaving of party and monster turns, each side keeping its rolled order
+            (C(8, 3) = 56 orders for 3 PCs vs 5 monsters); the order key is the side pattern,
+            e.g. 'PPMPMMMM'
+
+Each order's outcome and its difference from the factual battle go to counterfactual_order
+(query CF in analysis_queries.sql). These runs use RngStreams, not the random.Random(seed) of
+simulate_combat.py, so they are their own batch (phase 'counterfactual').
+
+    python src/counterfactual.py --runs 2000 --seed 42
+    python src/counterfactual.py --mode sides --runs 1000 --workers 4
+"""
+
+import argparse
+import itertools
+import random
+import sqlite3
+from pathlib import Path
+
+from combat_engine import RngStreams, new_states, simulate_battle
+from encounter_loader import load_encounter
+from parallel_runner import ParallelRunner
+from simulate_combat import BATCH_SIZE, ENCOUNTER_NAME, derive_seed
+from simulation_batch import finish_batch, start_batch
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DB_PATH = PROJECT_ROOT / "db" / "dnd_initiative_work.sqlite"
+
+MODES = ("swap", "sides")
+
+# -------------------------
+# Alternative orders
+# -------------------------
+
+def swap_orders(factual: tuple[str, ...], a: str, b: str) -> list[tuple[str, tuple[str, ...]]]:
+    i, j = factual.index(a), factual.index(b)
+    order = list(factual)
+    order[i], order[j] = order[j], order[i]
+    return [(f"swap:{a},{b}", tuple(order))]
+
+def side_orders(factual: tuple[str, ...], party: set[str]) -> list[tuple[str, tuple[str, ...]]]:
+    """
+    Every interleaving of the two sides' turns, each side in its factual order, keyed by side pattern.
+    """
+    pcs = [n for n in factual if n in party]
+    mons = [n for n in factual if n not in party]
+    orders = []
+    for slots in itertools.combinations(range(len(factual)), len(pcs)):
+        slots = set(slots)
+        pc_iter, mon_iter = iter(pcs), iter(mons)
+        order = tuple(next(pc_iter) if k in slots else next(mon_iter) for k in range(len(factual)))
+        orders.append(("".join("P" if k in slots else "M" for k in range(len(factual))), order))
+    return orders
+
+# -------------------------
+# Worker task
+# -------------------------
+
+_buffers = (None, None)
+
+def _outcome(result) -> tuple:
+    return result.party_victory, result.rounds_taken, result.total_damage_party, result.total_damage_monsters
+
+def run_counterfactual(shared: tuple, seed: int) -> list[tuple]:
+    """
+    Worker task: the factual battle for `seed`, then one replay per alternative order from a
+    snapshot of the same streams. Returns (order_key, turn_order, is_factual, outcome) tuples,
+    the factual battle first.
+    """
+    global _buffers
+    encounter, mode, swap = shared
+    if _buffers[0] is not encounter:
+        _buffers = (encounter, new_states(encounter))
+    states = _buffers[1]
+
+    streams = RngStreams(seed)
+    for c in encounter.combatants:
+        streams.rolls(c.name)
+        streams.damage(c.name)
+    snapshot = streams.getstate()
+
+    result = simulate_battle(encounter, None, states, streams=streams)
+    factual = tuple(st.spec.name for st in sorted(states, key=lambda st: st.init_order))
+    out = [("factual", factual, 1, _outcome(result))]
+
+    if mode == "swap":
+        orders = swap_orders(factual, *swap)
+    else:
+        orders = side_orders(factual, {c.name for c in encounter.combatants if c.side == "party"})
+    for key, order in orders:
+        streams.setstate(snapshot)
+        result = simulate_battle(encounter, None, states, streams=streams, order=order)
+        out.append((key, order, int(order == factual), _outcome(result)))
+    return out
+
+# -------------------------
+# Storage
+# -------------------------
+
+def order_rows(batch_id: int, run_index: int, seed: int, replays: list[tuple]) -> list[tuple]:
+    base = replays[0][3]
+    return [
+        (batch_id, run_index, seed, key, ",".join(order), is_factual, *outcome,
+         *(v - b for v, b in zip(outcome, base)))
+        for key, order, is_factual, outcome in replays
+    ]
+
+INSERT_SQL = """
+    INSERT INTO counterfactual_order
+      (batch_id, run_index, seed, order_key, turn_order, is_factual,
+       party_victory, rounds_taken, total_damage_party, total_damage_monsters,
+       delta_victory, delta_rounds, delta_damage_party, delta_damage_monsters)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+"""
+
+def summary(conn: sqlite3.Connection, batch_id: int, limit: int = 10) -> list[tuple]:
+    """
+    (order_key, runs, factual win rate, mean win-rate change, mean rounds change), biggest changes first.
+    """
+    return conn.execute("""
+        SELECT order_key, COUNT(*), AVG(party_victory - delta_victory), AVG(delta_victory), AVG(delta_rounds)
+        FROM counterfactual_order
+        WHERE batch_id = ? AND order_key <> 'factual'
+        GROUP BY order_key
+        ORDER BY ABS(AVG(delta_victory)) DESC
+        LIMIT ?;""", (batch_id, limit)).fetchall()
+
+# -------------------------
+# Main
+# -------------------------
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay battles with fixed dice under alternative initiative orders.")
+    parser.add_argument("--mode", choices=MODES, default="swap", help="swap two slots, or every side-level order")
+    parser.add_argument("--swap", nargs=2, default=("Rogue", "Bugbear"), metavar=("A", "B"),
+                        help="slots swapped in --mode swap (default Rogue Bugbear)")
+    parser.add_argument("--runs", type=int, default=1000, help="factual battles (default 1000)")
+    parser.add_argument("--seed", type=int, default=None, help="master seed (default: random)")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (default 1 = no pool)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help=f"runs per transaction (default {BATCH_SIZE})")
+    parser.add_argument("--encounter", default=ENCOUNTER_NAME, help="encounter_template.name")
+    parser.add_argument("--db", type=Path, default=DB_PATH, help="SQLite database path")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.runs < 1 or args.workers < 1 or args.batch_size < 1:
+        raise SystemExit("--runs, --workers and --batch-size must be >= 1")
+
+    conn = sqlite3.connect(args.db, timeout=30)
+    conn.execute("PRAGMA foreign_keys = ON;")
+    conn.execute("PRAGMA busy_timeout = 30000;")
+
+    et_id, encounter = load_encounter(conn, args.encounter)
+    names = {c.name for c in encounter.combatants}
+    if args.mode == "swap" and not set(args.swap) <= names:
+        raise SystemExit(f"--swap: no such slots {sorted(set(args.swap) - names)}")
+    if encounter.acts_first:
+        raise SystemExit("the encounter already fixes part of the order (acts_first)")
+
+    master_seed = args.seed if args.seed is not None else random.randint(1, 2**31 - 1)
+    params = {"runs": args.runs, "mode": args.mode, "workers": args.workers}
+    if args.mode == "swap":
+        params["swap"] = list(args.swap)
+    batch_id = start_batch(conn, et_id, "counterfactual", engine="scalar", master_seed=master_seed, params=params)
+    print(f"Counterfactual {args.mode} replays for encounter_template_id={et_id}, {args.runs} runs "
+          f"(master_seed={master_seed}, workers={args.workers})...")
+
+    replays = 0
+    shared = (encounter, args.mode, tuple(args.swap))
+    with ParallelRunner(run_counterfactual, shared, workers=args.workers) as runner:
+        for start in range(0, args.runs, args.batch_size):
+            indices = range(start, min(start + args.batch_size, args.runs))
+            seeds = [derive_seed(master_seed, i) for i in indices]
+            rows = []
+            for i, seed, out in zip(indices, seeds, runner.map(seeds)):
+                rows.extend(order_rows(batch_id, i, seed, out))
+                replays += len(out) - 1
+            conn.executemany(INSERT_SQL, rows)
+            conn.commit()
+            print(f"Run {indices[-1] + 1}/{args.runs} done ({replays} replays)")
+
+    finish_batch(conn, batch_id, args.runs, params)
+    for key, runs, factual_rate, d_win, d_rounds in summary(conn, batch_id):
+        print(f"  {key:<20} runs={runs:<7} factual win={factual_rate:.4f}  "
+              f"win change={d_win:+.4f}  rounds change={d_rounds:+.3f}")
+    conn.close()
+    print(f"✅ Batch {batch_id}: {args.runs} battles, {replays} counterfactual replays in counterfactual_order.")
+
+if __name__ == "__main__":
+    main()
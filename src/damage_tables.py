@@ -0,0 +1,214 @@
+"""
+Damage distribution tables: the exact PMF / CDF of a damage expression, per variant, so a hit
+is one uniform draw and a bisect into the CDF instead of a randint per die.
+
+Variants (what one hit deals):
+
+    normal      the expression                        ('1d8+3')
+    crit        dice doubled, modifier once           (2d8+3)
+    hm          + Hunter's Mark 1d6                   (1d8+3 + 1d6)
+    hm_crit     crit + Hunter's Mark 2d6              (2d8+3 + 2d6)
+    ob          + opening burst 2d6                   (1d8+3 + 2d6; the burst never crits)
+    ob_crit     crit + opening burst 2d6              (2d8+3 + 2d6)
+
+The engine samples a hit's dice and its Hunter's Mark / opening burst dice from separate
+tables (it records the bonus damage on its own), so it uses 'normal' and 'crit' of the weapon
+expression, of '1d6' and of '2d6'. The combined variants are for analytics: expected damage
+per hit, P(one hit drops a target with this much HP), and attack_summary() per attacker and
+target. Tables come from DiceExpr.pmf and are cached in this process and on disk
+(data/cache/damage_pmf.json, keyed by expression), which saves the slow keep-highest
+enumerations; `python src/damage_tables.py` fills it for every damage_dice in the dims.
+
+    python src/damage_tables.py                      # cache + expected damage per expression
+    python src/damage_tables.py --encounter "..."    # hit / kill probabilities per attacker and target
+"""
+
+import argparse
+import json
+import random
+import sqlite3
+from bisect import bisect_right
+from functools import lru_cache
+from pathlib import Path
+
+from dice import convolve_pmf, parse_dice
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DB_PATH = PROJECT_ROOT / "db" / "dnd_initiative_work.sqlite"
+CACHE_PATH = PROJECT_ROOT / "data" / "cache" / "damage_pmf.json"
+CACHE_FORMAT = 1
+
+VARIANTS = ("normal", "crit", "hm", "hm_crit", "ob", "ob_crit")
+
+# variant -> (crit, bonus dice expression, bonus dice crit)
+_VARIANT_PARTS = {
+    "normal": (False, None, False),
+    "crit": (True, None, False),
+    "hm": (False, "1d6", False),
+    "hm_crit": (True, "1d6", True),
+    "ob": (False, "2d6", False),
+    "ob_crit": (True, "2d6", False),
+}
+
+class DamageTable:
+    """
+    One variant of one expression: sorted values with their probabilities and CDF.
+    sample(rng) costs one rng.random() whatever the number of dice.
+    """
+    __slots__ = ("expr", "variant", "values", "probs", "cdf")
+
+    def __init__(self, expr: str, variant: str, pmf: dict[int, float]):
+        self.expr = expr
+        self.variant = variant
+        self.values = tuple(sorted(pmf))
+        self.probs = tuple(pmf[v] for v in self.values)
+        cdf, acc = [], 0.0
+        for p in self.probs:
+            acc += p
+            cdf.append(acc)
+        cdf[-1] = 1.0  # rounding: random() < 1.0 must always land on a value
+        self.cdf = tuple(cdf)
+
+    def __repr__(self):
+        return f"DamageTable({self.expr!r}, {self.variant!r})"
+
+    def __reduce__(self):
+        # pickle as the key (worker processes rebuild it through the cache)
+        return damage_table, (self.expr, self.variant)
+
+    def sample(self, rng: random.Random) -> int:
+        return self.values[bisect_right(self.cdf, rng.random())]
+
+    @property
+    def pmf(self) -> dict[int, float]:
+        return dict(zip(self.values, self.probs))
+
+    @property
+    def mean(self) -> float:
+        return sum(v * p for v, p in zip(self.values, self.probs))
+
+    def p_at_least(self, hp: int) -> float:
+        """
+        P(damage >= hp): one hit drops a target with hp HP left.
+        """
+        i = bisect_right(self.values, hp - 1)
+        return 1.0 - (self.cdf[i - 1] if i else 0.0)
+
+# -------------------------
+# Building / caching
+# -------------------------
+
+def variant_pmf(expr: str, variant: str) -> dict[int, float]:
+    if variant not in _VARIANT_PARTS:
+        raise ValueError(f"Unknown damage variant {variant!r}, choose from {', '.join(VARIANTS)}")
+    crit, bonus, bonus_crit = _VARIANT_PARTS[variant]
+    pmf = parse_dice(expr).pmf(crit)
+    if bonus is not None:
+        pmf = convolve_pmf(pmf, parse_dice(bonus).pmf(bonus_crit))
+    return pmf
+
+_disk = None
+
+def _disk_tables() -> dict:
+    global _disk
+    if _disk is None:
+        _disk = {}
+        try:
+            data = json.loads(CACHE_PATH.read_text(encoding="utf-8"))
+            if data.get("format") == CACHE_FORMAT:
+                _disk = data["tables"]
+        except (OSError, ValueError, KeyError):
+            pass
+    return _disk
+
+@lru_cache(maxsize=512)
+def damage_table(expr: str, variant: str = "normal") -> DamageTable:
+    """
+    The (cached) table for a dice expression and variant.
+    """
+    expr = parse_dice(expr).expr
+    stored = _disk_tables().get(expr, {}).get(variant)
+    if stored is not None:
+        return DamageTable(expr, variant, {int(v): p for v, p in stored})
+    return DamageTable(expr, variant, variant_pmf(expr, variant))
+
+def save_cache(exprs, path: Path = CACHE_PATH) -> int:
+    """
+    Write every variant of these expressions (plus what the file already has) to the disk cache.
+    """
+    global _disk
+    tables = dict(_disk_tables()) if path == CACHE_PATH else {}
+    for expr in exprs:
+        t = {variant: damage_table(expr, variant) for variant in VARIANTS}
+        tables[t["normal"].expr] = {v: [[x, p] for x, p in zip(tab.values, tab.probs)] for v, tab in t.items()}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"format": CACHE_FORMAT, "tables": tables}, sort_keys=True), encoding="utf-8")
+    if path == CACHE_PATH:
+        _disk = tables
+    return len(tables)
+
+def dim_expressions(conn: sqlite3.Connection) -> list[str]:
+    rows = conn.execute("""
+        SELECT damage_dice FROM dim_pc_template WHERE damage_dice IS NOT NULL
+        UNION
+        SELECT damage_dice FROM dim_monster WHERE damage_dice IS NOT NULL;
+    """).fetchall()
+    return sorted({parse_dice(r[0]).expr for r in rows})
+
+# -------------------------
+# Analytics
+# -------------------------
+
+def attack_summary(attacker, target) -> dict:
+    """
+    One plain attack (no advantage, no bonus dice) by a Combatant on a Combatant from full HP:
+    P(hit), P(crit), expected damage and P(the attack alone drops the target).
+    """
+    normal = damage_table(attacker.damage.expr, "normal")
+    crit = damage_table(attacker.damage.expr, "crit")
+    p_hit = p_crit = 0.0
+    for face in range(1, 21):
+        if face + attacker.attack_bonus >= target.ac:
+            if face >= attacker.crit_min:
+                p_crit += 1 / 20
+            else:
+                p_hit += 1 / 20
+    return {
+        "p_hit": p_hit + p_crit,
+        "p_crit": p_crit,
+        "expected_damage": p_hit * normal.mean + p_crit * crit.mean,
+        "p_kill": p_hit * normal.p_at_least(target.hp_start) + p_crit * crit.p_at_least(target.hp_start),
+    }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Damage PMF tables: disk cache and expected-damage / kill analytics.")
+    parser.add_argument("--encounter", default=None,
+                        help="also print hit / damage / one-attack kill probabilities for this encounter_template")
+    parser.add_argument("--db", type=Path, default=DB_PATH, help="SQLite database path")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    conn = sqlite3.connect(args.db, timeout=30)
+    exprs = dim_expressions(conn)
+    n = save_cache(exprs)
+    print(f"Damage tables for {len(exprs)} expressions written to {CACHE_PATH} ({n} cached).")
+    print(f"{'expr':<12}" + "".join(f"{v:>10}" for v in VARIANTS))
+    for expr in exprs:
+        print(f"{expr:<12}" + "".join(f"{damage_table(expr, v).mean:>10.2f}" for v in VARIANTS))
+
+    if args.encounter is not None:
+        from encounter_loader import load_encounter
+        _, encounter = load_encounter(conn, args.encounter)
+        print(f"\nOne attack from full HP in {args.encounter!r}:")
+        for a in encounter.combatants:
+            for t in encounter.combatants:
+                if a.side == t.side:
+                    continue
+                s = attack_summary(a, t)
+                print(f"  {a.name:<9} -> {t.name:<9} P(hit)={s['p_hit']:.3f}  P(crit)={s['p_crit']:.3f}  "
+                      f"E[dmg]={s['expected_damage']:.2f}  P(drop)={s['p_kill']:.3f}")
+    conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Dice expressions, parsed once and cached.
+
+Syntax: terms joined by + / -, each term one of
+  NdS        N dice with S sides ('d6' means 1d6)
+  NdSkhK     roll N, keep the highest K  (2d20kh1 = advantage)
+  NdSklK     roll N, keep the lowest K   (2d20kl1 = disadvantage)
+  NdSadv     roll the term twice, keep the higher total
+  NdSdis     roll the term twice, keep the lower total
+  C          flat modifier
+Examples: '1d8+3', '2d6+1d4+3', '1d20adv+5', '4d6kh3'.
+
+DiceExpr.pmf() gives the exact distribution of roll() / roll_crit() (markov_solver.py).
+"""
+
+import itertools
+import random
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+
+_TERM_RE = re.compile(r"([+-])(?:(\d*)d(\d+)(?:k([hl])(\d+)|(adv|dis))?|(\d+))")
+
+@dataclass(frozen=True, slots=True)
+class DiceTerm:
+    sign: int                 # +1 / -1
+    n: int
+    sides: int
+    keep: int | None = None   # keep K dice (None = keep all)
+    keep_high: bool = True
+    mode: str | None = None   # 'adv' / 'dis' (roll the term twice)
+
+    def roll(self, rng: random.Random, crit: bool = False) -> int:
+        n = self.n * 2 if crit else self.n
+        total = self._roll_once(rng, n, crit)
+        if self.mode is not None:
+            other = self._roll_once(rng, n, crit)
+            total = max(total, other) if self.mode == "adv" else min(total, other)
+        return self.sign * total
+
+    def pmf(self, crit: bool = False) -> dict[int, float]:
+        """
+        Exact distribution of roll(crit=crit): {total: probability}.
+        """
+        n = self.n * 2 if crit else self.n
+        if self.keep is None:
+            once = {0: 1.0}
+            for _ in range(n):
+                once = convolve_pmf(once, {f: 1 / self.sides for f in range(1, self.sides + 1)})
+        else:
+            keep = self.keep * 2 if crit else self.keep
+            once = defaultdict(float)
+            p = 1 / self.sides ** n
+            for rolls in itertools.product(range(1, self.sides + 1), repeat=n):
+                once[sum(sorted(rolls, reverse=self.keep_high)[:keep])] += p
+        if self.mode is not None:
+            # the better (adv) / worse (dis) of two independent totals
+            values = sorted(once)
+            cdf, acc = {}, 0.0
+            for v in values:
+                acc += once[v]
+                cdf[v] = acc
+            out, prev = {}, 0.0
+            for v in values:
+                c = cdf[v] ** 2 if self.mode == "adv" else 1 - (1 - cdf[v]) ** 2
+                out[v] = c - prev
+                prev = c
+            once = out
+        return {self.sign * v: p for v, p in once.items()}
+
+    def kept_min(self) -> int:
+        return self.keep if self.keep is not None else self.n
+
+    def kept_max(self) -> int:
+        return self.kept_min() * self.sides
+
+    def _roll_once(self, rng: random.Random, n: int, crit: bool) -> int:
+        sides = self.sides
+        if self.keep is None:
+            return sum(rng.randint(1, sides) for _ in range(n))
+        rolls = sorted((rng.randint(1, sides) for _ in range(n)), reverse=self.keep_high)
+        keep = self.keep * 2 if crit else self.keep
+        return sum(rolls[:keep])
+
+class DiceExpr:
+    """
+    A parsed dice expression. Build with parse_dice() so each string is parsed once.
+
+    n / sides describe the first dice term and mod is the sum of the flat modifiers,
+    which covers the usual 'NdS+M' damage strings.
+    """
+    __slots__ = ("expr", "terms", "mod", "n", "sides", "_simple")
+
+    def __init__(self, expr: str, terms: tuple[DiceTerm, ...], mod: int):
+        self.expr = expr
+        self.terms = terms
+        self.mod = mod
+        first = terms[0] if terms else None
+        self.n = first.n if first else 0
+        self.sides = first.sides if first else 0
+        # plain 'NdS+M': skip the generic term machinery in roll()/roll_crit()
+        simple = len(terms) == 1 and first.sign == 1 and first.keep is None and first.mode is None
+        self._simple = (first.n, first.sides) if simple else None
+
+    def __repr__(self):
+        return f"DiceExpr({self.expr!r})"
+
+    @property
+    def is_simple(self) -> bool:
+        """
+        True for plain 'NdS+M' (one dice term, no keep / adv / dis).
+        """
+        return self._simple is not None
+
+    def __eq__(self, other):
+        return isinstance(other, DiceExpr) and self.expr == other.expr
+
+    def __hash__(self):
+        return hash(self.expr)
+
+    def __reduce__(self):
+        # pickle as the string (worker processes re-parse through the cache)
+        return parse_dice, (self.expr,)
+
+    def roll(self, rng: random.Random) -> int:
+        if self._simple is not None:
+            n, sides = self._simple
+            randint = rng.randint
+            total = self.mod
+            for _ in range(n):
+                total += randint(1, sides)
+            return total
+        return sum(t.roll(rng) for t in self.terms) + self.mod
+
+    def roll_crit(self, rng: random.Random) -> int:
+        """
+        Crit: double the dice count, keep flat modifier the same (1d8+3 -> 2d8+3).
+        """
+        if self._simple is not None:
+            n, sides = self._simple
+            randint = rng.randint
+            total = self.mod
+            for _ in range(n * 2):
+                total += randint(1, sides)
+            return total
+        return sum(t.roll(rng, crit=True) for t in self.terms) + self.mod
+
+    def roll_advantage(self, rng: random.Random) -> int:
+        """
+        Roll the whole expression twice and keep the higher total.
+        """
+        return max(self.roll(rng), self.roll(rng))
+
+    def roll_disadvantage(self, rng: random.Random) -> int:
+        """
+        Roll the whole expression twice and keep the lower total.
+        """
+        return min(self.roll(rng), self.roll(rng))
+
+    def pmf(self, crit: bool = False) -> dict[int, float]:
+        """
+        Exact distribution of roll() (crit=True: roll_crit()), {total: probability} sorted by total.
+        """
+        return dict(_pmf(self, crit))
+
+    @property
+    def min(self) -> int:
+        return sum(t.kept_min() if t.sign > 0 else -t.kept_max() for t in self.terms) + self.mod
+
+    @property
+    def max(self) -> int:
+        return sum(t.kept_max() if t.sign > 0 else -t.kept_min() for t in self.terms) + self.mod
+
+def convolve_pmf(a: dict[int, float], b: dict[int, float]) -> dict[int, float]:
+    """
+    Distribution of the sum of two independent totals.
+    """
+    out = defaultdict(float)
+    for x, p in a.items():
+        for y, q in b.items():
+            out[x + y] += p * q
+    return dict(sorted(out.items()))
+
+@lru_cache(maxsize=256)
+def _pmf(expr: DiceExpr, crit: bool) -> tuple[tuple[int, float], ...]:
+    dist = {expr.mod: 1.0}
+    for t in expr.terms:
+        dist = convolve_pmf(dist, t.pmf(crit))
+    return tuple(dist.items())
+
+@lru_cache(maxsize=256)
+def parse_dice(expr: str) -> DiceExpr:
+    """
+    Parse (and cache) a dice expression like '2d6+3' or '2d6+1d4+3'.
+    """
+    text = expr.replace(" ", "").lower()
+    if not text:
+        raise ValueError(f"Bad dice expr: {expr}")
+    if text[0] not in "+-":
+        text = "+" + text
+
+    terms = []
+    mod = 0
+    pos = 0
+    while pos < len(text):
+        m = _TERM_RE.match(text, pos)
+        if not m:
+            raise ValueError(f"Bad dice expr: {expr}")
+        sign = -1 if m.group(1) == "-" else 1
+        if m.group(7) is not None:
+            mod += sign * int(m.group(7))
+        else:
+            n = int(m.group(2)) if m.group(2) else 1
+            sides = int(m.group(3))
+            keep = int(m.group(5)) if m.group(5) else None
+            if n < 1 or sides < 1 or (keep is not None and not 1 <= keep <= n):
+                raise ValueError(f"Bad dice expr: {expr}")
+            terms.append(DiceTerm(
+                sign=sign,
+                n=n,
+                sides=sides,
+                keep=keep,
+                keep_high=m.group(4) != "l",
+                mode=m.group(6),
+            ))
+        pos = m.end()
+
+    return DiceExpr(expr.replace(" ", ""), tuple(terms), mod)
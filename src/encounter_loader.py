@@ -0,0 +1,89 @@
+import sqlite3
+
+from combat_engine import ROUND_CAP_DEFAULT, Combatant, Encounter
+from targeting import get_policy
+
+# -------------------------
+# Encounter loading (once per batch, not once per run)
+# -------------------------
+
+MEMBERS_SQL = """
+    SELECT m.side, m.slot_name, m.pc_id, m.monster_key, m.quantity,
+           pc.pc_id, pc.ac, pc.max_hp, pc.dex_mod, pc.attack_bonus, pc.damage_dice,
+           pc.crits_on, pc.features_enabled,
+           mon.monster_key, mon.armor_class, mon.hit_points, mon.dex_mod, mon.attack_bonus,
+           mon.damage_dice
+    FROM encounter_template_member m
+    LEFT JOIN dim_pc_template pc ON pc.pc_id = m.pc_id
+    LEFT JOIN dim_monster mon ON mon.monster_key = m.monster_key
+    WHERE m.encounter_template_id = ?
+    ORDER BY m.side, m.slot_name;
+"""
+
+def load_encounter(conn: sqlite3.Connection, encounter_name: str) -> tuple[int, Encounter]:
+    """
+    Resolve an encounter_template into immutable Combatant specs with one query
+    for the members (dims joined in), so runs need no SQL at all.
+    Returns (encounter_template_id, Encounter), combatants in (side, slot_name) order.
+    """
+    row = conn.execute("""
+        SELECT encounter_template_id, round_cap, target_selection_pc, target_selection_mon
+        FROM encounter_template
+        WHERE name = ?;""",
+        (encounter_name,)
+    ).fetchone()
+    if not row:
+        raise RuntimeError(f"Encounter template not found: {encounter_name}")
+    et_id, round_cap = row[0], row[1] or ROUND_CAP_DEFAULT
+    target_pc, target_mon = row[2], row[3]
+    for policy in (target_pc, target_mon):
+        get_policy(policy)  # fail here, not in the middle of a batch
+
+    members = conn.execute(MEMBERS_SQL, (et_id,)).fetchall()
+    if not members:
+        raise RuntimeError("No encounter members found.")
+
+    combatants = []
+    for (side, slot_name, pc_id, monster_key, quantity,
+         pc_found, pc_ac, pc_hp, pc_dex_mod, pc_atk, pc_dice, pc_crits_on, pc_features,
+         mon_found, mon_ac, mon_hp, mon_dex_mod, mon_atk, mon_dice) in members:
+        quantity = int(quantity) if quantity is not None else 1
+        if pc_id is not None:
+            if pc_found is None:
+                raise RuntimeError(f"PC template missing: {pc_id}")
+            if quantity != 1:
+                raise RuntimeError(f"Grouped members are monsters only: {slot_name} has quantity {quantity}")
+            combatants.append(Combatant(
+                name=slot_name,
+                side="party",
+                template_type="pc",
+                pc_id=pc_id,
+                monster_key=None,
+                ac=int(pc_ac),
+                hp_start=int(pc_hp),
+                init_mod=int(pc_dex_mod),
+                attack_bonus=int(pc_atk),
+                damage_dice=str(pc_dice),
+                crits_on=str(pc_crits_on),
+                features=str(pc_features) if pc_features is not None else "",
+            ))
+        else:
+            if mon_found is None:
+                raise RuntimeError(f"Monster missing: monster_key={monster_key}")
+            combatants.append(Combatant(
+                name=slot_name,
+                side="monsters",
+                template_type="monster",
+                pc_id=None,
+                monster_key=int(monster_key),
+                ac=int(mon_ac),
+                hp_start=int(mon_hp),
+                init_mod=int(mon_dex_mod) if mon_dex_mod is not None else 0,
+                attack_bonus=int(mon_atk) if mon_atk is not None else 0,
+                damage_dice=str(mon_dice) if mon_dice is not None else "1d4+0",
+                crits_on="20",  # monsters crit only on nat 20
+                quantity=quantity,  # >1: one initiative and one participant_run row for the whole group
+            ))
+
+    return et_id, Encounter(combatants=tuple(combatants), round_cap=round_cap,
+                            target_selection_pc=target_pc, target_selection_mon=target_mon)
@@ -0,0 +1,103 @@
+"""
+Per-attack event log in a compact binary format (optional, simulate_combat.py --event-log DIR).
+
+One file pair per batch, both append-only and fixed-width:
+
+    <dir>/batch_<batch_id>.events   one RECORD per attack roll, runs back to back in run order
+    <dir>/batch_<batch_id>.idx      one INDEX_RECORD per run: (byte offset, event count)
+
+A run is addressed by its index in the batch (0-based, in run_id order, which is the order
+the runs were simulated), so finding it is one seek into the .idx file. replay_battle.py maps a
+run_id to that index through simulation_run. With NumPy the whole file loads in one call:
+
+    np.fromfile(path, dtype=np.dtype(RECORD_DTYPE))
+"""
+
+import struct
+from pathlib import Path
+
+from combat_engine import (EVENT_ADVANTAGE, EVENT_CRIT, EVENT_HIT, EVENT_HUNTERS_MARK,
+                           EVENT_OPENING_BURST)
+
+# round, actor slot, target slot, d20, flags (combat_engine.EVENT_*), damage: 10 bytes
+RECORD = struct.Struct("<HHHBBH")
+RECORD_FIELDS = ("round", "actor", "target", "d20", "flags", "damage")
+RECORD_DTYPE = [("round", "<u2"), ("actor", "<u2"), ("target", "<u2"),
+                ("d20", "u1"), ("flags", "u1"), ("damage", "<u2")]
+
+# byte offset into the .events file, number of records
+INDEX_RECORD = struct.Struct("<QI")
+
+FLAG_NAMES = (
+    (EVENT_HIT, "hit"),
+    (EVENT_CRIT, "crit"),
+    (EVENT_ADVANTAGE, "advantage"),
+    (EVENT_HUNTERS_MARK, "hunters_mark"),
+    (EVENT_OPENING_BURST, "opening_burst"),
+)
+
+# -------------------------
+# Records
+# -------------------------
+
+def pack_events(events: list[tuple]) -> bytes:
+    """
+    simulate_battle(events=...) tuples -> packed records (done in the worker, so only bytes cross processes).
+    """
+    pack = RECORD.pack
+    return b"".join([pack(*e) for e in events])
+
+def unpack_events(data: bytes) -> list[tuple]:
+    return list(RECORD.iter_unpack(data))
+
+def flag_names(flags: int) -> list[str]:
+    return [name for bit, name in FLAG_NAMES if flags & bit]
+
+def log_paths(directory: Path, batch_id: int) -> tuple[Path, Path]:
+    directory = Path(directory)
+    return directory / f"batch_{batch_id}.events", directory / f"batch_{batch_id}.idx"
+
+# -------------------------
+# Writer / reader
+# -------------------------
+
+class EventLogWriter:
+    """
+    Appends each run's packed events and its index entry, in the order runs are added.
+    """
+
+    def __init__(self, directory: Path, batch_id: int):
+        events_path, index_path = log_paths(directory, batch_id)
+        events_path.parent.mkdir(parents=True, exist_ok=True)
+        if events_path.exists() or index_path.exists():
+            # batch_ids are never reused in one database, so this is a log from another database
+            raise FileExistsError(f"Event log for batch {batch_id} already exists in {events_path.parent}")
+        self._events = open(events_path, "ab")
+        self._index = open(index_path, "ab")
+        self.offset = 0
+        self.runs = 0
+
+    def add_run(self, packed: bytes):
+        self._events.write(packed)
+        self._index.write(INDEX_RECORD.pack(self.offset, len(packed) // RECORD.size))
+        self.offset += len(packed)
+        self.runs += 1
+
+    def close(self):
+        self._events.close()
+        self._index.close()
+
+def read_run(directory: Path, batch_id: int, run_index: int) -> list[tuple]:
+    """
+    Events of one run (tuples in RECORD_FIELDS order).
+    """
+    events_path, index_path = log_paths(directory, batch_id)
+    with open(index_path, "rb") as f:
+        f.seek(run_index * INDEX_RECORD.size)
+        raw = f.read(INDEX_RECORD.size)
+    if run_index < 0 or len(raw) < INDEX_RECORD.size:
+        raise IndexError(f"Run index {run_index} not in the event log of batch {batch_id}")
+    offset, count = INDEX_RECORD.unpack(raw)
+    with open(events_path, "rb") as f:
+        f.seek(offset)
+        return unpack_events(f.read(count * RECORD.size))
@@ -0,0 +1,263 @@
+"""
+Exact initiative-order probabilities, computed from the d20 faces instead of sampled.
+
+Initiative is d20 + init_mod per combatant, sorted by total, then init_mod, then a random
+tie-break (combat_engine.roll_initiative). Totals are independent and uniform over 20
+values, so the marginals below are finite sums / small DPs, done with Fractions:
+
+    pairwise_before(a, b)        P(a acts before b)
+    position_distribution(cs)    P(combatant i gets init_order k), for every i and k
+    acts_before_all(a, others)   P(a acts before every combatant in others)
+    side_sum_distribution(cs)    distribution of a side's initiative sum (A-2 / A-3 x-axis)
+    order_distribution(cs)       P(exact turn order), for small encounters
+
+    python src/initiative_exact.py                 # write init_exact_* tables
+    python src/initiative_exact.py --check 200000  # compare with roll_initiative sampling
+
+The init_exact_* tables replace the initiative-only Monte Carlo run (simulate_initiative_only.py).
+"""
+
+import argparse
+import random
+import sqlite3
+import sys
+from collections import defaultdict
+from fractions import Fraction
+from pathlib import Path
+
+from combat_engine import Combatant, CombatantState, roll_initiative
+from encounter_loader import load_encounter
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DB_PATH = PROJECT_ROOT / "db" / "dnd_initiative_work.sqlite"
+
+ENCOUNTER_NAME = "L3 Trio vs 4 Goblins + 1 Bugbear"
+
+D20 = Fraction(1, 20)
+
+# -------------------------
+# Single combatants
+# -------------------------
+
+def _compare_given_total(a: Combatant, total: int, b: Combatant) -> tuple[Fraction, Fraction]:
+    """
+    Given a's initiative total, P(b is sorted strictly ahead of a) and P(b is fully tied
+    with a, i.e. same total and same init_mod, so the random tie-break decides).
+    """
+    ahead = tie = Fraction(0)
+    for face in range(1, 21):
+        b_total = face + b.init_mod
+        if b_total > total or (b_total == total and b.init_mod > a.init_mod):
+            ahead += D20
+        elif b_total == total and b.init_mod == a.init_mod:
+            tie += D20
+    return ahead, tie
+
+def pairwise_before(a: Combatant, b: Combatant) -> Fraction:
+    """
+    P(a acts before b).
+    """
+    p = Fraction(0)
+    for face in range(1, 21):
+        ahead, tie = _compare_given_total(a, face + a.init_mod, b)
+        p += D20 * (1 - ahead - tie / 2)
+    return p
+
+def _ahead_tie_distribution(a: Combatant, total: int, others: list[Combatant]) -> dict:
+    """
+    Given a's total: {(n_ahead, n_tied): probability} over the other combatants.
+    """
+    dist = {(0, 0): Fraction(1)}
+    for b in others:
+        ahead, tie = _compare_given_total(a, total, b)
+        behind = 1 - ahead - tie
+        nxt = defaultdict(Fraction)
+        for (n_ahead, n_tied), p in dist.items():
+            if ahead:
+                nxt[(n_ahead + 1, n_tied)] += p * ahead
+            if tie:
+                nxt[(n_ahead, n_tied + 1)] += p * tie
+            if behind:
+                nxt[(n_ahead, n_tied)] += p * behind
+        dist = nxt
+    return dist
+
+def position_distribution(combatants: tuple[Combatant, ...]) -> dict[str, list[Fraction]]:
+    """
+    name -> [P(init_order = 1), ..., P(init_order = C)].
+    Among r fully tied rivals the random tie-break puts a uniformly in one of r + 1 places.
+    """
+    n = len(combatants)
+    out = {}
+    for i, a in enumerate(combatants):
+        others = [b for j, b in enumerate(combatants) if j != i]
+        probs = [Fraction(0)] * n
+        for face in range(1, 21):
+            for (n_ahead, n_tied), p in _ahead_tie_distribution(a, face + a.init_mod, others).items():
+                share = D20 * p / (n_tied + 1)
+                for extra in range(n_tied + 1):
+                    probs[n_ahead + extra] += share
+        out[a.name] = probs
+    return out
+
+def acts_before_all(a: Combatant, others: list[Combatant]) -> Fraction:
+    """
+    P(a acts before every combatant in others), e.g. the Rogue before all monsters.
+    """
+    p = Fraction(0)
+    for face in range(1, 21):
+        for (n_ahead, n_tied), q in _ahead_tie_distribution(a, face + a.init_mod, others).items():
+            if n_ahead == 0:
+                p += D20 * q / (n_tied + 1)
+    return p
+
+def side_sum_distribution(combatants: tuple[Combatant, ...], side: str = "party") -> dict[int, Fraction]:
+    """
+    Distribution of the sum of init_total over one side (convolution of uniform d20s).
+    """
+    dist = {0: Fraction(1)}
+    for c in combatants:
+        if c.side != side:
+            continue
+        nxt = defaultdict(Fraction)
+        for s, p in dist.items():
+            for face in range(1, 21):
+                nxt[s + face + c.init_mod] += p * D20
+        dist = nxt
+    return dict(sorted(dist.items()))
+
+def order_distribution(combatants: tuple[Combatant, ...]) -> dict[tuple[str, ...], float]:
+    """
+    P(exact turn order) for every permutation, e.g. to weight per-order results (markov_solver.py).
+    The keys (total, init_mod) must be non-increasing along the order, and a run of r equal
+    keys is ordered by the tie-break in one of r! equally likely ways. The DP over
+    (last key, length of its tie run) is shared by orders with the same prefix.
+    Floats, not Fractions: n! orders get expensive quickly, keep n small.
+    """
+    faces = [[((face + c.init_mod, c.init_mod), 1 / 20) for face in range(1, 21)] for c in combatants]
+    out = {}
+
+    def extend(prefix: tuple[int, ...], dp: dict):
+        if len(prefix) == len(combatants):
+            out[tuple(combatants[i].name for i in prefix)] = sum(dp.values())
+            return
+        for i in range(len(combatants)):
+            if i in prefix:
+                continue
+            nxt = defaultdict(float)
+            for (last, run), w in dp.items():
+                for key, p in faces[i]:
+                    if last is None or key < last:
+                        nxt[(key, 1)] += w * p
+                    elif key == last:
+                        nxt[(key, run + 1)] += w * p / (run + 1)
+            if nxt:
+                extend(prefix + (i,), nxt)
+
+    extend((), {(None, 0): 1.0})
+    return out
+
+# -------------------------
+# Tables
+# -------------------------
+
+def write_tables(conn: sqlite3.Connection, encounter_template_id: int, combatants: tuple[Combatant, ...]):
+    """
+    Replace this encounter's rows in init_exact_pairwise / _position / _side_sum.
+    """
+    pairwise = [
+        (encounter_template_id, a.name, b.name, float(pairwise_before(a, b)))
+        for a in combatants for b in combatants if a is not b
+    ]
+    positions = [
+        (encounter_template_id, name, k, float(p))
+        for name, probs in position_distribution(combatants).items()
+        for k, p in enumerate(probs, start=1)
+    ]
+    sums = [
+        (encounter_template_id, side, s, float(p))
+        for side in ("party", "monsters")
+        for s, p in side_sum_distribution(combatants, side).items()
+    ]
+
+    try:
+        for table in ("init_exact_pairwise", "init_exact_position", "init_exact_side_sum"):
+            conn.execute(f"DELETE FROM {table} WHERE encounter_template_id = ?;", (encounter_template_id,))
+        conn.executemany("""
+            INSERT INTO init_exact_pairwise (encounter_template_id, name_a, name_b, p_a_before_b)
+            VALUES (?, ?, ?, ?);
+        """, pairwise)
+        conn.executemany("""
+            INSERT INTO init_exact_position (encounter_template_id, name, init_order, probability)
+            VALUES (?, ?, ?, ?);
+        """, positions)
+        conn.executemany("""
+            INSERT INTO init_exact_side_sum (encounter_template_id, side, init_sum, probability)
+            VALUES (?, ?, ?, ?);
+        """, sums)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(pairwise), len(positions), len(sums)
+
+# -------------------------
+# Monte Carlo cross-check
+# -------------------------
+
+def sampling_check(combatants: tuple[Combatant, ...], runs: int, seed: int = 1):
+    """
+    Max absolute difference between the exact position probabilities and roll_initiative sampling.
+    """
+    rng = random.Random(seed)
+    counts = defaultdict(int)
+    for _ in range(runs):
+        states = [CombatantState(c) for c in combatants]
+        for st in roll_initiative(states, rng):
+            counts[(st.spec.name, st.init_order)] += 1
+
+    worst = 0.0
+    for name, probs in position_distribution(combatants).items():
+        for k, p in enumerate(probs, start=1):
+            worst = max(worst, abs(counts[(name, k)] / runs - float(p)))
+    return worst
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Exact initiative-order probabilities.")
+    parser.add_argument("--check", type=int, metavar="RUNS", help="compare with sampled initiative instead of writing tables")
+    parser.add_argument("--encounter", default=ENCOUNTER_NAME)
+    parser.add_argument("--db", type=Path, default=DB_PATH)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    conn = sqlite3.connect(args.db, timeout=30)
+    conn.execute("PRAGMA foreign_keys = ON;")
+    conn.execute("PRAGMA busy_timeout = 30000;")
+
+    et_id, encounter = load_encounter(conn, args.encounter)
+    combatants = encounter.combatants
+
+    if args.check:
+        conn.close()
+        worst = sampling_check(combatants, args.check)
+        # binomial std error of a single probability is at most 0.5 / sqrt(runs)
+        limit = 4 * 0.5 / args.check ** 0.5
+        print(f"max |sampled - exact| position probability over {args.check} runs: {worst:.5f} (limit {limit:.5f})")
+        print("✅ exact tables match sampling" if worst <= limit else "❌ exact tables differ from sampling")
+        sys.exit(0 if worst <= limit else 1)
+
+    by_name = {c.name: c for c in combatants}
+    if "Rogue" in by_name and "Bugbear" in by_name:
+        print(f"P(Rogue acts before Bugbear) = {float(pairwise_before(by_name['Rogue'], by_name['Bugbear'])):.4f}")
+    positions = position_distribution(combatants)
+    p_party_first = sum(positions[c.name][0] for c in combatants if c.side == "party")
+    print(f"P(a party member acts first) = {float(p_party_first):.4f}")
+
+    n_pair, n_pos, n_sum = write_tables(conn, et_id, combatants)
+    conn.close()
+    print(f"✅ Exact initiative tables written for encounter_template_id={et_id} "
+          f"({n_pair} pairwise, {n_pos} position, {n_sum} side-sum rows).")
+
+if __name__ == "__main__":
+    main()
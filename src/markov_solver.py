@@ -0,0 +1,383 @@
+"""
+Exact battle outcomes for small encounters: dynamic programming over battle states instead of
+sampling, to cross-check the Monte Carlo engine.
+
+For a fixed turn order the battle is a Markov chain. A state is every combatant's HP, the
+Hunter's Mark target and whether the opening burst is still available; whose turn it is and the
+round are the step of the chain. The solver pushes the probability of every reachable state
+forward one turn at a time, merging paths that reach the same state (the memo), and absorbs
+states where a side is down. It follows combat_engine.simulate_battle rule for rule:
+
+    - dead combatants skip their turn and are never targeted (HP 0 is the alive mask)
+    - targets come from the same policies: bugbear_first, lowest_hp (ties to the earlier
+      actor) and random (a uniform branch); threat / weighted_random depend on damage
+      history and are not supported, nor are grouped members
+    - d20 faces (max of two with Assassinate advantage) split into miss / hit / crit, and each
+      hit uses the damage PMF of (dice, crit, Hunter's Mark, opening burst), convolved once
+    - HP buckets: when the other side's policy ignores HP, every HP at or below the smallest
+      possible hit is one state (any hit kills), which is exact
+
+Over initiative, each turn order is solved and weighted by its exact probability
+(initiative_exact.order_distribution). That is n! orders, so it is for small templates
+(--max-orders); a larger encounter can be solved for one given order (--order), which the
+Monte Carlo engine can match with Encounter.acts_first.
+
+    python src/markov_solver.py --encounter "..." --check 20000
+    python src/markov_solver.py --order Rogue,Bugbear,Fighter,Goblin_1,Ranger,Goblin_2,Goblin_3,Goblin_4
+"""
+
+import argparse
+import math
+import random
+import sqlite3
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+
+from combat_engine import HUNTERS_MARK_DICE, OPENING_BURST_DICE, Encounter, simulate_battle
+from dice import convolve_pmf
+from encounter_loader import load_encounter
+from initiative_exact import order_distribution
+from parallel_runner import ParallelRunner
+from simulate_combat import ENCOUNTER_NAME, derive_seed
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DB_PATH = PROJECT_ROOT / "db" / "dnd_initiative_work.sqlite"
+
+SUPPORTED_POLICIES = ("bugbear_first", "lowest_hp", "random")
+MAX_ORDERS = 720  # 6 combatants
+
+@dataclass
+class ExactResult:
+    p_party: float = 0.0
+    p_monsters: float = 0.0
+    p_timeout: float = 0.0
+    expected_rounds: float = 0.0
+    expected_damage_party: float = 0.0
+    expected_damage_monsters: float = 0.0
+    damage_dealt: dict = field(default_factory=dict)   # slot name -> expected damage dealt
+    survival: dict = field(default_factory=dict)       # slot name -> P(alive at the end)
+    orders: int = 0
+    max_states: int = 0                                # largest frontier of distinct states
+
+    def add(self, other: "ExactResult", weight: float):
+        """
+        Accumulate another (per-order) result with probability weight.
+        """
+        self.p_party += weight * other.p_party
+        self.p_monsters += weight * other.p_monsters
+        self.p_timeout += weight * other.p_timeout
+        self.expected_rounds += weight * other.expected_rounds
+        self.expected_damage_party += weight * other.expected_damage_party
+        self.expected_damage_monsters += weight * other.expected_damage_monsters
+        for name, v in other.damage_dealt.items():
+            self.damage_dealt[name] = self.damage_dealt.get(name, 0.0) + weight * v
+        for name, v in other.survival.items():
+            self.survival[name] = self.survival.get(name, 0.0) + weight * v
+        self.orders += other.orders
+        self.max_states = max(self.max_states, other.max_states)
+
+# -------------------------
+# One turn order
+# -------------------------
+
+class BattleChain:
+    """
+    The battle for one fixed turn order (slot names, first to act first).
+    """
+
+    def __init__(self, encounter: Encounter, order: tuple[str, ...]):
+        by_name = {c.name: c for c in encounter.combatants}
+        if sorted(order) != sorted(by_name):
+            raise ValueError(f"order must list every slot once: {sorted(by_name)}")
+        for policy in (encounter.target_selection_pc, encounter.target_selection_mon):
+            if policy not in SUPPORTED_POLICIES:
+                raise ValueError(f"exact solver supports {', '.join(SUPPORTED_POLICIES)} targeting, got {policy}")
+        self.encounter = encounter
+        self.specs = [by_name[name] for name in order]  # position = init_order - 1
+        for c in self.specs:
+            if c.quantity > 1:
+                raise ValueError(f"exact solver does not support grouped members, {c.name} has quantity {c.quantity}")
+        self.party = [i for i, c in enumerate(self.specs) if c.side == "party"]
+        self.monsters = [i for i, c in enumerate(self.specs) if c.side == "monsters"]
+        self.policy = {"party": encounter.target_selection_pc, "monsters": encounter.target_selection_mon}
+        self.opponents = {"party": self.monsters, "monsters": self.party}
+        self.priority = {
+            side: sorted(targets, key=lambda i: (self.specs[i].name != "Bugbear",
+                                                 not self.specs[i].name.startswith("Goblin_"),
+                                                 self.specs[i].name))
+            for side, targets in self.opponents.items()
+        }
+        # HP buckets: HP at or below the smallest possible hit all behave like 1 HP,
+        # as long as the attacking side's policy never looks at HP
+        self.bucket = []
+        for c in self.specs:
+            attackers = [a for a in self.specs if a.side != c.side]
+            floor = 0
+            if self.policy["party" if c.side == "monsters" else "monsters"] != "lowest_hp" and attackers:
+                floor = max(0, min(min(a.damage.pmf()) for a in attackers))
+            self.bucket.append(floor)
+        self._attacks = {}
+        self._hp_after = {}
+        self._targets = {"party": {}, "monsters": {}}  # side -> {HP tuple: (pick(), one target left)}
+
+    def _hp(self, pos: int, hp: int) -> int:
+        return 1 if 0 < hp <= self.bucket[pos] else max(0, hp)
+
+    def pick(self, side: str, hps: tuple) -> list[tuple[int, float]]:
+        """
+        [(target position, probability)] for an attacker on `side`.
+        """
+        policy = self.policy[side]
+        if policy == "bugbear_first":
+            for i in self.priority[side]:
+                if hps[i] > 0:
+                    return [(i, 1.0)]
+            return []
+        alive = [i for i in self.opponents[side] if hps[i] > 0]
+        if policy == "lowest_hp":
+            return [(min(alive, key=lambda i: (hps[i], i)), 1.0)] if alive else []
+        return [(i, 1 / len(alive)) for i in alive]
+
+    def attack(self, actor: int, target: int, adv: bool, hm: bool, ob: bool) -> tuple[list, float]:
+        """
+        ([(damage, probability)] over hits, expected damage) for one attack roll; misses are the rest.
+        """
+        key = (actor, target, adv, hm, ob)
+        cached = self._attacks.get(key)
+        if cached is not None:
+            return cached
+        a, t = self.specs[actor], self.specs[target]
+        hit_p = crit_p = 0.0
+        for face in range(1, 21):
+            p = (face * face - (face - 1) ** 2) / 400 if adv else 1 / 20
+            if face + a.attack_bonus >= t.ac:
+                if face >= a.crit_min:
+                    crit_p += p
+                else:
+                    hit_p += p
+        dist = defaultdict(float)
+        for crit, p_roll in ((False, hit_p), (True, crit_p)):
+            if not p_roll:
+                continue
+            pmf = a.damage.pmf(crit)
+            if hm:
+                pmf = convolve_pmf(pmf, HUNTERS_MARK_DICE.pmf(crit))
+            if ob:
+                pmf = convolve_pmf(pmf, OPENING_BURST_DICE.pmf())  # bonus dice do not crit
+            for dmg, p in pmf.items():
+                dist[dmg] += p_roll * p
+        outcomes = sorted(dist.items())
+        result = (outcomes, sum(d * p for d, p in outcomes))
+        self._attacks[key] = result
+        return result
+
+    def hp_after(self, attack_key: tuple, hp: int) -> list[tuple[int, bool, float]]:
+        """
+        [(target HP after the attack, hit, probability)] including the miss, with all killing
+        hits (and all hits landing in one HP bucket) merged into one outcome.
+        """
+        key = attack_key + (hp,)
+        cached = self._hp_after.get(key)
+        if cached is not None:
+            return cached
+        target = attack_key[1]
+        dist = defaultdict(float)
+        missed = 1.0
+        for dmg, p in self.attack(*attack_key)[0]:
+            dist[self._hp(target, hp - dmg)] += p
+            missed -= p
+        result = [(new_hp, True, p) for new_hp, p in sorted(dist.items())]
+        if missed > 1e-15:
+            result.append((hp, False, missed))
+        self._hp_after[key] = result
+        return result
+
+    def solve(self) -> ExactResult:
+        specs, n = self.specs, len(self.specs)
+        res = ExactResult(orders=1)
+        dealt = [0.0] * n
+        survival = [0.0] * n
+        start = tuple(self._hp(i, c.hp_total) for i, c in enumerate(specs))
+        dist = {(start, -1, True): 1.0}  # (HP by position, Hunter's Mark target, opening burst available)
+
+        def absorb(hps: tuple, mass: float, winner: str, round_no: int):
+            if winner == "party":
+                res.p_party += mass
+            else:
+                res.p_monsters += mass
+            res.expected_rounds += mass * round_no
+            for i in range(n):
+                if hps[i] > 0:
+                    survival[i] += mass
+
+        for round_no in range(1, self.encounter.round_cap + 1):
+            for actor, a in enumerate(specs):
+                side = a.side
+                other = self.opponents[side]
+                targets = self._targets[side]
+                nxt = defaultdict(float)
+                for (hps, marked, ob), mass in dist.items():
+                    if hps[actor] <= 0:
+                        nxt[(hps, marked, ob)] += mass
+                        continue
+                    # the Ranger marks the creature it attacks in round 1
+                    cast = a.has_hunters_mark and round_no == 1
+                    picks = targets.get(hps)
+                    if picks is None:
+                        # the last one standing on the other side: a kill ends the battle
+                        picks = targets[hps] = (self.pick(side, hps), sum(hps[i] > 0 for i in other) == 1)
+                    for target, p_target in picks[0]:
+                        mark = target if cast else marked
+                        m = mass * p_target
+                        adv = a.has_assassinate_advantage and round_no == 1 and target > actor
+                        burst = a.has_opening_burst and ob and adv
+                        key = (actor, target, adv, a.has_hunters_mark and mark == target, burst)
+                        dealt[actor] += m * self.attack(*key)[1]
+                        hp, last = hps[target], picks[1]
+                        for new_hp, hit, p in self.hp_after(key, hp):
+                            new = hps[:target] + (new_hp,) + hps[target + 1:]
+                            if new_hp == 0 and last:
+                                absorb(new, m * p, side, round_no)
+                            else:
+                                # a hit with the burst uses it up
+                                nxt[(new, mark, ob and not (burst and hit))] += m * p
+                dist = nxt
+                res.max_states = max(res.max_states, len(dist))
+            if round_no == 1:
+                # advantage (and so the opening burst) only exists in round 1
+                merged = defaultdict(float)
+                for (hps, marked, _), mass in dist.items():
+                    merged[(hps, marked, False)] += mass
+                dist = merged
+            if not dist:
+                break
+
+        for (hps, _, _), mass in dist.items():
+            res.p_timeout += mass
+            res.expected_rounds += mass * self.encounter.round_cap
+            for i in range(n):
+                if hps[i] > 0:
+                    survival[i] += mass
+        res.damage_dealt = {c.name: dealt[i] for i, c in enumerate(specs)}
+        res.survival = {c.name: survival[i] for i, c in enumerate(specs)}
+        res.expected_damage_party = sum(dealt[i] for i in self.party)
+        res.expected_damage_monsters = sum(dealt[i] for i in self.monsters)
+        return res
+
+# -------------------------
+# Over initiative
+# -------------------------
+
+def solve_order(encounter: Encounter, order: tuple[str, ...]) -> ExactResult:
+    """
+    Also the ParallelRunner task: orders are independent, so they spread over worker processes.
+    """
+    return BattleChain(encounter, order).solve()
+
+def solve_encounter(encounter: Encounter, max_orders: int = MAX_ORDERS, workers: int = 1) -> ExactResult:
+    """
+    Every turn order solved and weighted by its initiative probability (acts_first applied).
+    """
+    n = len(encounter.combatants)
+    if math.factorial(n) > max_orders:
+        raise ValueError(f"{n} combatants have {math.factorial(n)} turn orders (limit {max_orders}); "
+                         "solve one order instead")
+    weights = defaultdict(float)
+    first = encounter.acts_first
+    for order, p in order_distribution(encounter.combatants).items():
+        if first:
+            order = first + tuple(name for name in order if name not in first)
+        weights[order] += p
+    total = ExactResult()
+    with ParallelRunner(solve_order, encounter, workers=workers) as runner:
+        for res, p in zip(runner.map(list(weights)), weights.values()):
+            total.add(res, p)
+    return total
+
+# -------------------------
+# Monte Carlo cross-check
+# -------------------------
+
+def monte_carlo(encounter: Encounter, runs: int, master_seed: int) -> dict[str, list[float]]:
+    """
+    Per-run values of the checked metrics from the scalar engine.
+    """
+    values = defaultdict(list)
+    for i in range(runs):
+        r = simulate_battle(encounter, random.Random(derive_seed(master_seed, i)))
+        values["p_party"].append(float(r.winner == "party"))
+        values["p_monsters"].append(float(r.winner == "monsters"))
+        values["expected_rounds"].append(r.rounds_taken)
+        values["expected_damage_party"].append(r.total_damage_party)
+        values["expected_damage_monsters"].append(r.total_damage_monsters)
+    return values
+
+def check(exact: ExactResult, values: dict[str, list[float]], limit: float = 4.0) -> bool:
+    ok = True
+    for metric, xs in values.items():
+        n = len(xs)
+        mean = sum(xs) / n
+        sd = math.sqrt(max(0.0, sum((x - mean) ** 2 for x in xs) / (n - 1)))
+        target = getattr(exact, metric)
+        z = (mean - target) / (sd / math.sqrt(n)) if sd > 0 else (0.0 if mean == target else math.inf)
+        ok &= abs(z) <= limit
+        print(f"  {metric:<26} exact={target:.4f}  sampled={mean:.4f}  z={z:+.2f}")
+    return ok
+
+def print_result(res: ExactResult):
+    print(f"P(party wins)    = {res.p_party:.6f}")
+    print(f"P(monsters win)  = {res.p_monsters:.6f}")
+    print(f"P(timeout)       = {res.p_timeout:.6f}")
+    print(f"E[rounds]        = {res.expected_rounds:.4f}")
+    print(f"E[damage] party  = {res.expected_damage_party:.4f}, monsters = {res.expected_damage_monsters:.4f}")
+    for name in sorted(res.survival):
+        print(f"  {name:<10} E[damage dealt]={res.damage_dealt[name]:.3f}  P(alive at end)={res.survival[name]:.4f}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Exact win probability / rounds / damage for small encounters.")
+    parser.add_argument("--order", default=None, help="solve this turn order only (slot names, comma-separated)")
+    parser.add_argument("--max-orders", type=int, default=MAX_ORDERS,
+                        help=f"refuse to enumerate more turn orders than this (default {MAX_ORDERS})")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes for the turn orders (default 1 = no pool)")
+    parser.add_argument("--check", type=int, metavar="RUNS", help="also compare with this many Monte Carlo runs")
+    parser.add_argument("--seed", type=int, default=1, help="master seed for --check (default 1)")
+    parser.add_argument("--encounter", default=ENCOUNTER_NAME, help="encounter_template.name")
+    parser.add_argument("--db", type=Path, default=DB_PATH, help="SQLite database path")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.workers < 1 or (args.check is not None and args.check < 2):
+        raise SystemExit("--workers must be >= 1 and --check >= 2")
+    conn = sqlite3.connect(args.db, timeout=30)
+    _, encounter = load_encounter(conn, args.encounter)
+    conn.close()
+
+    t = time.perf_counter()
+    try:
+        if args.order is not None:
+            order = tuple(args.order.split(","))
+            res = solve_order(encounter, order)
+            # the engine reproduces a fixed order with acts_first
+            encounter = replace(encounter, acts_first=order)
+        else:
+            res = solve_encounter(encounter, args.max_orders, args.workers)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    elapsed = time.perf_counter() - t
+
+    print(f"Exact solution for {args.encounter!r}: {res.orders} turn order(s), "
+          f"largest frontier {res.max_states:,} states, {elapsed * 1000:.0f} ms")
+    print_result(res)
+
+    if args.check:
+        print(f"Monte Carlo check, {args.check} runs:")
+        ok = check(res, monte_carlo(encounter, args.check, args.seed))
+        print("✅ engine matches the exact solution" if ok else "❌ engine differs from the exact solution")
+        sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+One-off migration for databases created before simulation_batch existed.
+
+Adds simulation_batch, simulation_run.batch_id and agg_study.batch_id (+ indexes), then
+backfills: every distinct (encounter_template_id, notes_flags_json) among the old runs
+becomes one batch. phase / engine / master_seed come from the JSON where present and the
+remaining keys become params_json, as start_batch() writes it; the runs are linked by their
+notes blob. Safe to run more than once.
+"""
+
+import json
+import sqlite3
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DB_PATH = PROJECT_ROOT / "db" / "dnd_initiative_work.sqlite"
+
+BATCH_DDL = """
+CREATE TABLE IF NOT EXISTS simulation_batch (
+  batch_id               INTEGER PRIMARY KEY,
+  encounter_template_id  INTEGER NOT NULL,
+  phase                  TEXT NOT NULL,
+  engine                 TEXT,
+  engine_version         TEXT,
+  master_seed            INTEGER,
+  params_json            TEXT,
+  runs                   INTEGER,
+  started_at_utc         TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
+  finished_at_utc        TEXT,
+  FOREIGN KEY (encounter_template_id) REFERENCES encounter_template(encounter_template_id)
+);
+"""
+
+def has_column(conn: sqlite3.Connection, table: str, column: str) -> bool:
+    return any(r[1] == column for r in conn.execute(f"PRAGMA table_info({table});"))
+
+def has_table(conn: sqlite3.Connection, table: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?;", (table,)).fetchone() is not None
+
+def batch_fields(notes: str | None, runs: int) -> tuple:
+    """
+    Old notes blob -> (phase, engine, master_seed, params) in the shape start_batch() writes:
+    phase / engine / master_seed get their own columns, the other keys (e.g. targets) go to params.
+    """
+    try:
+        flags = json.loads(notes) if notes is not None else {}
+    except ValueError:
+        flags = None
+    if not isinstance(flags, dict):
+        # not a JSON object: keep the text so nothing is lost
+        return "unknown", None, None, {"runs": runs, "notes": notes}
+    phase = flags.pop("phase", None) or "unknown"
+    # runs from before the vector engine only recorded an engine when it was not the scalar one
+    engine = flags.pop("engine", "scalar" if phase == "combat" else None)
+    master_seed = flags.pop("master_seed", None)
+    return phase, engine, master_seed, {"runs": runs, **flags}
+
+def main():
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.execute("PRAGMA foreign_keys = ON;")
+    conn.execute("PRAGMA busy_timeout = 30000;")
+
+    try:
+        conn.execute("BEGIN IMMEDIATE;")
+        conn.execute(BATCH_DDL)
+        if not has_column(conn, "simulation_run", "batch_id"):
+            conn.execute("ALTER TABLE simulation_run ADD COLUMN batch_id INTEGER REFERENCES simulation_batch(batch_id);")
+        if has_table(conn, "agg_study") and not has_column(conn, "agg_study", "batch_id"):
+            conn.execute("ALTER TABLE agg_study ADD COLUMN batch_id INTEGER REFERENCES simulation_batch(batch_id);")
+
+        # one batch per distinct notes blob (old runs have no other experiment key)
+        groups = conn.execute("""
+            SELECT encounter_template_id, notes_flags_json, COUNT(*), MIN(created_at_utc), MAX(created_at_utc)
+            FROM simulation_run
+            WHERE batch_id IS NULL
+            GROUP BY encounter_template_id, notes_flags_json
+            ORDER BY MIN(run_id);
+        """).fetchall()
+        new_batches = runs_updated = 0
+        for et_id, notes, runs, started, finished in groups:
+            phase, engine, master_seed, params = batch_fields(notes, runs)
+            batch_id = conn.execute("""
+                INSERT INTO simulation_batch
+                  (encounter_template_id, phase, engine, master_seed, params_json, runs, started_at_utc, finished_at_utc)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?);
+            """, (et_id, phase, engine, master_seed, json.dumps(params, separators=(",", ":")),
+                  runs, started, finished)).lastrowid
+            new_batches += 1
+            # the notes blob is the join key back to the runs
+            runs_updated += conn.execute("""
+                UPDATE simulation_run
+                SET batch_id = ?
+                WHERE batch_id IS NULL
+                  AND encounter_template_id = ?
+                  AND notes_flags_json IS ?;
+            """, (batch_id, et_id, notes)).rowcount
+
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_simrun_batch ON simulation_run(batch_id);")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_batch_phase ON simulation_batch(phase, encounter_template_id);")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    print(f"✅ simulation_batch migration done: {new_batches} batches created, {runs_updated} runs linked.")
+
+if __name__ == "__main__":
+    main()
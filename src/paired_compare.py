@@ -0,0 +1,220 @@
+"""
+Paired comparison of engine configurations with common random numbers.
+
+Every run seed drives all configurations through the same RngStreams (combat_engine.py):
+each combatant has its own stream for initiative + attack rolls and one for damage dice,
+and targeting draws have their own stream. So "Rogue always acts first" and the baseline
+see the same dice for the same run, and the per-run difference only carries the effect of
+the change. The report gives the mean paired difference against the first configuration
+with its confidence interval, next to the half-width two independent batches of the same
+size would have had.
+
+A configuration is the base encounter plus comma-separated overrides:
+
+    baseline                      the encounter as loaded
+    acts_first=Rogue              these slots act first ('Rogue+Ranger' for several)
+    pc=threat / mon=random        targeting policy per side (targeting.POLICIES)
+    round_cap=10
+
+    python src/paired_compare.py --config baseline --config acts_first=Rogue --runs 2000 --seed 42
+    python src/paired_compare.py --config baseline --config mon=random --half-width 0.01 --runs 50000
+"""
+
+import argparse
+import math
+import random
+import sqlite3
+from dataclasses import replace
+from pathlib import Path
+from statistics import NormalDist
+
+from combat_engine import Encounter, RngStreams, new_states, simulate_battle
+from encounter_loader import load_encounter
+from parallel_runner import ParallelRunner
+from simulate_combat import ENCOUNTER_NAME, derive_seed
+from targeting import get_policy
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DB_PATH = PROJECT_ROOT / "db" / "dnd_initiative_work.sqlite"
+
+# per-run outcomes compared between configurations
+METRICS = ("party_victory", "rounds_taken", "total_damage_party", "total_damage_monsters")
+
+# -------------------------
+# Configurations
+# -------------------------
+
+def apply_config(encounter: Encounter, spec: str) -> Encounter:
+    """
+    'acts_first=Rogue,mon=random' -> the encounter with those overrides ('baseline' = none).
+    """
+    changes = {}
+    for part in filter(None, spec.split(",")):
+        if part == "baseline":
+            continue
+        key, sep, value = part.partition("=")
+        if not sep:
+            raise ValueError(f"Bad override {part!r}, expected key=value")
+        if key == "acts_first":
+            names = tuple(value.split("+"))
+            unknown = set(names) - {c.name for c in encounter.combatants}
+            if unknown:
+                raise ValueError(f"acts_first: no such slots {sorted(unknown)}")
+            changes["acts_first"] = names
+        elif key in ("pc", "mon"):
+            get_policy(value)
+            changes[f"target_selection_{key}"] = value
+        elif key == "round_cap":
+            changes["round_cap"] = int(value)
+        else:
+            raise ValueError(f"Unknown override {key!r}, choose from acts_first, pc, mon, round_cap")
+    return replace(encounter, **changes)
+
+# -------------------------
+# Worker task
+# -------------------------
+
+# per-process state buffers, one list per configuration
+_buffers = {}
+
+def run_paired(encounters: tuple, seed: int) -> tuple:
+    """
+    Worker task: one seed through every configuration, each starting from fresh RngStreams(seed).
+    Returns one METRICS tuple per configuration.
+    """
+    out = []
+    for encounter in encounters:
+        states = _buffers.get(id(encounter))
+        if states is None or states[0] is not encounter:
+            states = _buffers[id(encounter)] = (encounter, new_states(encounter))
+        result = simulate_battle(encounter, None, states[1], streams=RngStreams(seed))
+        out.append((result.party_victory, result.rounds_taken,
+                    result.total_damage_party, result.total_damage_monsters))
+    return tuple(out)
+
+# -------------------------
+# Paired statistics
+# -------------------------
+
+class PairedStats:
+    """
+    Running sums for each configuration's metrics and for their differences against
+    configuration 0, enough for paired and independent-sample intervals.
+    """
+
+    def __init__(self, n_configs: int):
+        self.n = 0
+        k = n_configs * len(METRICS)
+        self.sum = [0.0] * k
+        self.sum_sq = [0.0] * k
+        self.diff_sum = [0.0] * k
+        self.diff_sum_sq = [0.0] * k
+
+    def add(self, outcome: tuple):
+        self.n += 1
+        base = outcome[0]
+        i = 0
+        for values in outcome:
+            for v, b in zip(values, base):
+                d = v - b
+                self.sum[i] += v
+                self.sum_sq[i] += v * v
+                self.diff_sum[i] += d
+                self.diff_sum_sq[i] += d * d
+                i += 1
+
+    def _var(self, s: float, ss: float) -> float:
+        if self.n < 2:
+            return math.inf
+        return max(0.0, (ss - s * s / self.n) / (self.n - 1))
+
+    def mean(self, config: int, metric: int) -> float:
+        return self.sum[config * len(METRICS) + metric] / self.n
+
+    def paired(self, config: int, metric: int, z: float) -> tuple[float, float, float]:
+        """
+        (mean difference vs configuration 0, paired CI half-width, independent-batches CI half-width)
+        """
+        i = config * len(METRICS) + metric
+        j = metric
+        diff = self.diff_sum[i] / self.n
+        paired_half = z * math.sqrt(self._var(self.diff_sum[i], self.diff_sum_sq[i]) / self.n)
+        independent_half = z * math.sqrt((self._var(self.sum[i], self.sum_sq[i])
+                                          + self._var(self.sum[j], self.sum_sq[j])) / self.n)
+        return diff, paired_half, independent_half
+
+def report(stats: PairedStats, labels: list[str], z: float, confidence: float) -> list[str]:
+    lines = [f"{stats.n} paired runs, {confidence:.0%} intervals, differences vs {labels[0]!r}"]
+    for c, label in enumerate(labels):
+        lines.append(f"  [{c}] {label}: " + ", ".join(
+            f"{m}={stats.mean(c, k):.4f}" for k, m in enumerate(METRICS)))
+    for c, label in enumerate(labels[1:], start=1):
+        lines.append(f"  {label} - {labels[0]}:")
+        for k, m in enumerate(METRICS):
+            diff, half, indep = stats.paired(c, k, z)
+            # runs two independent batches would need for the same half-width
+            factor = (indep / half) ** 2 if half > 0 else math.inf
+            lines.append(f"    {m:<22} {diff:+.4f} ±{half:.4f}  (independent ±{indep:.4f}, "
+                         f"≈{factor:.1f}x the runs)")
+    return lines
+
+# -------------------------
+# Main
+# -------------------------
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compare engine configurations on common random numbers.")
+    parser.add_argument("--config", action="append", default=[], metavar="SPEC",
+                        help="configuration (repeatable, the first is the reference), e.g. baseline, "
+                             "acts_first=Rogue, mon=random, pc=threat, round_cap=10")
+    parser.add_argument("--runs", type=int, default=5000, help="paired runs (default 5000; the cap with --half-width)")
+    parser.add_argument("--seed", type=int, default=None, help="master seed (default: random)")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (default 1 = no pool)")
+    parser.add_argument("--confidence", type=float, default=0.95, help="CI confidence level (default 0.95)")
+    parser.add_argument("--half-width", type=float, default=None,
+                        help="stop once every party_victory difference CI is this narrow")
+    parser.add_argument("--check-every", type=int, default=1000, help="runs between --half-width checks (default 1000)")
+    parser.add_argument("--encounter", default=ENCOUNTER_NAME, help="encounter_template.name")
+    parser.add_argument("--db", type=Path, default=DB_PATH, help="SQLite database path")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    labels = args.config or ["baseline", "acts_first=Rogue"]
+    if len(labels) < 2:
+        raise SystemExit("need at least two --config values to compare")
+    if args.runs < 2 or args.workers < 1 or args.check_every < 1:
+        raise SystemExit("--runs must be >= 2, --workers and --check-every >= 1")
+    if not 0 < args.confidence < 1:
+        raise SystemExit("--confidence must be between 0 and 1 (exclusive)")
+
+    conn = sqlite3.connect(args.db, timeout=30)
+    _, base = load_encounter(conn, args.encounter)
+    conn.close()
+    try:
+        encounters = tuple(apply_config(base, spec) for spec in labels)
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+    master_seed = args.seed if args.seed is not None else random.randint(1, 2**31 - 1)
+    z = NormalDist().inv_cdf(0.5 + args.confidence / 2)
+    stats = PairedStats(len(encounters))
+    print(f"Comparing {len(encounters)} configurations of {args.encounter!r} "
+          f"(master_seed={master_seed}, workers={args.workers})...")
+
+    chunk = args.check_every if args.half_width is not None else args.runs
+    with ParallelRunner(run_paired, encounters, workers=args.workers) as runner:
+        while stats.n < args.runs:
+            k = min(chunk, args.runs - stats.n)
+            for outcome in runner.map([derive_seed(master_seed, i) for i in range(stats.n, stats.n + k)]):
+                stats.add(outcome)
+            if args.half_width is not None:
+                widest = max(stats.paired(c, 0, z)[1] for c in range(1, len(encounters)))
+                print(f"  {stats.n} runs: widest party_victory difference ±{widest:.4f}")
+                if widest <= args.half_width:
+                    break
+
+    print("\n".join(report(stats, labels, z, args.confidence)))
+
+if __name__ == "__main__":
+    main()
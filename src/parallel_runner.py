@@ -0,0 +1,80 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+# -------------------------
+# Process-pool runner for independent simulation runs
+# -------------------------
+
+# Set once per worker process by the pool initializer, so the (read-only) encounter
+# is pickled once per worker instead of once per task.
+_worker_shared = None
+
+def _init_worker(shared):
+    global _worker_shared
+    _worker_shared = shared
+
+def _call_with_shared(task_fn, seed):
+    return task_fn(_worker_shared, seed)
+
+def default_chunksize(n_tasks: int, workers: int) -> int:
+    """
+    Roughly 8 chunks per worker: big enough to amortise IPC, small enough to balance load.
+    """
+    return max(1, n_tasks // (workers * 8))
+
+# -------------------------
+# Runner
+# -------------------------
+
+class ParallelRunner:
+    """
+    Keeps one process pool alive across several map() calls, e.g. for a sampler that
+    simulates in batches and decides after each batch whether to continue.
+
+        with ParallelRunner(run_battle, encounter, workers=4) as runner:
+            for rows in runner.map(seeds): ...
+
+    task_fn must be a module-level function (picklable) with no database access.
+    Results come back in seed order for any worker count, so as long as each seed is
+    derived from the run index the output does not depend on `workers`.
+    With workers=1 everything runs in this process (no pool, no pickling).
+    """
+
+    def __init__(self, task_fn, shared, workers: int = 1):
+        self.task_fn = task_fn
+        self.shared = shared
+        self.workers = workers
+        self._pool = None
+
+    def __enter__(self):
+        if self.workers > 1:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker, initargs=(self.shared,)
+            )
+        return self
+
+    def __exit__(self, *exc):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        return False
+
+    def map(self, seeds: list[int], chunksize: int | None = None):
+        """
+        Yield task_fn(shared, seed) for every seed, in seed order.
+        """
+        if self._pool is None:
+            for seed in seeds:
+                yield self.task_fn(self.shared, seed)
+            return
+
+        if chunksize is None:
+            chunksize = default_chunksize(len(seeds), self.workers)
+        yield from self._pool.map(partial(_call_with_shared, self.task_fn), seeds, chunksize=chunksize)
+
+def run_parallel(task_fn, shared, seeds: list[int], workers: int = 1, chunksize: int | None = None):
+    """
+    Yield task_fn(shared, seed) for every seed, in seed order (one-shot ParallelRunner).
+    """
+    with ParallelRunner(task_fn, shared, workers) as runner:
+        yield from runner.map(seeds, chunksize)
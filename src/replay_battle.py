@@ -0,0 +1,128 @@
+"""
+Deterministic replay: re-run one stored battle from its seed, print it turn by turn and check
+it against simulation_run and (if the batch was run with --event-log) the binary event log.
+
+    python src/replay_battle.py 12345
+    python src/replay_battle.py 12345 --event-log data/results/events --quiet
+
+Exits with status 1 if anything differs, e.g. after a rules change without an ENGINE_VERSION bump
+or an edited encounter template.
+"""
+
+import argparse
+import json
+import random
+import sqlite3
+from pathlib import Path
+
+from combat_engine import ENGINE_VERSION, simulate_battle
+from encounter_loader import load_encounter
+from event_log import flag_names, read_run
+from simulate_combat import derive_seed
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DB_PATH = PROJECT_ROOT / "db" / "dnd_initiative_work.sqlite"
+
+# -------------------------
+# Replay
+# -------------------------
+
+def run_location(conn: sqlite3.Connection, run_id: int) -> dict:
+    """
+    Everything needed to re-run one simulation_run row, including its index in the batch.
+    """
+    row = conn.execute("""
+        SELECT sr.seed, sr.batch_id, sr.winner, sr.rounds_taken, sr.total_damage_party, sr.total_damage_monsters,
+               et.name, sb.engine, sb.engine_version, sb.master_seed, sb.params_json
+        FROM simulation_run sr
+        JOIN encounter_template et ON et.encounter_template_id = sr.encounter_template_id
+        LEFT JOIN simulation_batch sb ON sb.batch_id = sr.batch_id
+        WHERE sr.run_id = ?;
+    """, (run_id,)).fetchone()
+    if not row:
+        raise RuntimeError(f"simulation_run not found: run_id={run_id}")
+    (seed, batch_id, winner, rounds_taken, damage_party, damage_monsters,
+     encounter_name, engine, engine_version, master_seed, params_json) = row
+    run_index = conn.execute(
+        "SELECT COUNT(*) FROM simulation_run WHERE batch_id = ? AND run_id < ?;", (batch_id, run_id)
+    ).fetchone()[0]
+    return {
+        "run_id": run_id, "seed": seed, "batch_id": batch_id, "run_index": run_index,
+        "encounter_name": encounter_name, "engine": engine, "engine_version": engine_version,
+        "master_seed": master_seed, "params": json.loads(params_json) if params_json else {},
+        "stored": (winner, rounds_taken, damage_party, damage_monsters),
+    }
+
+def replay(conn: sqlite3.Connection, run_id: int, log_dir: Path | None = None):
+    """
+    Re-run a battle from its seed. Returns (encounter, result, events, problems), problems being
+    a list of differences from what was stored (empty if the replay matches).
+    log_dir defaults to the batch's --event-log directory, if it had one.
+    """
+    loc = run_location(conn, run_id)
+    if loc["engine"] not in (None, "scalar"):
+        raise RuntimeError(f"Batch {loc['batch_id']} ran on the {loc['engine']} engine, only scalar runs replay from their seed")
+
+    _, encounter = load_encounter(conn, loc["encounter_name"])
+    events = []
+    result = simulate_battle(encounter, random.Random(loc["seed"]), events=events)
+
+    problems = []
+    if loc["engine_version"] is not None and loc["engine_version"] != ENGINE_VERSION:
+        problems.append(f"batch ran on engine version {loc['engine_version']}, this is {ENGINE_VERSION}")
+    if loc["master_seed"] is not None and derive_seed(loc["master_seed"], loc["run_index"]) != loc["seed"]:
+        problems.append(f"seed is not derive_seed(master_seed, {loc['run_index']}), run index lookup is off")
+
+    replayed = (result.winner, result.rounds_taken, result.total_damage_party, result.total_damage_monsters)
+    for name, stored, got in zip(("winner", "rounds_taken", "total_damage_party", "total_damage_monsters"),
+                                 loc["stored"], replayed):
+        if stored != got:
+            problems.append(f"{name}: stored {stored}, replay {got}")
+
+    if log_dir is None and "event_log" in loc["params"]:
+        log_dir = Path(loc["params"]["event_log"])
+    if log_dir is not None:
+        logged = read_run(log_dir, loc["batch_id"], loc["run_index"])
+        if logged != events:
+            first = next((i for i, (a, b) in enumerate(zip(logged, events)) if a != b), min(len(logged), len(events)))
+            problems.append(f"event log differs from event {first} on ({len(logged)} logged, {len(events)} replayed)")
+    return encounter, result, events, problems
+
+def format_event(encounter, event: tuple) -> str:
+    round_no, actor, target, d20, flags, damage = event
+    names = encounter.combatants
+    text = f"R{round_no:<3}{names[actor].name:>14} -> {names[target].name:<14} d20={d20:<3}"
+    detail = " ".join(flag_names(flags)) or "miss"
+    return f"{text} {detail}" + (f", {damage} damage" if damage else "")
+
+# -------------------------
+# Main
+# -------------------------
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay one stored battle from its seed and check it.")
+    parser.add_argument("run_id", type=int)
+    parser.add_argument("--event-log", type=Path, default=None, metavar="DIR",
+                        help="event log directory (default: the one recorded with the batch, if any)")
+    parser.add_argument("--quiet", action="store_true", help="only report whether the replay matches")
+    parser.add_argument("--db", type=Path, default=DB_PATH)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    conn = sqlite3.connect(args.db, timeout=30)
+    encounter, result, events, problems = replay(conn, args.run_id, args.event_log)
+    conn.close()
+
+    if not args.quiet:
+        for event in events:
+            print(format_event(encounter, event))
+        print(f"Winner: {result.winner} after {result.rounds_taken} round(s), {len(events)} attack rolls.")
+    if problems:
+        for p in problems:
+            print(f"MISMATCH {p}")
+        raise SystemExit(1)
+    print(f"✅ Run {args.run_id} replays identically.")
+
+if __name__ == "__main__":
+    main()
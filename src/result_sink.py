@@ -0,0 +1,110 @@
+import sqlite3
+import time
+
+# -------------------------
+# Column layouts (run_id is assigned by the sink, so it is not part of the rows)
+# -------------------------
+
+SIMULATION_RUN_COLUMNS = (
+    "encounter_template_id", "seed", "party_victory", "winner", "rounds_taken",
+    "total_damage_party", "total_damage_monsters", "bugbear_killed_round",
+    "notes_flags_json", "batch_id",
+)
+
+PARTICIPANT_RUN_COLUMNS = (
+    "side", "name", "template_type", "pc_id", "monster_key",
+    "hp_start", "hp_end", "alive_end",
+    "init_roll_d20", "init_mod", "init_total", "init_order",
+    "damage_dealt_total", "damage_taken_total", "attacks_made", "hits_landed", "crits_landed",
+    "opening_burst_triggered", "hunters_mark_cast", "hunters_mark_bonus_damage",
+)
+
+FIRST_ROUND_COLUMNS = (
+    "damage_party_before_first_monster_turn",
+    "monsters_downed_before_first_monster_turn",
+    "party_downed_before_first_player_turn",
+)
+
+DEFAULT_BATCH_SIZE = 1000
+
+# -------------------------
+# SQLite sink
+# -------------------------
+
+def _insert_sql(table: str, columns: tuple) -> str:
+    cols = ("run_id",) + columns
+    return f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join(['?'] * len(cols))});"
+
+class SqliteResultSink:
+    """
+    Holds finished battles in memory and writes them in one transaction per batch.
+
+    Each run is added with its final simulation_run values, so there is no
+    placeholder INSERT + UPDATE round trip. run_ids are handed out at flush time,
+    while the write lock is held, which keeps the participant_run / first_round_events
+    foreign keys pointing at the right simulation_run row.
+
+    profiler: optional sim_profiler.Profiler, gets the sqlite_insert / commit time of each flush.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, batch_size: int = DEFAULT_BATCH_SIZE, profiler=None):
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be >= 1, got {batch_size}")
+        self.conn = conn
+        self.batch_size = batch_size
+        self.profiler = profiler
+        self.runs_written = 0
+        self._pending = []
+
+    def add_run(self, run_row: tuple, participant_rows: list[tuple], first_round_row: tuple):
+        """
+        run_row follows SIMULATION_RUN_COLUMNS, participant_rows follow
+        PARTICIPANT_RUN_COLUMNS, first_round_row follows FIRST_ROUND_COLUMNS.
+        """
+        self._pending.append((run_row, participant_rows, first_round_row))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+
+        conn = self.conn
+        t0 = time.perf_counter_ns()
+        if not conn.in_transaction:
+            # take the write lock up front so nobody else can grab our run_ids
+            conn.execute("BEGIN IMMEDIATE;")
+
+        try:
+            next_id = conn.execute("SELECT COALESCE(MAX(run_id), 0) FROM simulation_run;").fetchone()[0] + 1
+
+            run_rows = []
+            participant_rows = []
+            first_round_rows = []
+            for offset, (run_row, p_rows, fre_row) in enumerate(self._pending):
+                run_id = next_id + offset
+                run_rows.append((run_id,) + tuple(run_row))
+                participant_rows.extend((run_id,) + tuple(p) for p in p_rows)
+                first_round_rows.append((run_id,) + tuple(fre_row))
+
+            # parent rows first so the foreign keys resolve
+            conn.executemany(_insert_sql("simulation_run", SIMULATION_RUN_COLUMNS), run_rows)
+            conn.executemany(_insert_sql("participant_run", PARTICIPANT_RUN_COLUMNS), participant_rows)
+            conn.executemany(_insert_sql("first_round_events", FIRST_ROUND_COLUMNS), first_round_rows)
+            t1 = time.perf_counter_ns()
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        if self.profiler is not None:
+            self.profiler.add("sqlite_insert", t1 - t0)
+            self.profiler.add("commit", time.perf_counter_ns() - t1)
+        self.runs_written += len(self._pending)
+        self._pending.clear()
+
+    def close(self):
+        """
+        Flush whatever is left. The connection itself belongs to the caller.
+        """
+        self.flush()
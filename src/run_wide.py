@@ -0,0 +1,127 @@
+"""
+run_wide: one row per simulation run with the per-slot values the analysis queries and the
+dashboard keep re-deriving from participant_run (Rogue / Bugbear initiative, party initiative
+sum, per-PC damage, ...), so those extracts read one narrow indexed table instead of
+self-joining participant_run by name.
+
+Refreshed incrementally: only runs with run_id above the highest one already in run_wide are
+added. simulate_combat.py calls refresh_run_wide() after each batch.
+
+    python src/run_wide.py             # catch up
+    python src/run_wide.py --rebuild   # drop all rows and rebuild
+"""
+
+import argparse
+import sqlite3
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DB_PATH = PROJECT_ROOT / "db" / "dnd_initiative_work.sqlite"
+
+# participant_run is read once per run (PK range scan on run_id) and pivoted by slot name
+REFRESH_SQL = """
+INSERT INTO run_wide (
+  run_id, batch_id, encounter_template_id, party_victory, winner, rounds_taken,
+  total_damage_party, total_damage_monsters, bugbear_killed_round,
+  party_init_sum, monsters_init_sum,
+  fighter_init, rogue_init, ranger_init, bugbear_init,
+  rogue_before_bugbear, rogue_beats_bugbear,
+  fighter_damage, rogue_damage, ranger_damage, bugbear_damage, goblins_damage,
+  fighter_alive, rogue_alive, ranger_alive, party_alive, monsters_alive,
+  rogue_opening_burst, ranger_hm_cast, ranger_hm_bonus,
+  damage_party_before_first_monster_turn,
+  monsters_downed_before_first_monster_turn,
+  party_downed_before_first_player_turn
+)
+SELECT
+  sr.run_id, sr.batch_id, sr.encounter_template_id, sr.party_victory, sr.winner, sr.rounds_taken,
+  sr.total_damage_party, sr.total_damage_monsters, sr.bugbear_killed_round,
+  p.party_init_sum, p.monsters_init_sum,
+  p.fighter_init, p.rogue_init, p.ranger_init, p.bugbear_init,
+  -- actual turn order (random tie-break included)
+  CASE WHEN p.rogue_order IS NULL OR p.bugbear_order IS NULL THEN NULL
+       WHEN p.rogue_order < p.bugbear_order THEN 1 ELSE 0 END,
+  -- query B's definition: init_total, then init_mod, no random tie-break
+  CASE WHEN p.rogue_init IS NULL OR p.bugbear_init IS NULL THEN NULL
+       WHEN p.rogue_init > p.bugbear_init
+         OR (p.rogue_init = p.bugbear_init AND p.rogue_mod > p.bugbear_mod) THEN 1 ELSE 0 END,
+  p.fighter_damage, p.rogue_damage, p.ranger_damage, p.bugbear_damage, p.goblins_damage,
+  p.fighter_alive, p.rogue_alive, p.ranger_alive, p.party_alive, p.monsters_alive,
+  p.rogue_opening_burst, p.ranger_hm_cast, p.ranger_hm_bonus,
+  fre.damage_party_before_first_monster_turn,
+  fre.monsters_downed_before_first_monster_turn,
+  fre.party_downed_before_first_player_turn
+FROM simulation_run sr
+JOIN (
+  SELECT
+    run_id,
+    SUM(CASE WHEN side = 'party' THEN init_total END)         AS party_init_sum,
+    SUM(CASE WHEN side = 'monsters' THEN init_total END)      AS monsters_init_sum,
+    MAX(CASE WHEN name = 'Fighter' THEN init_total END)       AS fighter_init,
+    MAX(CASE WHEN name = 'Rogue' THEN init_total END)         AS rogue_init,
+    MAX(CASE WHEN name = 'Ranger' THEN init_total END)        AS ranger_init,
+    MAX(CASE WHEN name = 'Bugbear' THEN init_total END)       AS bugbear_init,
+    MAX(CASE WHEN name = 'Rogue' THEN init_mod END)           AS rogue_mod,
+    MAX(CASE WHEN name = 'Bugbear' THEN init_mod END)         AS bugbear_mod,
+    MAX(CASE WHEN name = 'Rogue' THEN init_order END)         AS rogue_order,
+    MAX(CASE WHEN name = 'Bugbear' THEN init_order END)       AS bugbear_order,
+    MAX(CASE WHEN name = 'Fighter' THEN damage_dealt_total END) AS fighter_damage,
+    MAX(CASE WHEN name = 'Rogue' THEN damage_dealt_total END)   AS rogue_damage,
+    MAX(CASE WHEN name = 'Ranger' THEN damage_dealt_total END)  AS ranger_damage,
+    MAX(CASE WHEN name = 'Bugbear' THEN damage_dealt_total END) AS bugbear_damage,
+    SUM(CASE WHEN name LIKE 'Goblin_%' THEN damage_dealt_total END) AS goblins_damage,
+    MAX(CASE WHEN name = 'Fighter' THEN alive_end END)        AS fighter_alive,
+    MAX(CASE WHEN name = 'Rogue' THEN alive_end END)          AS rogue_alive,
+    MAX(CASE WHEN name = 'Ranger' THEN alive_end END)         AS ranger_alive,
+    SUM(CASE WHEN side = 'party' THEN alive_end END)          AS party_alive,
+    SUM(CASE WHEN side = 'monsters' THEN alive_end END)       AS monsters_alive,
+    MAX(CASE WHEN name = 'Rogue' THEN opening_burst_triggered END)     AS rogue_opening_burst,
+    MAX(CASE WHEN name = 'Ranger' THEN hunters_mark_cast END)          AS ranger_hm_cast,
+    MAX(CASE WHEN name = 'Ranger' THEN hunters_mark_bonus_damage END)  AS ranger_hm_bonus
+  FROM participant_run
+  WHERE run_id > :after
+  GROUP BY run_id
+) p ON p.run_id = sr.run_id
+LEFT JOIN first_round_events fre ON fre.run_id = sr.run_id
+WHERE sr.run_id > :after
+ORDER BY sr.run_id;
+"""
+
+def refresh_run_wide(conn: sqlite3.Connection) -> int:
+    """
+    Add every run newer than the newest run already in run_wide. Returns rows added.
+    run_ids are handed out under the write lock at commit time, so nothing can later
+    appear below the high-water mark.
+    """
+    try:
+        conn.execute("BEGIN IMMEDIATE;")
+        after = conn.execute("SELECT COALESCE(MAX(run_id), 0) FROM run_wide;").fetchone()[0]
+        cur = conn.execute(REFRESH_SQL, {"after": after})
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return cur.rowcount
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh the run_wide table.")
+    parser.add_argument("--rebuild", action="store_true", help="delete all run_wide rows first")
+    parser.add_argument("--db", type=Path, default=DB_PATH)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    conn = sqlite3.connect(args.db, timeout=30)
+    conn.execute("PRAGMA foreign_keys = ON;")
+    conn.execute("PRAGMA busy_timeout = 30000;")
+
+    if args.rebuild:
+        conn.execute("DELETE FROM run_wide;")
+        conn.commit()
+    added = refresh_run_wide(conn)
+    total = conn.execute("SELECT COUNT(*) FROM run_wide;").fetchone()[0]
+    conn.close()
+    print(f"✅ run_wide refreshed: {added} runs added ({total} total).")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import sqlite3
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DB_PATH = PROJECT_ROOT / "db" / "dnd_initiative_work.sqlite"
+
+PCS = [
+    ("Fighter", "PC_FTR_CHAMPION_L3"),
+    ("Rogue",   "PC_ROG_ASSASSIN_L3"),
+    ("Ranger",  "PC_RGR_GLOOMSTALKER_L3"),
+]
+
+HORDE_SIZE_DEFAULT = 50
+
+def encounter_name(size: int) -> str:
+    return f"L3 Trio vs Goblin horde ({size}) + 1 Bugbear"
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Seed a horde encounter: the Goblins are one grouped member.")
+    parser.add_argument("--size", type=int, default=HORDE_SIZE_DEFAULT, help="Goblins in the horde")
+    parser.add_argument("--db", type=Path, default=DB_PATH)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    conn = sqlite3.connect(args.db, timeout=30)
+    conn.execute("PRAGMA foreign_keys = ON;")
+    conn.execute("PRAGMA busy_timeout = 30000;")
+
+    goblin_key = conn.execute("SELECT monster_key FROM dim_monster WHERE lower(monster_name)='goblin';").fetchone()
+    bugbear_key = conn.execute("SELECT monster_key FROM dim_monster WHERE lower(monster_name)='bugbear';").fetchone()
+    if not goblin_key or not bugbear_key:
+        raise RuntimeError("Goblin or Bugbear missing in dim_monster. Run etl_load_monsters_goblin_bugbear.py first.")
+
+    name = encounter_name(args.size)
+    conn.execute("""
+        INSERT OR IGNORE INTO encounter_template
+          (name, description, target_selection_pc, target_selection_mon, round_cap)
+        VALUES (?, ?, 'bugbear_first', 'lowest_hp', 20);
+    """, (name, f"Fighter(Champion), Rogue(Assassin), Ranger(Gloom Stalker) vs {args.size} Goblins "
+                "(one group: one initiative roll, one attack per living Goblin) and 1 Bugbear."))
+    et_id = conn.execute("SELECT encounter_template_id FROM encounter_template WHERE name = ?;", (name,)).fetchone()[0]
+
+    for slot_name, pc_id in PCS:
+        conn.execute("""
+            INSERT OR IGNORE INTO encounter_template_member
+              (encounter_template_id, side, slot_name, pc_id, monster_key, quantity)
+            VALUES (?, 'party', ?, ?, NULL, 1);
+        """, (et_id, slot_name, pc_id))
+
+    # The whole horde is one member (slot name kept Goblin_* so bugbear_first still ranks it)
+    conn.execute("""
+        INSERT OR IGNORE INTO encounter_template_member
+          (encounter_template_id, side, slot_name, pc_id, monster_key, quantity)
+        VALUES (?, 'monsters', 'Goblin_horde', NULL, ?, ?);
+    """, (et_id, goblin_key[0], args.size))
+    conn.execute("""
+        INSERT OR IGNORE INTO encounter_template_member
+          (encounter_template_id, side, slot_name, pc_id, monster_key, quantity)
+        VALUES (?, 'monsters', 'Bugbear', NULL, ?, 1);
+    """, (et_id, bugbear_key[0]))
+
+    conn.commit()
+    conn.close()
+    print(f"✅ {name} -> encounter_template_id={et_id}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import sqlite3
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DB_PATH = PROJECT_ROOT / "db" / "dnd_initiative_work.sqlite"
+
+ENCOUNTER_NAME = "L3 Trio vs 4 Goblins + 1 Bugbear"
+
+# Monster targeting variants for the targeting stress test (see targeting.POLICIES)
+MONSTER_POLICIES = ["random", "weighted_random", "threat"]
+
+def variant_name(policy: str) -> str:
+    return f"{ENCOUNTER_NAME} [mon={policy}]"
+
+def main():
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.execute("PRAGMA foreign_keys = ON;")
+    conn.execute("PRAGMA busy_timeout = 30000;")
+
+    row = conn.execute("""
+        SELECT encounter_template_id, description, target_selection_pc, round_cap
+        FROM encounter_template
+        WHERE name = ?;""",
+        (ENCOUNTER_NAME,)
+    ).fetchone()
+    if not row:
+        raise RuntimeError(f"Encounter template not found: {ENCOUNTER_NAME}")
+    base_id, description, target_pc, round_cap = row
+
+    # Same members as the base encounter, only target_selection_mon differs
+    for policy in MONSTER_POLICIES:
+        conn.execute("""
+            INSERT OR IGNORE INTO encounter_template
+              (name, description, target_selection_pc, target_selection_mon, round_cap)
+            VALUES (?, ?, ?, ?, ?);
+        """, (variant_name(policy), f"{description} Monsters target: {policy}.", target_pc, policy, round_cap))
+        et_id = conn.execute(
+            "SELECT encounter_template_id FROM encounter_template WHERE name = ?;", (variant_name(policy),)
+        ).fetchone()[0]
+        conn.execute("""
+            INSERT OR IGNORE INTO encounter_template_member
+              (encounter_template_id, side, slot_name, pc_id, monster_key, quantity)
+            SELECT ?, side, slot_name, pc_id, monster_key, quantity
+            FROM encounter_template_member
+            WHERE encounter_template_id = ?;
+        """, (et_id, base_id))
+        print(f"{variant_name(policy)} -> encounter_template_id={et_id}")
+
+    conn.commit()
+    conn.close()
+    print("✅ Targeting variants seeded.")
+
+if __name__ == "__main__":
+    main()
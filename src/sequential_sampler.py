@@ -0,0 +1,167 @@
+"""
+Early-stopping sampler: simulate in batches until every win-rate estimate is precise enough.
+
+A target is a metric plus a confidence-interval half-width, e.g. 'party_victory:0.005'
+(overall win rate to within ±0.5 percentage points) or 'rogue_before_bugbear:0.01'
+(win rate in the runs where the Rogue acts before the Bugbear). After each batch the
+intervals are recomputed and the run stops once all targets are met.
+"""
+
+import math
+from dataclasses import dataclass
+from statistics import NormalDist
+
+from result_sink import PARTICIPANT_RUN_COLUMNS, SIMULATION_RUN_COLUMNS
+
+_RUN = {c: i for i, c in enumerate(SIMULATION_RUN_COLUMNS)}
+_PR = {c: i for i, c in enumerate(PARTICIPANT_RUN_COLUMNS)}
+
+def _by_name(participant_rows: list[tuple]) -> dict:
+    return {p[_PR["name"]]: p for p in participant_rows}
+
+def _acts_before(a: str, b: str):
+    def condition(participants: dict) -> bool | None:
+        if a not in participants or b not in participants:
+            return None
+        return participants[a][_PR["init_order"]] < participants[b][_PR["init_order"]]
+    return condition
+
+def _rogue_opening_burst(participants: dict) -> bool | None:
+    if "Rogue" not in participants:
+        return None
+    return participants["Rogue"][_PR["opening_burst_triggered"]] == 1
+
+def _not(condition):
+    def negated(participants: dict) -> bool | None:
+        result = condition(participants)
+        return None if result is None else not result
+    return negated
+
+# metric name -> condition on the run (None = all runs); the estimate is P(party_victory | condition)
+CONDITIONS = {
+    "party_victory": None,
+    "rogue_before_bugbear": _acts_before("Rogue", "Bugbear"),
+    "rogue_after_bugbear": _not(_acts_before("Rogue", "Bugbear")),
+    "opening_burst": _rogue_opening_burst,
+    "no_opening_burst": _not(_rogue_opening_burst),
+}
+
+# -------------------------
+# Confidence intervals
+# -------------------------
+
+def wilson_interval(wins: int, n: int, z: float) -> tuple[float, float]:
+    if n == 0:
+        return 0.0, 1.0
+    p = wins / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return centre - half, centre + half
+
+# the normal interval needs this many wins and losses; below that it collapses towards a zero
+# width at p = 0 or 1 (a rare timeout rate would "converge" on the first check), so use Wilson
+NORMAL_MIN_COUNT = 5
+
+def normal_interval(wins: int, n: int, z: float) -> tuple[float, float]:
+    if n == 0:
+        return 0.0, 1.0
+    if min(wins, n - wins) < NORMAL_MIN_COUNT:
+        return wilson_interval(wins, n, z)
+    p = wins / n
+    half = z * math.sqrt(p * (1 - p) / n)
+    return p - half, p + half
+
+INTERVALS = {"wilson": wilson_interval, "normal": normal_interval}
+
+# -------------------------
+# Targets
+# -------------------------
+
+@dataclass
+class PrecisionTarget:
+    metric: str
+    half_width: float
+    runs: int = 0
+    wins: int = 0
+
+    @classmethod
+    def parse(cls, spec: str) -> "PrecisionTarget":
+        """
+        'party_victory:0.005' -> PrecisionTarget('party_victory', 0.005)
+        """
+        metric, sep, width = spec.partition(":")
+        if not sep:
+            raise ValueError(f"Bad target {spec!r}, expected metric:half_width")
+        if metric not in CONDITIONS:
+            raise ValueError(f"Unknown metric {metric!r}, choose from {', '.join(CONDITIONS)}")
+        half_width = float(width)
+        if not 0 < half_width < 0.5:
+            raise ValueError(f"half_width must be in (0, 0.5), got {half_width}")
+        return cls(metric, half_width)
+
+class SequentialSampler:
+    """
+    Feed it runs with add_run() (same row layout as the result sinks) and ask done()
+    after each batch. min_runs guards against stopping on a lucky tiny sample.
+    """
+
+    def __init__(self, targets: list[PrecisionTarget], confidence: float = 0.95,
+                 method: str = "wilson", min_runs: int = 100):
+        if not targets:
+            raise ValueError("SequentialSampler needs at least one target")
+        if not 0 < confidence < 1:
+            raise ValueError(f"confidence must be in (0, 1), got {confidence}")
+        self.targets = targets
+        self.confidence = confidence
+        self.z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        self.interval = INTERVALS[method]
+        self.method = method
+        self.min_runs = min_runs
+        self.runs = 0
+
+    def add_run(self, run_row: tuple, participant_rows: list[tuple], first_round_row: tuple):
+        self.runs += 1
+        won = run_row[_RUN["party_victory"]]
+        participants = None
+        for t in self.targets:
+            condition = CONDITIONS[t.metric]
+            if condition is not None:
+                if participants is None:
+                    participants = _by_name(participant_rows)
+                if not condition(participants):
+                    continue
+            t.runs += 1
+            t.wins += won
+
+    def status(self) -> list[dict]:
+        rows = []
+        for t in self.targets:
+            lo, hi = self.interval(t.wins, t.runs, self.z)
+            half = (hi - lo) / 2
+            rows.append({
+                "metric": t.metric,
+                "runs": t.runs,
+                "estimate": t.wins / t.runs if t.runs else None,
+                "ci_low": lo,
+                "ci_high": hi,
+                "half_width": half,
+                "target": t.half_width,
+                "met": t.runs >= self.min_runs and half <= t.half_width,
+            })
+        return rows
+
+    def done(self) -> bool:
+        return all(row["met"] for row in self.status())
+
+    def describe(self) -> dict:
+        """
+        JSON-friendly summary for notes / batch parameters.
+        """
+        return {
+            "targets": {t.metric: t.half_width for t in self.targets},
+            "confidence": self.confidence,
+            "method": self.method,
+            "runs_used": self.runs,
+            "converged": self.done(),
+        }
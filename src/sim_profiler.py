@@ -0,0 +1,108 @@
+"""
+Low-overhead phase timers and counters for simulate_combat.py --profile.
+
+Phases are summed in nanoseconds (time.perf_counter_ns). Per-run phases (setup + initiative,
+combat loop, row building) are timed inside the worker that simulated the run and come
+back with its rows, so with --workers N they add up CPU time across workers, while wall
+time and runs/s are measured here. The per-run latencies (those three phases) give the
+percentiles. summary() is what write_summary() stores in perf_profile, one row per
+profiled batch, so the numbers can be compared across commits and machines.
+"""
+
+import json
+import platform
+import sqlite3
+import time
+from array import array
+from contextlib import contextmanager
+
+from combat_engine import ENGINE_VERSION
+
+PERCENTILES = (50, 90, 99)
+
+# worker-side phases, in the order of the timing tuple returned with each run
+RUN_PHASES = ("setup_initiative", "combat_loop", "result_rows")
+
+class Profiler:
+    def __init__(self):
+        self.phase_ns = {}
+        self.counters = {}
+        self.latencies_ns = array("q")
+        self._t0 = time.perf_counter_ns()
+
+    def add(self, phase: str, ns: int):
+        self.phase_ns[phase] = self.phase_ns.get(phase, 0) + ns
+
+    @contextmanager
+    def phase(self, name: str):
+        t = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter_ns() - t)
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_run(self, timing: tuple):
+        """
+        timing: nanoseconds per RUN_PHASES, measured in the worker.
+        """
+        for name, ns in zip(RUN_PHASES, timing):
+            self.add(name, ns)
+        self.latencies_ns.append(sum(timing))
+
+    def percentiles(self) -> dict[int, float]:
+        """
+        Per-run latency percentiles in microseconds (nearest rank).
+        """
+        lat = sorted(self.latencies_ns)
+        if not lat:
+            return {}
+        return {q: lat[min(len(lat) - 1, max(0, -(-q * len(lat) // 100) - 1))] / 1e3 for q in PERCENTILES + (100,)}
+
+    def summary(self, runs: int) -> dict:
+        wall_s = (time.perf_counter_ns() - self._t0) / 1e9
+        pct = self.percentiles()
+        return {
+            "runs": runs,
+            "wall_s": wall_s,
+            "runs_per_s": runs / wall_s if wall_s > 0 else None,
+            "phases_s": {name: ns / 1e9 for name, ns in self.phase_ns.items()},
+            "counters": dict(self.counters),
+            "latency_us": {f"p{q}" if q < 100 else "max": v for q, v in pct.items()},
+        }
+
+def format_summary(summary: dict) -> list[str]:
+    lines = [f"Profile: {summary['runs']} runs in {summary['wall_s']:.3f}s wall "
+             f"({summary['runs_per_s'] or 0:,.0f} runs/s)"]
+    wall = summary["wall_s"] or 1
+    for name, s in summary["phases_s"].items():
+        lines.append(f"  {name:<18}{s:>10.3f}s {100 * s / wall:>6.1f}% of wall")
+    counters = summary["counters"]
+    for name, n in counters.items():
+        lines.append(f"  {name:<18}{n:>10,}")
+    if counters.get("attacks") and "combat_loop" in summary["phases_s"]:
+        lines.append(f"  {'ns/attack':<18}{summary['phases_s']['combat_loop'] * 1e9 / counters['attacks']:>10,.0f}")
+    if summary["latency_us"]:
+        lines.append("  per-run latency " + ", ".join(f"{k}={v:,.1f}us" for k, v in summary["latency_us"].items()))
+    return lines
+
+def write_summary(conn: sqlite3.Connection, batch_id: int, summary: dict, engine: str, workers: int):
+    """
+    One perf_profile row per profiled batch (phases and counters as JSON, the headline numbers as columns).
+    """
+    lat = summary["latency_us"]
+    conn.execute("""
+        INSERT OR REPLACE INTO perf_profile
+          (batch_id, engine, engine_version, workers, runs, wall_s, runs_per_s,
+           p50_us, p90_us, p99_us, max_us, phases_json, counters_json, python_version, platform)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+    """, (
+        batch_id, engine, ENGINE_VERSION, workers, summary["runs"], summary["wall_s"], summary["runs_per_s"],
+        lat.get("p50"), lat.get("p90"), lat.get("p99"), lat.get("max"),
+        json.dumps(summary["phases_s"], separators=(",", ":")),
+        json.dumps(summary["counters"], separators=(",", ":")),
+        platform.python_version(), platform.platform(terse=True),
+    ))
+    conn.commit()
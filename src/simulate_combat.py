@@ -1,106 +1,199 @@
+import argparse
+import hashlib
+import json
 import sqlite3
 import random
-import re
+import time
 from pathlib import Path
 
+from build_cubes import build_cubes
+from combat_engine import BattleResult, Encounter, new_states, simulate_battle
+from encounter_loader import load_encounter
+from event_log import EventLogWriter, pack_events
+from parallel_runner import ParallelRunner
+from result_sink import PARTICIPANT_RUN_COLUMNS, SqliteResultSink
+from run_wide import refresh_run_wide
+from sequential_sampler import CONDITIONS, INTERVALS, PrecisionTarget, SequentialSampler
+from sim_profiler import Profiler, format_summary, write_summary
+from simulation_batch import finish_batch, start_batch
+
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 DB_PATH = PROJECT_ROOT / "db" / "dnd_initiative_work.sqlite"
 
 ENCOUNTER_NAME = "L3 Trio vs 4 Goblins + 1 Bugbear"
-NUM_RUNS = 5000  # start with 200, then scale to 10000
-
-ROUND_CAP_DEFAULT = 20
+NUM_RUNS = 5000  # default for --runs
+BATCH_SIZE = 1000  # runs per transaction (one commit per batch, not per run)
 
 # -------------------------
-# Dice helpers
+# Seeds
 # -------------------------
 
-def roll(rng: random.Random, sides: int) -> int:
-    return rng.randint(1, sides)
-
-def roll_dice_expr(rng: random.Random, expr: str) -> int:
-    """
-    Parse dice like '2d6+3' or '1d8+3' or '2d8+2'
+def derive_seed(master_seed: int, run_index: int) -> int:
     """
-    expr = expr.replace(" ", "")
-    m = re.fullmatch(r"(\d+)d(\d+)([+-]\d+)?", expr)
-    if not m:
-        raise ValueError(f"Bad dice expr: {expr}")
-    n = int(m.group(1))
-    d = int(m.group(2))
-    mod = int(m.group(3)) if m.group(3) else 0
-    total = sum(roll(rng, d) for _ in range(n)) + mod
-    return total
-
-def roll_damage(rng: random.Random, base_expr: str, is_crit: bool) -> int:
+    Per-run seed derived from (master_seed, run_index) only, so a run gets the same
+    seed no matter which worker process simulates it.
+    Stays in 1..2**31-1 like the seeds stored before.
     """
-    If crit: double the dice count, keep flat modifier the same.
-    Example: 1d8+3 crit -> 2d8+3
-    """
-    expr = base_expr.replace(" ", "")
-    m = re.fullmatch(r"(\d+)d(\d+)([+-]\d+)?", expr)
-    if not m:
-        raise ValueError(f"Bad damage expr: {expr}")
-    n = int(m.group(1))
-    d = int(m.group(2))
-    mod = int(m.group(3)) if m.group(3) else 0
-    if is_crit:
-        n *= 2
-    return sum(roll(rng, d) for _ in range(n)) + mod
+    digest = hashlib.blake2b(f"{master_seed}:{run_index}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % (2**31 - 1) + 1
 
 # -------------------------
-# Rules: crit ranges / features
+# Driver: engine result -> table rows
 # -------------------------
 
-def is_crit(threshold_str: str, d20_roll: int) -> bool:
+def result_rows(encounter: Encounter, seed: int, result: BattleResult):
     """
-    threshold_str is '20' or '19-20' (from pc template)
+    Returns (run_values, participant_rows, first_round_row) where run_values is
+    (seed, party_victory, winner, rounds_taken, total_damage_party,
+     total_damage_monsters, bugbear_killed_round).
     """
-    if threshold_str == "20":
-        return d20_roll == 20
-    if threshold_str == "19-20":
-        return d20_roll >= 19
-    # fallback: natural 20
-    return d20_roll == 20
-
-def acts_before_target(participants, actor_name: str, target_name: str) -> bool:
+    participant_rows = []
+    for c, p in zip(encounter.combatants, result.participants):
+        participant_rows.append((
+            c.side,
+            c.name,
+            c.template_type,
+            c.pc_id,
+            c.monster_key,
+            c.hp_total,
+            p.hp_end,
+            1 if p.hp_end > 0 else 0,
+            p.init_roll_d20,
+            c.init_mod,
+            p.init_total,
+            p.init_order,
+            p.damage_dealt,
+            p.damage_taken,
+            p.attacks,
+            p.hits,
+            p.crits,
+            p.opening_burst_triggered,
+            p.hunters_mark_cast,
+            p.hunters_mark_bonus_damage,
+        ))
+
+    run_values = (
+        seed,
+        result.party_victory,
+        result.winner,
+        result.rounds_taken,
+        result.total_damage_party,
+        result.total_damage_monsters,
+        result.bugbear_killed_round,
+    )
+    first_round_row = (
+        result.damage_party_before_first_monster_turn,
+        result.monsters_downed_before_first_monster_turn,
+        result.party_downed_before_first_player_turn,
+    )
+    return run_values, participant_rows, first_round_row
+
+# per-process state buffers, reused while the encounter stays the same
+_buffers = (None, None)
+
+def _states_for(encounter: Encounter):
+    global _buffers
+    if _buffers[0] is not encounter:
+        _buffers = (encounter, new_states(encounter))
+    return _buffers[1]
+
+def run_battle(encounter: Encounter, seed: int):
     """
-    Determine if actor's init_order is before target's init_order.
+    Worker task: simulate one seeded battle and return its table rows.
     """
-    a = participants[actor_name]["init_order"]
-    t = participants[target_name]["init_order"]
-    return a < t
+    # rows are built right away, so the reused state objects are never handed out
+    return result_rows(encounter, seed, simulate_battle(encounter, random.Random(seed), _states_for(encounter)))
 
-# -------------------------
-# Target selection
-# -------------------------
-
-def pick_target_pc(monsters_alive: list[str]) -> str:
+def run_battle_logged(encounter: Encounter, seed: int):
     """
-    PCs focus Bugbear first, then Goblins.
+    Worker task for --event-log: run_battle's rows plus the battle's packed event records.
     """
-    if "Bugbear" in monsters_alive:
-        return "Bugbear"
-    # otherwise pick lowest-numbered goblin
-    goblins = sorted([m for m in monsters_alive if m.startswith("Goblin_")])
-    return goblins[0]
+    events = []
+    result = simulate_battle(encounter, random.Random(seed), _states_for(encounter), events)
+    return result_rows(encounter, seed, result), pack_events(events)
 
-def pick_target_mon(participants: dict, pcs_alive: list[str]) -> str:
+def run_battle_profiled(encounter: Encounter, seed: int):
     """
-    Monsters target lowest current HP PC.
-    Tie-breaker: lowest init_order (earlier actor) just to be deterministic.
+    Worker task for --profile: run_battle's rows plus nanoseconds spent in
+    (setup + initiative, combat loop, building rows), see sim_profiler.RUN_PHASES.
     """
-    return sorted(
-        pcs_alive,
-        key=lambda n: (participants[n]["hp"], participants[n]["init_order"])
-    )[0]
+    t0 = time.perf_counter_ns()
+    marks = []
+    result = simulate_battle(encounter, random.Random(seed), _states_for(encounter), marks=marks)
+    t2 = time.perf_counter_ns()
+    rows = result_rows(encounter, seed, result)
+    return rows, (marks[0] - t0, t2 - marks[0], time.perf_counter_ns() - t2)
 
 # -------------------------
 # Main simulation
 # -------------------------
 
-def main():
-    conn = sqlite3.connect(DB_PATH, timeout=30)
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run N combat simulations and write them to SQLite.")
+    parser.add_argument("--runs", type=int, default=NUM_RUNS, help=f"number of battles (default {NUM_RUNS})")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (default 1 = no pool)")
+    parser.add_argument("--seed", type=int, default=None, help="master seed (default: random)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help=f"runs per transaction (default {BATCH_SIZE})")
+    parser.add_argument("--engine", choices=("scalar", "vector"), default="scalar",
+                        help="scalar = combat_engine per run; vector = NumPy blocks (vector_engine.py)")
+    parser.add_argument("--columnar-dir", type=Path, default=None,
+                        help="also stream results to a columnar store in this directory (columnar_store.py)")
+    parser.add_argument("--aggregate", action="store_true",
+                        help="also keep running aggregates and write the agg_* tables (streaming_aggregator.py)")
+    parser.add_argument("--no-sqlite", action="store_true",
+                        help="skip the per-run SQLite fact tables (use with --columnar-dir and/or --aggregate)")
+    parser.add_argument("--target", action="append", default=[], metavar="METRIC:HALF_WIDTH",
+                        help="stop early once this win-rate CI is narrow enough, e.g. party_victory:0.005 "
+                             f"(repeatable; metrics: {', '.join(CONDITIONS)}); --runs becomes the cap")
+    parser.add_argument("--check-every", type=int, default=1000, help="runs between convergence checks (default 1000)")
+    parser.add_argument("--confidence", type=float, default=0.95, help="CI confidence level (default 0.95)")
+    parser.add_argument("--ci-method", choices=tuple(INTERVALS), default="wilson")
+    parser.add_argument("--event-log", type=Path, default=None, metavar="DIR",
+                        help="also record every attack roll in a binary event log here (event_log.py, scalar engine only)")
+    parser.add_argument("--profile", action="store_true",
+                        help="time each phase, report runs/s and per-run latency percentiles, "
+                             "and store a perf_profile row (sim_profiler.py, scalar engine only)")
+    parser.add_argument("--pstats", type=Path, default=None, metavar="FILE",
+                        help="with --profile: also run cProfile in this process and dump pstats here")
+    parser.add_argument("--encounter", default=ENCOUNTER_NAME, help="encounter_template.name")
+    parser.add_argument("--db", type=Path, default=DB_PATH, help="SQLite database path")
+    return parser.parse_args(argv)
+
+def print_sampler_status(sampler: SequentialSampler):
+    for row in sampler.status():
+        estimate = "n/a" if row["estimate"] is None else f"{row['estimate']:.4f}"
+        print(f"  {row['metric']:<22} runs={row['runs']:<8} p={estimate} "
+              f"±{row['half_width']:.4f} (target ±{row['target']}) {'met' if row['met'] else ''}")
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.runs < 1:
+        raise SystemExit("--runs must be >= 1")
+    if args.workers < 1:
+        raise SystemExit("--workers must be >= 1")
+    if args.batch_size < 1:
+        raise SystemExit("--batch-size must be >= 1")
+    if args.check_every < 1:
+        raise SystemExit("--check-every must be >= 1")
+    if not 0 < args.confidence < 1:
+        raise SystemExit("--confidence must be between 0 and 1 (exclusive)")
+    if args.no_sqlite and args.columnar_dir is None and not args.aggregate:
+        raise SystemExit("--no-sqlite needs --columnar-dir or --aggregate, otherwise results go nowhere")
+    if args.event_log is not None and args.engine != "scalar":
+        raise SystemExit("--event-log needs the scalar engine")
+    if args.pstats is not None:
+        args.profile = True
+    if args.profile and (args.engine != "scalar" or args.event_log is not None):
+        raise SystemExit("--profile measures the default path: scalar engine, no --event-log")
+    try:
+        targets = [PrecisionTarget.parse(t) for t in args.target]
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+    master_seed = args.seed if args.seed is not None else random.randint(1, 2**31 - 1)
+    profiler = Profiler() if args.profile else None
+
+    conn = sqlite3.connect(args.db, timeout=30)
     conn.execute("PRAGMA foreign_keys = ON;")
     conn.execute("PRAGMA busy_timeout = 30000;")
     try:
@@ -108,355 +201,166 @@ def main():
     except Exception:
         pass
 
-    # Encounter template id + round cap
-    row = conn.execute("""
-        SELECT encounter_template_id, round_cap 
-        FROM encounter_template 
-        WHERE name = ?;""",
-        (ENCOUNTER_NAME,)
-    ).fetchone()
-    if not row:
-        raise RuntimeError(f"Encounter template not found: {ENCOUNTER_NAME}")
-    et_id, round_cap = row[0], row[1] or ROUND_CAP_DEFAULT
-
-    members = conn.execute("""
-        SELECT side, slot_name, pc_id, monster_key
-        FROM encounter_template_member
-        WHERE encounter_template_id = ?
-        ORDER BY side, slot_name;
-    """, (et_id,)).fetchall()
-
-    if not members:
-        raise RuntimeError("No encounter members found.")
-
-    print(f"Simulating encounter_template_id={et_id} for {NUM_RUNS} runs...")
-
-    for run_n in range(1, NUM_RUNS + 1):
-        seed = random.randint(1, 2**31 - 1)
-        rng = random.Random(seed)
-
-        # Insert simulation_run placeholder
-        cur = conn.execute("""
-            INSERT INTO simulation_run
-              (encounter_template_id, seed, party_victory, winner, rounds_taken,
-               total_damage_party, total_damage_monsters, notes_flags_json)
-            VALUES (?, ?, 0, 'timeout', 0, 0, 0, ?);
-        """, (et_id, seed, '{"phase":"combat"}'))
-        run_id = cur.lastrowid
-
-        # -------------------------
-        # Instantiate participants dict keyed by slot_name
-        # -------------------------
-        participants = {}
-
-        for side, slot_name, pc_id, monster_key in members:
-            if pc_id is not None:
-                pc = conn.execute("""
-                    SELECT pc_id, name, ac, max_hp, dex_mod, attack_bonus, damage_dice, crits_on, features_enabled
-                    FROM dim_pc_template
-                    WHERE pc_id = ?;
-                """, (pc_id,)).fetchone()
-                if not pc:
-                    raise RuntimeError(f"PC template missing: {pc_id}")
-                _, _, ac, hp, dex_mod, atk_bonus, dmg_dice, crits_on, features = pc
-                participants[slot_name] = {
-                    "side": "party",
-                    "template_type": "pc",
-                    "pc_id": pc_id,
-                    "monster_key": None,
-                    "ac": int(ac),
-                    "hp_start": int(hp),
-                    "hp": int(hp),
-                    "init_mod": int(dex_mod),
-                    "attack_bonus": int(atk_bonus),
-                    "damage_dice": str(dmg_dice),
-                    "crits_on": str(crits_on),
-                    "features": str(features) if features is not None else "",
-                    # counters
-                    "damage_dealt": 0,
-                    "damage_taken": 0,
-                    "attacks": 0,
-                    "hits": 0,
-                    "crits": 0,
-                    # flags
-                    "opening_burst_triggered": 0,
-                    "hunters_mark_cast": 0,
-                    "hunters_mark_bonus_damage": 0,
-                }
-            else:
-                mon = conn.execute("""
-                    SELECT monster_key, monster_name, armor_class, hit_points, dex_mod, attack_bonus, damage_dice
-                    FROM dim_monster
-                    WHERE monster_key = ?;
-                """, (monster_key,)).fetchone()
-                if not mon:
-                    raise RuntimeError(f"Monster missing: monster_key={monster_key}")
-                _, _, ac, hp, dex_mod, atk_bonus, dmg_dice = mon
-                participants[slot_name] = {
-                    "side": "monsters",
-                    "template_type": "monster",
-                    "pc_id": None,
-                    "monster_key": int(monster_key),
-                    "ac": int(ac),
-                    "hp_start": int(hp),
-                    "hp": int(hp),
-                    "init_mod": int(dex_mod) if dex_mod is not None else 0,
-                    "attack_bonus": int(atk_bonus) if atk_bonus is not None else 0,
-                    "damage_dice": str(dmg_dice) if dmg_dice is not None else "1d4+0",
-                    "crits_on": "20",  # monsters crit only on nat 20
-                    "features": "",
-                    # counters
-                    "damage_dealt": 0,
-                    "damage_taken": 0,
-                    "attacks": 0,
-                    "hits": 0,
-                    "crits": 0,
-                    # flags (unused)
-                    "opening_burst_triggered": 0,
-                    "hunters_mark_cast": 0,
-                    "hunters_mark_bonus_damage": 0,
-                }
-
-        # -------------------------
-        # Initiative
-        # -------------------------
-        init_list = []
-        for name, p in participants.items():
-            r = roll(rng, 20)
-            p["init_roll_d20"] = r
-            p["init_total"] = r + p["init_mod"]
-            init_list.append(name)
-
-        rng.shuffle(init_list)
-        init_list.sort(key=lambda n: (participants[n]["init_total"], participants[n]["init_mod"]), reverse=True)
-        for order, n in enumerate(init_list, start=1):
-            participants[n]["init_order"] = order
-
-        # -------------------------
-        # Feature state
-        # -------------------------
-        marked_target = None  # Hunter's Mark target name
-        opening_burst_available = True  # Rogue bonus available once
-
-        # First-round tracking
-        damage_party_before_first_monster_turn = 0
-        monsters_downed_before_first_monster_turn = 0
-        party_downed_before_first_player_turn = 0
-        first_monster_acted = False
-        first_player_acted = False
-        bugbear_killed_round = None
-
-        # -------------------------
-        # Combat loop
-        # -------------------------
-        def alive_party():
-            return [n for n, p in participants.items() if p["side"] == "party" and p["hp"] > 0]
-
-        def alive_monsters():
-            return [n for n, p in participants.items() if p["side"] == "monsters" and p["hp"] > 0]
-
-        winner = "timeout"
-        rounds_taken = 0
-
-        for round_no in range(1, round_cap + 1):
-            rounds_taken = round_no
-
-            for actor in init_list:
-                ap = participants[actor]
-                if ap["hp"] <= 0:
-                    continue
-
-                # mark the moment the first monster takes a turn
-                if ap["side"] == "monsters" and not first_monster_acted:
-                    first_monster_acted = True
-                if ap["side"] == "party" and not first_player_acted:
-                    first_player_acted = True
-
-                pcs_alive = alive_party()
-                mons_alive = alive_monsters()
-
-                if not pcs_alive:
-                    winner = "monsters"
-                    break
-                if not mons_alive:
-                    winner = "party"
-                    break
-
-                # Ranger casts Hunter's Mark on its first turn of round 1
-                if actor == "Ranger" and round_no == 1 and ap["hunters_mark_cast"] == 0:
-                    # Choose target: Bugbear if alive else first goblin
-                    target = pick_target_pc(mons_alive)
-                    marked_target = target
-                    ap["hunters_mark_cast"] = 1
-
-                # Choose target
-                if ap["side"] == "party":
-                    target = pick_target_pc(mons_alive)
+    t = time.perf_counter_ns()
+    et_id, encounter = load_encounter(conn, args.encounter)
+    if profiler is not None:
+        profiler.add("load_encounter", time.perf_counter_ns() - t)
+
+    sampler = None
+    if targets:
+        sampler = SequentialSampler(targets, confidence=args.confidence, method=args.ci_method)
+
+    notes = {"phase": "combat", "master_seed": master_seed}
+    if args.engine != "scalar":
+        notes["engine"] = args.engine
+    notes = json.dumps(notes, separators=(",", ":"))
+
+    params = {"runs": args.runs, "workers": args.workers, "batch_size": args.batch_size}
+    if sampler is not None:
+        params.update(targets={t.metric: t.half_width for t in targets}, confidence=args.confidence,
+                      ci_method=args.ci_method, check_every=args.check_every)
+    if args.event_log is not None:
+        params["event_log"] = str(args.event_log)
+    batch_id = start_batch(conn, et_id, "combat", engine=args.engine, master_seed=master_seed, params=params)
+
+    print(f"Simulating encounter_template_id={et_id} for {'up to ' if sampler else ''}{args.runs} runs "
+          f"(master_seed={master_seed}, workers={args.workers}, engine={args.engine})...")
+
+    sinks = []
+    if not args.no_sqlite:
+        sinks.append(SqliteResultSink(conn, batch_size=args.batch_size, profiler=profiler))
+    columnar = None
+    if args.columnar_dir is not None:
+        from columnar_store import ColumnarResultSink
+        columnar = ColumnarResultSink(args.columnar_dir, batch_size=args.batch_size)
+        sinks.append(columnar)
+    aggregator = None
+    if args.aggregate:
+        from streaming_aggregator import StreamingAggregator
+        aggregator = StreamingAggregator(conn, et_id, notes, batch_id=batch_id)
+        sinks.append(aggregator)
+    # consumers that take per-run rows (all of them on the scalar path)
+    row_sinks = list(sinks)
+    if sampler is not None:
+        row_sinks.append(sampler)
+    event_log = EventLogWriter(args.event_log, batch_id) if args.event_log is not None else None
+
+    run_n = 0
+    sink_ns = 0
+    attacks_col = PARTICIPANT_RUN_COLUMNS.index("attacks_made")
+
+    def feed(rows):
+        nonlocal run_n, sink_ns
+        for row in rows:
+            if event_log is not None:
+                # events are written in run order, so a run's index in the batch finds them
+                row, packed = row
+                event_log.add_run(packed)
+            elif profiler is not None:
+                row, timing = row
+                profiler.add_run(timing)
+                profiler.count("rounds", row[0][3])
+                profiler.count("attacks", sum(p[attacks_col] for p in row[1]))
+                t = time.perf_counter_ns()
+            run_values, participant_rows, first_round_row = row
+            run_row = (et_id,) + run_values + (notes, batch_id)
+            for sink in row_sinks:
+                sink.add_run(run_row, participant_rows, first_round_row)
+            if profiler is not None:
+                sink_ns += time.perf_counter_ns() - t
+            run_n += 1
+            if run_n % 500 == 0:
+                winner, rounds_taken = run_values[2], run_values[3]
+                print(f"Run {run_n}/{args.runs} done (winner={winner}, rounds={rounds_taken})")
+
+    # Runs are simulated in chunks. With --target the chunk is --check-every and the
+    # loop stops at the first chunk where every interval is narrow enough (--runs is the cap).
+    chunk = args.check_every if sampler is not None else args.runs
+
+    cprofile = None
+    if args.pstats is not None:
+        import cProfile
+        cprofile = cProfile.Profile()
+        cprofile.enable()
+
+    if args.engine == "vector":
+        # numpy is only needed for this engine
+        import numpy as np
+        from vector_engine import block_rows, simulate_many
+
+        # the columnar store takes vector blocks directly, the other sinks take per-run rows
+        row_sinks = [sink for sink in row_sinks if sink is not columnar]
+        gen = np.random.default_rng(master_seed)
+        while run_n < args.runs:
+            k = min(chunk, args.runs - run_n)
+            for block in simulate_many(encounter, k, gen):
+                if columnar is not None:
+                    # columns go straight to the store, no per-run tuples
+                    columnar.add_block(et_id, encounter, block, notes, batch_id)
+                if row_sinks:
+                    feed(block_rows(encounter, block))
                 else:
-                    target = pick_target_mon(participants, pcs_alive)
-
-                tp = participants[target]
-                if tp["hp"] <= 0:
-                    continue
-
-                # Attack roll
-                ap["attacks"] += 1
-                d20_roll = roll(rng, 20)
-
-                # Assassinate Advantage rule 
-                used_assassinate_advantage = False
-                if actor == "Rogue" and round_no == 1:
-                    # Advantage if target hasn't taken a turn yet (i.e., target init_order is after Rogue)
-                    target_has_not_taken_turn = participants[target]["init_order"] > participants["Rogue"]["init_order"]
-
-                    if target_has_not_taken_turn:
-                        d20_roll_2 = roll(rng, 20)
-                        d20_roll = max(d20_roll, d20_roll_2)
-                        used_assassinate_advantage = True
-
-                hit = (d20_roll + ap["attack_bonus"]) >= tp["ac"]
-                crit = is_crit(ap["crits_on"], d20_roll)
-
-                if hit:
-                    ap["hits"] += 1
-                    if crit:
-                        ap["crits"] += 1
-
-                    dmg = roll_damage(rng, ap["damage_dice"], is_crit=crit)
-
-                    # Hunter's Mark bonus damage (Ranger hits marked target)
-                    if actor == "Ranger" and marked_target == target:
-                        hm = roll_damage(rng, "1d6+0", is_crit=crit)
-                        dmg += hm
-                        ap["hunters_mark_bonus_damage"] += hm
-
-                    # Opening burst (+2d6 once) if Rogue acts before target's first turn
-                    # Opening burst ONLY if Rogue used Assassinate Advantage on this attack, and it hits
-                    if actor == "Rogue" and opening_burst_available and used_assassinate_advantage:
-                        bonus = roll_damage(rng, "2d6+0", is_crit=False)  # bonus dice do not crit in this simplified model
-                        dmg += bonus
-                        ap["opening_burst_triggered"] = 1
-                        opening_burst_available = False
-
-                    # Apply damage
-                    tp["hp"] = max(0, tp["hp"] - dmg)
-                    ap["damage_dealt"] += dmg
-                    tp["damage_taken"] += dmg
-
-                    # First-round pre-monster-turn tracking
-                    if not first_monster_acted and ap["side"] == "party":
-                        damage_party_before_first_monster_turn += dmg
-                        if tp["hp"] <= 0 and tp["side"] == "monsters":
-                            monsters_downed_before_first_monster_turn += 1
-
-                    if not first_player_acted and ap["side"] == "monsters":
-                        if tp["hp"] <= 0 and tp["side"] == "party":
-                            party_downed_before_first_player_turn += 1
-
-                    # Track bugbear death
-                    if target == "Bugbear" and tp["hp"] == 0 and bugbear_killed_round is None:
-                        bugbear_killed_round = round_no
-
-                # Check end-of-fight mid-round
-                if not alive_party():
-                    winner = "monsters"
-                    break
-                if not alive_monsters():
-                    winner = "party"
+                    run_n += len(block["winner"])
+            if sampler is not None:
+                print_sampler_status(sampler)
+                if sampler.done():
                     break
-
-            if winner != "timeout":
-                break
-
-        party_victory = 1 if winner == "party" else 0
-
-        # -------------------------
-        # Write participant_run rows
-        # -------------------------
-        total_damage_party = 0
-        total_damage_monsters = 0
-
-        for name, p in participants.items():
-            if p["side"] == "party":
-                total_damage_party += p["damage_dealt"]
-            else:
-                total_damage_monsters += p["damage_dealt"]
-
-            conn.execute("""
-                INSERT INTO participant_run
-                  (run_id, side, name, template_type, pc_id, monster_key,
-                   hp_start, hp_end, alive_end,
-                   init_roll_d20, init_mod, init_total, init_order,
-                   damage_dealt_total, damage_taken_total, attacks_made, hits_landed, crits_landed,
-                   opening_burst_triggered, hunters_mark_cast, hunters_mark_bonus_damage)
-                VALUES (?, ?, ?, ?, ?, ?,
-                        ?, ?, ?,
-                        ?, ?, ?, ?,
-                        ?, ?, ?, ?, ?,
-                        ?, ?, ?);
-            """, (
-                run_id,
-                p["side"],
-                name,
-                p["template_type"],
-                p["pc_id"],
-                p["monster_key"],
-                p["hp_start"],
-                p["hp"],
-                1 if p["hp"] > 0 else 0,
-                p["init_roll_d20"],
-                p["init_mod"],
-                p["init_total"],
-                p["init_order"],
-                p["damage_dealt"],
-                p["damage_taken"],
-                p["attacks"],
-                p["hits"],
-                p["crits"],
-                p["opening_burst_triggered"],
-                p["hunters_mark_cast"],
-                p["hunters_mark_bonus_damage"],
-            ))
-
-        # first_round_events
-        conn.execute("""
-            INSERT INTO first_round_events
-              (run_id, damage_party_before_first_monster_turn,
-               monsters_downed_before_first_monster_turn,
-               party_downed_before_first_player_turn)
-            VALUES (?, ?, ?, ?);
-        """, (
-            run_id,
-            damage_party_before_first_monster_turn,
-            monsters_downed_before_first_monster_turn,
-            party_downed_before_first_player_turn
-        ))
-
-        # update simulation_run
-        conn.execute("""
-            UPDATE simulation_run
-            SET party_victory = ?,
-                winner = ?,
-                rounds_taken = ?,
-                total_damage_party = ?,
-                total_damage_monsters = ?,
-                bugbear_killed_round = ?
-            WHERE run_id = ?;
-        """, (
-            party_victory,
-            winner,
-            rounds_taken,
-            total_damage_party,
-            total_damage_monsters,
-            bugbear_killed_round,
-            run_id
-        ))
-
-        conn.commit()
-
-        if run_n % 500 == 0:
-            print(f"Run {run_n}/{NUM_RUNS} done (winner={winner}, rounds={rounds_taken})")
-
+    else:
+        # Workers only simulate; this process is the only one writing results.
+        task = run_battle_logged if event_log is not None else run_battle_profiled if profiler is not None else run_battle
+        with ParallelRunner(task, encounter, workers=args.workers) as runner:
+            while run_n < args.runs:
+                k = min(chunk, args.runs - run_n)
+                feed(runner.map([derive_seed(master_seed, i) for i in range(run_n, run_n + k)]))
+                if sampler is not None:
+                    print_sampler_status(sampler)
+                    if sampler.done():
+                        break
+
+    if profiler is not None:
+        # sink time minus the flushes that happened inside add_run (timed by the SQLite sink)
+        profiler.add("sinks", sink_ns - profiler.phase_ns.get("sqlite_insert", 0) - profiler.phase_ns.get("commit", 0))
+    for sink in sinks:
+        sink.close()
+    if event_log is not None:
+        event_log.close()
+    if cprofile is not None:
+        cprofile.disable()
+    t = time.perf_counter_ns()
+
+    if sampler is not None:
+        # record how many runs it took (and whether it converged) with the batch
+        params["sequential"] = sampler.describe()
+    finish_batch(conn, batch_id, run_n, params)
+    if not args.no_sqlite:
+        refresh_run_wide(conn)
+        build_cubes(conn, batch_id)
+    if profiler is not None:
+        profiler.add("finalize", time.perf_counter_ns() - t)
+        profiler.count("runs", run_n)
+        summary = profiler.summary(run_n)
+        write_summary(conn, batch_id, summary, args.engine, args.workers)
+
+    print(f"Batch {batch_id}: {run_n} runs.")
+    if event_log is not None:
+        print(f"Event log: {event_log.offset:,} bytes in {args.event_log} (replay with replay_battle.py RUN_ID)")
+    if sampler is not None:
+        state = "converged" if sampler.done() else "hit the --runs cap before converging"
+        print(f"Sequential sampling {state} after {sampler.runs} runs.")
+
+    if profiler is not None:
+        print("\n".join(format_summary(summary)))
+        print(f"Profile stored in perf_profile (batch_id={batch_id}).")
+    if cprofile is not None:
+        import pstats
+        cprofile.dump_stats(args.pstats)
+        if args.workers > 1:
+            print("Note: cProfile only sees this process, the battles ran in worker processes.")
+        pstats.Stats(cprofile).sort_stats("cumulative").print_stats(15)
+        print(f"pstats written to {args.pstats}")
+
+    if aggregator is not None:
+        print(f"Aggregates written to agg_* tables (study_id={aggregator.study_id}).")
     conn.close()
     print("Combat simulations complete.")
 
@@ -1,44 +1,31 @@
 # test: the simulation skeleton (initiative-only)
+# For initiative statistics use initiative_exact.py: it computes the order probabilities exactly.
 
 import sqlite3
 import random
 from pathlib import Path
 
+from combat_engine import CombatantState, roll_initiative
+from encounter_loader import load_encounter
+from simulation_batch import finish_batch, start_batch
+
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 DB_PATH = PROJECT_ROOT / "db" / "dnd_initiative_work.sqlite"
 
 ENCOUNTER_NAME = "L3 Trio vs 4 Goblins + 1 Bugbear"
 NUM_RUNS = 20  # start small; later bump to 10_000
 
-def d20(rng: random.Random) -> int:
-    return rng.randint(1, 20)
-
 def main():
     conn = sqlite3.connect(DB_PATH, timeout=30)
     conn.execute("PRAGMA foreign_keys = ON;")
     conn.execute("PRAGMA busy_timeout = 30000;")
 
-    # Find encounter_template_id
-    row = conn.execute(
-        "SELECT encounter_template_id FROM encounter_template WHERE name = ?;",
-        (ENCOUNTER_NAME,)
-    ).fetchone()
-    if not row:
-        raise RuntimeError(f"Encounter template not found: {ENCOUNTER_NAME}")
-    et_id = row[0]
+    # Resolve the encounter template once (members + dim stats in one query)
+    et_id, encounter = load_encounter(conn, ENCOUNTER_NAME)
 
-    # Loads encounter members from encounter_template_member
-    members = conn.execute("""
-        SELECT side, slot_name, pc_id, monster_key
-        FROM encounter_template_member
-        WHERE encounter_template_id = ?
-        ORDER BY side, slot_name;
-    """, (et_id,)).fetchall()
+    print(f"Loaded {len(encounter.combatants)} members for encounter_template_id={et_id}")
 
-    if not members:
-        raise RuntimeError("No encounter_template_member rows found. Did you seed them?")
-
-    print(f"Loaded {len(members)} members for encounter_template_id={et_id}")
+    batch_id = start_batch(conn, et_id, "initiative_only", params={"runs": NUM_RUNS})
 
     for run_n in range(1, NUM_RUNS + 1):
         seed = random.randint(1, 2**31 - 1)
@@ -49,65 +36,20 @@ def main():
         cur = conn.execute("""
             INSERT INTO simulation_run
               (encounter_template_id, seed, party_victory, winner, rounds_taken,
-               total_damage_party, total_damage_monsters, notes_flags_json)
-            VALUES (?, ?, 0, 'timeout', 0, 0, 0, ?);
-        """, (et_id, seed, '{"phase":"initiative_only"}'))
+               total_damage_party, total_damage_monsters, notes_flags_json, batch_id)
+            VALUES (?, ?, 0, 'timeout', 0, 0, 0, ?, ?);
+        """, (et_id, seed, '{"phase":"initiative_only"}', batch_id))
         run_id = cur.lastrowid
 
-        # Build participants: pull stats from either dim_pc_template or dim_monster
-        participants = []
-        for side, slot_name, pc_id, monster_key in members:
-            if pc_id is not None:  # PC
-                pc = conn.execute("""
-                    SELECT pc_id, name, ac, max_hp, dex_mod
-                    FROM dim_pc_template
-                    WHERE pc_id = ?;
-                """, (pc_id,)).fetchone()
-                if not pc:
-                    raise RuntimeError(f"PC template missing: {pc_id}")
-                _, pc_name, ac, hp, dex_mod = pc
-                participants.append({
-                    "side": "party",
-                    "name": slot_name,           # keep slot name stable ("Rogue")
-                    "template_type": "pc",
-                    "pc_id": pc_id,
-                    "monster_key": None,
-                    "ac": int(ac),
-                    "hp_start": int(hp),
-                    "init_mod": int(dex_mod),
-                })
-            else:  # Monster
-                mon = conn.execute("""
-                    SELECT monster_key, monster_name, armor_class, hit_points, dex_mod
-                    FROM dim_monster
-                    WHERE monster_key = ?;
-                """, (monster_key,)).fetchone()
-                if not mon:
-                    raise RuntimeError(f"Monster missing: monster_key={monster_key}")
-                _, mon_name, ac, hp, dex_mod = mon
-                participants.append({
-                    "side": "monsters",
-                    "name": slot_name,           # keep slot name stable ("Goblin_1")
-                    "template_type": "monster",
-                    "pc_id": None,
-                    "monster_key": int(monster_key),
-                    "ac": int(ac),
-                    "hp_start": int(hp),
-                    "init_mod": int(dex_mod) if dex_mod is not None else 0,
-                })
-
-        # Roll initiative
-        for p in participants:
-            roll = d20(rng)
-            p["init_roll_d20"] = roll
-            p["init_total"] = roll + p["init_mod"]
-
-        # Sort by initiative_total desc, then init_mod desc, then random tie-break
-        rng.shuffle(participants)
-        participants.sort(key=lambda x: (x["init_total"], x["init_mod"]), reverse=True)
+        # Per-run state only; static stats live on the shared Combatant specs
+        states = [CombatantState(c) for c in encounter.combatants]
+
+        # Roll initiative: init_total desc, then init_mod desc, then random tie-break
+        order_list = roll_initiative(states, rng)
 
         # Write participant_run rows
-        for order, p in enumerate(participants, start=1):
+        for st in order_list:
+            c = st.spec
             conn.execute("""
                 INSERT INTO participant_run
                   (run_id, side, name, template_type, pc_id, monster_key,
@@ -122,22 +64,23 @@ def main():
                         0, 0, 0);
             """, (
                 run_id,
-                p["side"],
-                p["name"],
-                p["template_type"],
-                p["pc_id"],
-                p["monster_key"],
-                p["hp_start"],
-                p["hp_start"],   # hp_end = hp_start for now
-                p["init_roll_d20"],
-                p["init_mod"],
-                p["init_total"],
-                order,
+                c.side,
+                c.name,                # keep slot name stable ("Rogue", "Goblin_1")
+                c.template_type,
+                c.pc_id,
+                c.monster_key,
+                c.hp_total,
+                c.hp_total,   # hp_end = hp_start for now
+                st.init_roll_d20,
+                c.init_mod,
+                st.init_total,
+                st.init_order,
             ))
 
         conn.commit()
         print(f"Run {run_n}/{NUM_RUNS} inserted (run_id={run_id}, seed={seed})")
 
+    finish_batch(conn, batch_id, NUM_RUNS)
     conn.close()
     print("✅ Initiative-only simulations complete.")
 
@@ -0,0 +1,39 @@
+"""
+simulation_batch rows: one per simulator invocation, with its phase, engine, master seed,
+parameters and start / finish times. simulation_run.batch_id points here, so analysis
+queries filter on an indexed key instead of LIKE-scanning notes_flags_json.
+"""
+
+import json
+import sqlite3
+
+from combat_engine import ENGINE_VERSION
+
+def start_batch(conn: sqlite3.Connection, encounter_template_id: int, phase: str,
+                engine: str | None = None, master_seed: int | None = None, params: dict | None = None) -> int:
+    """
+    Insert (and commit) the batch row before any runs are written. Returns batch_id.
+    """
+    cur = conn.execute("""
+        INSERT INTO simulation_batch
+          (encounter_template_id, phase, engine, engine_version, master_seed, params_json)
+        VALUES (?, ?, ?, ?, ?, ?);
+    """, (
+        encounter_template_id, phase, engine, ENGINE_VERSION, master_seed,
+        json.dumps(params, separators=(",", ":")) if params is not None else None,
+    ))
+    conn.commit()
+    return cur.lastrowid
+
+def finish_batch(conn: sqlite3.Connection, batch_id: int, runs: int, params: dict | None = None):
+    """
+    Record the run count and finish time; params (if given) replaces params_json.
+    """
+    conn.execute("""
+        UPDATE simulation_batch
+        SET runs = ?,
+            finished_at_utc = strftime('%Y-%m-%dT%H:%M:%fZ','now'),
+            params_json = COALESCE(?, params_json)
+        WHERE batch_id = ?;
+    """, (runs, json.dumps(params, separators=(",", ":")) if params is not None else None, batch_id))
+    conn.commit()
@@ -0,0 +1,258 @@
+"""
+Online aggregation of simulation results: running counters and Welford means/variances,
+updated per battle and written as a handful of agg_* summary tables at the end.
+
+Covers what sql/analysis_queries.sql computes from the per-run facts (outcomes, win rate by
+party initiative sum, Rogue-beats-Bugbear, alpha-strike buckets, opening burst, per-participant
+damage / survival split by victory), so a 10M-run study needs no per-run storage and runs in
+constant memory. Same add_run() / close() interface as result_sink.SqliteResultSink.
+"""
+
+import math
+import sqlite3
+from collections import defaultdict
+
+from result_sink import FIRST_ROUND_COLUMNS, PARTICIPANT_RUN_COLUMNS, SIMULATION_RUN_COLUMNS
+
+RUN_METRICS = (
+    "rounds_taken",
+    "total_damage_party",
+    "total_damage_monsters",
+    "damage_party_before_first_monster_turn",
+)
+
+_RUN = {c: i for i, c in enumerate(SIMULATION_RUN_COLUMNS)}
+_PR = {c: i for i, c in enumerate(PARTICIPANT_RUN_COLUMNS)}
+_FRE = {c: i for i, c in enumerate(FIRST_ROUND_COLUMNS)}
+
+def alpha_strike_bucket(damage: int) -> str:
+    """
+    Same buckets as query C in analysis_queries.sql.
+    """
+    if damage < 1:
+        return "0"
+    if damage < 5:
+        return "1-4"
+    if damage < 15:
+        return "5-14"
+    if damage < 25:
+        return "15-24"
+    return "25+"
+
+# -------------------------
+# Running statistics
+# -------------------------
+
+class RunningStat:
+    """
+    Welford's online mean / variance.
+    """
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x: float):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def merge(self, other: "RunningStat"):
+        """
+        Combine with another RunningStat (Chan et al.), e.g. from a worker process.
+        """
+        if other.n == 0:
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def stddev(self) -> float:
+        return math.sqrt(self.variance)
+
+class RateCounter:
+    """
+    runs / wins for one group.
+    """
+    __slots__ = ("runs", "wins")
+
+    def __init__(self):
+        self.runs = 0
+        self.wins = 0
+
+    def add(self, won: int):
+        self.runs += 1
+        self.wins += won
+
+class ParticipantAgg:
+    __slots__ = ("runs", "alive", "attacks", "hits", "crits", "opening_burst", "hm_cast", "hm_bonus",
+                 "damage_dealt", "damage_taken")
+
+    def __init__(self):
+        self.runs = 0
+        self.alive = 0
+        self.attacks = 0
+        self.hits = 0
+        self.crits = 0
+        self.opening_burst = 0
+        self.hm_cast = 0
+        self.hm_bonus = 0
+        self.damage_dealt = RunningStat()
+        self.damage_taken = RunningStat()
+
+# -------------------------
+# Aggregator
+# -------------------------
+
+class StreamingAggregator:
+    """
+    Consumes runs one at a time and keeps only grouped summaries.
+    rogue_name / bugbear_name pick the slots used by the Rogue-vs-Bugbear and
+    opening-burst summaries (skipped if the encounter has no such slot).
+    """
+
+    def __init__(self, conn: sqlite3.Connection, encounter_template_id: int, notes_flags_json: str | None = None,
+                 rogue_name: str = "Rogue", bugbear_name: str = "Bugbear", batch_id: int | None = None):
+        self.conn = conn
+        self.encounter_template_id = encounter_template_id
+        self.notes_flags_json = notes_flags_json
+        self.rogue_name = rogue_name
+        self.bugbear_name = bugbear_name
+        self.batch_id = batch_id
+        self.study_id = None
+
+        self.runs = 0
+        self.outcomes = defaultdict(int)
+        self.run_metrics = {m: RunningStat() for m in RUN_METRICS}
+        self.party_init = defaultdict(RateCounter)
+        self.rogue_bugbear = defaultdict(RateCounter)
+        self.alpha_strike = defaultdict(RateCounter)
+        self.opening_burst = defaultdict(RateCounter)
+        self.opening_burst_rounds = defaultdict(RunningStat)
+        self.opening_burst_rogue_damage = defaultdict(RunningStat)
+        self.participants = defaultdict(ParticipantAgg)
+
+    def add_run(self, run_row: tuple, participant_rows: list[tuple], first_round_row: tuple):
+        won = run_row[_RUN["party_victory"]]
+        self.runs += 1
+        self.outcomes[run_row[_RUN["winner"]]] += 1
+        for m in RUN_METRICS[:3]:
+            self.run_metrics[m].add(run_row[_RUN[m]])
+        alpha = first_round_row[_FRE["damage_party_before_first_monster_turn"]]
+        self.run_metrics["damage_party_before_first_monster_turn"].add(alpha)
+        self.alpha_strike[alpha_strike_bucket(alpha)].add(won)
+
+        party_init = 0
+        rogue = bugbear = None
+        for p in participant_rows:
+            side = p[_PR["side"]]
+            name = p[_PR["name"]]
+            if side == "party":
+                party_init += p[_PR["init_total"]]
+            if name == self.rogue_name:
+                rogue = p
+            elif name == self.bugbear_name:
+                bugbear = p
+
+            agg = self.participants[(won, side, name)]
+            agg.runs += 1
+            agg.alive += p[_PR["alive_end"]]
+            agg.attacks += p[_PR["attacks_made"]]
+            agg.hits += p[_PR["hits_landed"]]
+            agg.crits += p[_PR["crits_landed"]]
+            agg.opening_burst += p[_PR["opening_burst_triggered"]]
+            agg.hm_cast += p[_PR["hunters_mark_cast"]]
+            agg.hm_bonus += p[_PR["hunters_mark_bonus_damage"]]
+            agg.damage_dealt.add(p[_PR["damage_dealt_total"]])
+            agg.damage_taken.add(p[_PR["damage_taken_total"]])
+
+        self.party_init[party_init].add(won)
+
+        if rogue is not None:
+            burst = rogue[_PR["opening_burst_triggered"]]
+            self.opening_burst[burst].add(won)
+            self.opening_burst_rounds[burst].add(run_row[_RUN["rounds_taken"]])
+            self.opening_burst_rogue_damage[burst].add(rogue[_PR["damage_dealt_total"]])
+
+            if bugbear is not None:
+                # same definition as query B (initiative total, then init_mod; no random tie-break)
+                r_total, b_total = rogue[_PR["init_total"]], bugbear[_PR["init_total"]]
+                beats = r_total > b_total or (r_total == b_total and rogue[_PR["init_mod"]] > bugbear[_PR["init_mod"]])
+                self.rogue_bugbear[1 if beats else 0].add(won)
+
+    def flush(self):
+        # nothing buffered per run
+        pass
+
+    def close(self):
+        """
+        Write the agg_* tables in one transaction. Returns the new study_id.
+        """
+        conn = self.conn
+        try:
+            cur = conn.execute("""
+                INSERT INTO agg_study (encounter_template_id, runs, notes_flags_json, batch_id)
+                VALUES (?, ?, ?, ?);
+            """, (self.encounter_template_id, self.runs, self.notes_flags_json, self.batch_id))
+            sid = cur.lastrowid
+
+            conn.executemany(
+                "INSERT INTO agg_outcome (study_id, winner, runs) VALUES (?, ?, ?);",
+                [(sid, w, n) for w, n in sorted(self.outcomes.items())],
+            )
+            conn.executemany(
+                "INSERT INTO agg_run_metric (study_id, metric, n, mean, variance) VALUES (?, ?, ?, ?, ?);",
+                [(sid, m, s.n, s.mean, s.variance) for m, s in self.run_metrics.items()],
+            )
+            conn.executemany(
+                "INSERT INTO agg_party_init (study_id, party_init, runs, wins) VALUES (?, ?, ?, ?);",
+                [(sid, k, c.runs, c.wins) for k, c in sorted(self.party_init.items())],
+            )
+            conn.executemany(
+                "INSERT INTO agg_rogue_bugbear (study_id, rogue_beats_bugbear, runs, wins) VALUES (?, ?, ?, ?);",
+                [(sid, k, c.runs, c.wins) for k, c in sorted(self.rogue_bugbear.items())],
+            )
+            conn.executemany(
+                "INSERT INTO agg_alpha_strike (study_id, dmg_bucket, runs, wins) VALUES (?, ?, ?, ?);",
+                [(sid, k, c.runs, c.wins) for k, c in sorted(self.alpha_strike.items())],
+            )
+            conn.executemany("""
+                INSERT INTO agg_opening_burst
+                  (study_id, opening_burst_triggered, runs, wins, avg_rounds,
+                   avg_rogue_damage, var_rogue_damage)
+                VALUES (?, ?, ?, ?, ?, ?, ?);
+            """, [
+                (sid, k, c.runs, c.wins, self.opening_burst_rounds[k].mean,
+                 self.opening_burst_rogue_damage[k].mean, self.opening_burst_rogue_damage[k].variance)
+                for k, c in sorted(self.opening_burst.items())
+            ])
+            conn.executemany("""
+                INSERT INTO agg_participant
+                  (study_id, party_victory, side, name, runs, alive_runs,
+                   attacks_sum, hits_sum, crits_sum, opening_burst_sum, hunters_mark_cast_sum,
+                   hunters_mark_bonus_sum,
+                   avg_damage_dealt, var_damage_dealt, avg_damage_taken, var_damage_taken)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+            """, [
+                (sid, won, side, name, a.runs, a.alive,
+                 a.attacks, a.hits, a.crits, a.opening_burst, a.hm_cast, a.hm_bonus,
+                 a.damage_dealt.mean, a.damage_dealt.variance, a.damage_taken.mean, a.damage_taken.variance)
+                for (won, side, name), a in sorted(self.participants.items())
+            ])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        self.study_id = sid
+        return sid
@@ -0,0 +1,313 @@
+"""
+Parameter sweep over encounter variants: one grid in, one encounter template and one
+simulation batch per grid cell out, no hand-edited constants or re-seeding.
+
+Axes (any subset; missing ones keep the base encounter's value):
+
+    target_selection_pc / target_selection_mon   targeting.POLICIES names
+    goblins            number of Goblin_n slots (the Bugbear and the PCs stay)
+    pc_dex_delta       added to every PC's dex_mod, i.e. initiative (attack bonus unchanged)
+    round_cap          encounter round cap
+    disable_features   features removed from the PCs, e.g. ["hunters_mark"]
+
+Each cell is keyed by a content hash of (base encounter, parameters, master seed, engine version)
+in sweep_cell, so cells that are already complete are skipped, also when another sweep shares
+them. The cell's batch is its checkpoint: runs are committed every --batch-size runs and seeds
+come from derive_seed(master_seed, run_index), so an interrupted sweep continues each cell at the
+first run not yet in the database and ends with the same results as an uninterrupted one.
+All cells use the same master seed, so run i of every cell starts from the same seed.
+
+    python src/sweep.py --dry-run                 # list the default sweep's cells
+    python src/sweep.py --grid sweep.json --workers 4
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import sqlite3
+from pathlib import Path
+
+from build_cubes import build_cubes
+from combat_engine import ENGINE_VERSION
+from encounter_loader import load_encounter
+from parallel_runner import ParallelRunner
+from result_sink import SqliteResultSink
+from run_wide import refresh_run_wide
+from simulate_combat import BATCH_SIZE, ENCOUNTER_NAME, derive_seed, run_battle
+from simulation_batch import finish_batch, start_batch
+from targeting import get_policy
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DB_PATH = PROJECT_ROOT / "db" / "dnd_initiative_work.sqlite"
+
+AXES = ("target_selection_pc", "target_selection_mon", "goblins", "pc_dex_delta", "round_cap", "disable_features")
+FEATURES = ("hunters_mark", "opening_burst", "assassinate_advantage")
+
+# The targeting stress test from the README's next steps
+DEFAULT_SWEEP = {
+    "name": "targeting_stress",
+    "base_encounter": ENCOUNTER_NAME,
+    "runs": 5000,
+    "master_seed": 42,
+    "grid": {
+        "target_selection_mon": ["lowest_hp", "random", "weighted_random", "threat"],
+        "goblins": [2, 4, 6],
+        "pc_dex_delta": [0, 2],
+    },
+}
+
+# -------------------------
+# Grid -> cells
+# -------------------------
+
+def base_params(conn: sqlite3.Connection, base_encounter: str) -> dict:
+    row = conn.execute("""
+        SELECT encounter_template_id, target_selection_pc, target_selection_mon, round_cap
+        FROM encounter_template
+        WHERE name = ?;""",
+        (base_encounter,)
+    ).fetchone()
+    if not row:
+        raise RuntimeError(f"Encounter template not found: {base_encounter}")
+    goblins = conn.execute("""
+        SELECT COUNT(*) FROM encounter_template_member
+        WHERE encounter_template_id = ? AND slot_name LIKE 'Goblin\\_%' ESCAPE '\\';""",
+        (row[0],)
+    ).fetchone()[0]
+    return {
+        "target_selection_pc": row[1], "target_selection_mon": row[2], "goblins": goblins,
+        "pc_dex_delta": 0, "round_cap": row[3], "disable_features": [],
+    }
+
+def expand_grid(sweep: dict, base: dict) -> list[dict]:
+    """
+    Every combination of the grid's axes, on top of the base encounter's values.
+    """
+    grid = sweep.get("grid", {})
+    unknown = set(grid) - set(AXES)
+    if unknown:
+        raise ValueError(f"Unknown sweep axes {sorted(unknown)}, choose from {', '.join(AXES)}")
+    axes = [a for a in AXES if a in grid]
+    cells = []
+    for values in itertools.product(*(grid[a] for a in axes)):
+        params = {**base, **dict(zip(axes, values))}
+        params["disable_features"] = sorted(params["disable_features"])
+        for policy in (params["target_selection_pc"], params["target_selection_mon"]):
+            get_policy(policy)
+        bad = set(params["disable_features"]) - set(FEATURES)
+        if bad:
+            raise ValueError(f"Unknown features {sorted(bad)}, choose from {', '.join(FEATURES)}")
+        cells.append(params)
+    return cells
+
+def cell_hash(base_encounter: str, params: dict, master_seed: int) -> str:
+    key = {"base": base_encounter, "params": params, "master_seed": master_seed, "engine_version": ENGINE_VERSION}
+    return hashlib.sha256(json.dumps(key, sort_keys=True, separators=(",", ":")).encode()).hexdigest()[:16]
+
+def cell_label(params: dict) -> str:
+    off = "+".join(params["disable_features"]) or "none"
+    return (f"pc={params['target_selection_pc']}, mon={params['target_selection_mon']}, "
+            f"goblins={params['goblins']}, dex{params['pc_dex_delta']:+d}, cap={params['round_cap']}, off={off}")
+
+# -------------------------
+# Templates (bulk, one transaction)
+# -------------------------
+
+def pc_variant(conn: sqlite3.Connection, pc_id: str, dex_delta: int, disabled: list[str]) -> str:
+    """
+    dim_pc_template row with dex_mod shifted and features removed (the base pc_id if nothing changes).
+    """
+    cols = [r[1] for r in conn.execute("PRAGMA table_info(dim_pc_template);")]
+    row = dict(zip(cols, conn.execute("SELECT * FROM dim_pc_template WHERE pc_id = ?;", (pc_id,)).fetchone()))
+    tokens = [t for t in (row["features_enabled"] or "").split(";") if t]
+    removed = [f for f in disabled if any(t.startswith(f) for t in tokens)]
+    if not dex_delta and not removed:
+        return pc_id
+    row["pc_id"] = pc_id + (f"~dex{dex_delta:+d}" if dex_delta else "") + "".join(f"~no_{f}" for f in removed)
+    row["dex_mod"] = (row["dex_mod"] or 0) + dex_delta
+    row["features_enabled"] = ";".join(t for t in tokens if not any(t.startswith(f) for f in removed))
+    conn.execute(f"INSERT OR IGNORE INTO dim_pc_template ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))});",
+                 [row[c] for c in cols])
+    return row["pc_id"]
+
+def create_template(conn: sqlite3.Connection, base_encounter: str, params: dict) -> str:
+    """
+    Encounter template for one cell (INSERT OR IGNORE, so re-running a sweep reuses it). Returns its name.
+    """
+    name = f"{base_encounter} [{cell_label(params)}]"
+    base_id = conn.execute("SELECT encounter_template_id FROM encounter_template WHERE name = ?;",
+                           (base_encounter,)).fetchone()[0]
+    conn.execute("""
+        INSERT OR IGNORE INTO encounter_template
+          (name, description, target_selection_pc, target_selection_mon, round_cap)
+        VALUES (?, ?, ?, ?, ?);
+    """, (name, f"Sweep variant of {base_encounter}: {cell_label(params)}.",
+          params["target_selection_pc"], params["target_selection_mon"], params["round_cap"]))
+    et_id = conn.execute("SELECT encounter_template_id FROM encounter_template WHERE name = ?;", (name,)).fetchone()[0]
+
+    members = conn.execute("""
+        SELECT side, slot_name, pc_id, monster_key, quantity
+        FROM encounter_template_member
+        WHERE encounter_template_id = ?;""",
+        (base_id,)
+    ).fetchall()
+    goblin_key = next((m[3] for m in members if m[1].startswith("Goblin_")), None)
+    if goblin_key is None and params["goblins"]:
+        goblin_key = conn.execute("SELECT monster_key FROM dim_monster WHERE lower(monster_name)='goblin';").fetchone()[0]
+    rows = []
+    for side, slot_name, pc_id, monster_key, quantity in members:
+        if slot_name.startswith("Goblin_"):
+            continue
+        if pc_id is not None:
+            pc_id = pc_variant(conn, pc_id, params["pc_dex_delta"], params["disable_features"])
+        rows.append((et_id, side, slot_name, pc_id, monster_key, quantity))
+    rows += [(et_id, "monsters", f"Goblin_{i}", None, goblin_key, 1) for i in range(1, params["goblins"] + 1)]
+    conn.executemany("""
+        INSERT OR IGNORE INTO encounter_template_member
+          (encounter_template_id, side, slot_name, pc_id, monster_key, quantity)
+        VALUES (?, ?, ?, ?, ?, ?);
+    """, rows)
+    return name
+
+# -------------------------
+# Running cells
+# -------------------------
+
+def run_cell_battle(encounters: tuple, item: tuple):
+    """
+    Worker task: item is (cell index, seed); the encounters reach each worker once.
+    """
+    cell_i, seed = item
+    return run_battle(encounters[cell_i], seed)
+
+def cell_state(conn: sqlite3.Connection, h: str):
+    """
+    (status, batch_id, runs already stored) for a cell, or None if it was never started.
+    """
+    row = conn.execute("SELECT status, batch_id FROM sweep_cell WHERE cell_hash = ?;", (h,)).fetchone()
+    if row is None:
+        return None
+    status, batch_id = row
+    done = 0
+    if batch_id is not None:
+        done = conn.execute("SELECT COUNT(*) FROM simulation_run WHERE batch_id = ?;", (batch_id,)).fetchone()[0]
+    return status, batch_id, done
+
+def run_cell(conn, runner, cell_i: int, cell: dict, sweep: dict, batch_size: int):
+    et_id, h, master_seed, target = cell["et_id"], cell["hash"], sweep["master_seed"], sweep["runs"]
+    state = cell_state(conn, h)
+    batch_id, done = (state[1], state[2]) if state else (None, 0)
+    params = {"runs": target, "sweep": sweep["name"], "cell_hash": h, "cell": cell["params"]}
+    if batch_id is None:
+        batch_id = start_batch(conn, et_id, "sweep", engine="scalar", master_seed=master_seed, params=params)
+        conn.execute("""
+            INSERT OR REPLACE INTO sweep_cell
+              (cell_hash, sweep_name, params_json, encounter_template_id, batch_id, runs_target, runs_done, status)
+            VALUES (?, ?, ?, ?, ?, ?, 0, 'running');
+        """, (h, sweep["name"], json.dumps(cell["params"], sort_keys=True), et_id, batch_id, target))
+        conn.commit()
+    else:
+        conn.execute("UPDATE sweep_cell SET runs_target = ?, status = 'running' WHERE cell_hash = ?;", (target, h))
+        conn.commit()
+        if done:
+            print(f"  resuming at run {done}/{target}")
+
+    notes = json.dumps({"phase": "sweep", "master_seed": master_seed}, separators=(",", ":"))
+    sink = SqliteResultSink(conn, batch_size=batch_size)
+    while done < target:
+        k = min(batch_size, target - done)
+        for run_values, participant_rows, first_round_row in runner.map(
+                [(cell_i, derive_seed(master_seed, i)) for i in range(done, done + k)]):
+            sink.add_run((et_id,) + run_values + (notes, batch_id), participant_rows, first_round_row)
+        sink.flush()
+        done += k
+        # checkpoint (informational: a resume recounts the batch's stored runs)
+        conn.execute("""
+            UPDATE sweep_cell SET runs_done = ?, updated_at_utc = strftime('%Y-%m-%dT%H:%M:%fZ','now')
+            WHERE cell_hash = ?;""", (done, h))
+        conn.commit()
+
+    finish_batch(conn, batch_id, done, params)
+    refresh_run_wide(conn)
+    build_cubes(conn, batch_id)
+    conn.execute("""
+        UPDATE sweep_cell SET runs_done = ?, status = 'complete', updated_at_utc = strftime('%Y-%m-%dT%H:%M:%fZ','now')
+        WHERE cell_hash = ?;""", (done, h))
+    conn.commit()
+    return batch_id
+
+# -------------------------
+# Main
+# -------------------------
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run a parameter sweep over encounter variants.")
+    parser.add_argument("--grid", type=Path, default=None,
+                        help="sweep JSON: name, base_encounter, runs, master_seed, grid {axis: [values]} "
+                             "(default: the built-in targeting stress sweep)")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (default 1 = no pool)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help=f"runs per checkpoint (default {BATCH_SIZE})")
+    parser.add_argument("--dry-run", action="store_true", help="create the templates and list the cells, run nothing")
+    parser.add_argument("--db", type=Path, default=DB_PATH)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    sweep = dict(DEFAULT_SWEEP)
+    if args.grid is not None:
+        sweep.update(json.loads(args.grid.read_text(encoding="utf-8")))
+    if sweep["runs"] < 1 or args.workers < 1 or args.batch_size < 1:
+        raise SystemExit("runs, --workers and --batch-size must be >= 1")
+
+    conn = sqlite3.connect(args.db, timeout=30)
+    conn.execute("PRAGMA foreign_keys = ON;")
+    conn.execute("PRAGMA busy_timeout = 30000;")
+    try:
+        conn.execute("PRAGMA journal_mode=WAL;")
+    except Exception:
+        pass
+
+    try:
+        cells = expand_grid(sweep, base_params(conn, sweep["base_encounter"]))
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+    # all templates first, in one transaction
+    plan = []
+    try:
+        for params in cells:
+            name = create_template(conn, sweep["base_encounter"], params)
+            plan.append({"params": params, "name": name, "hash": cell_hash(sweep["base_encounter"], params, sweep["master_seed"])})
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    for cell in plan:
+        cell["et_id"], cell["encounter"] = load_encounter(conn, cell["name"])
+
+    todo = []
+    for cell in plan:
+        state = cell_state(conn, cell["hash"])
+        complete = state is not None and state[0] == "complete" and state[2] >= sweep["runs"]
+        status = "complete" if complete else f"{state[2]}/{sweep['runs']} runs" if state else "pending"
+        print(f"{cell['hash']}  {cell_label(cell['params']):<80} {status}")
+        if not complete:
+            todo.append(cell)
+    print(f"Sweep {sweep['name']!r}: {len(plan)} cells, {len(plan) - len(todo)} complete, {len(todo)} to run.")
+    if args.dry_run or not todo:
+        conn.close()
+        return
+
+    # one pool for the whole sweep; every worker gets all encounters once
+    with ParallelRunner(run_cell_battle, tuple(c["encounter"] for c in todo), workers=args.workers) as runner:
+        for i, cell in enumerate(todo):
+            print(f"[{i + 1}/{len(todo)}] {cell['name']}")
+            batch_id = run_cell(conn, runner, i, cell, sweep, args.batch_size)
+            print(f"  batch {batch_id} complete")
+
+    conn.close()
+    print(f"✅ Sweep {sweep['name']!r} complete ({len(plan)} cells).")
+
+if __name__ == "__main__":
+    main()
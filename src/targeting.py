@@ -0,0 +1,176 @@
+"""
+Targeting policies, chosen per side by encounter_template.target_selection_pc / _mon.
+
+A policy is built once per battle (after initiative, so init_order is known) over the
+opposing side's CombatantStates and answers pick() without rescanning them:
+
+    bugbear_first   Bugbear, then Goblins by slot name, then the rest by slot name
+                    (fixed priority list + cursor past the dead: O(1) amortised)
+    lowest_hp       lowest current HP, ties to the earlier actor (lazy heap: O(log n))
+    threat          whoever has dealt the most damage so far, ties to the earlier actor (lazy heap)
+    random          uniform among the living (swap-remove list: O(1))
+    weighted_random random, weighted by damage taken + 1, so wounded targets draw more
+                    attacks (Fenwick tree: O(log n))
+
+The engine calls changed(st) after a hit, for the target (HP) and the attacker (damage
+dealt); states from the other side are ignored. Policies that draw random numbers use the
+battle's rng, so runs stay reproducible from their seed.
+"""
+
+import heapq
+
+# -------------------------
+# Policies
+# -------------------------
+
+class TargetPolicy:
+    def __init__(self, targets: list, rng):
+        self.targets = targets
+        self.rng = rng
+
+    def pick(self, attacker):
+        """
+        Return a living target, or None if the whole side is down.
+        """
+        raise NotImplementedError
+
+    def changed(self, st):
+        pass
+
+class BugbearFirst(TargetPolicy):
+    def __init__(self, targets: list, rng):
+        super().__init__(targets, rng)
+        # same priority as the vector engine's pc_target_rank
+        self.order = sorted(
+            targets,
+            key=lambda st: (st.spec.name != "Bugbear", not st.spec.name.startswith("Goblin_"), st.spec.name),
+        )
+        self.cursor = 0
+
+    def pick(self, attacker):
+        order = self.order
+        while self.cursor < len(order) and order[self.cursor].hp <= 0:
+            self.cursor += 1
+        return order[self.cursor] if self.cursor < len(order) else None
+
+class _LazyHeap(TargetPolicy):
+    """
+    Min-heap of (key, init_order, slot, state); stale entries are dropped on pick().
+    """
+
+    def __init__(self, targets: list, rng):
+        super().__init__(targets, rng)
+        self.slot = {id(st): i for i, st in enumerate(targets)}
+        self.heap = [(self.key(st), st.init_order, i, st) for i, st in enumerate(targets)]
+        heapq.heapify(self.heap)
+
+    def key(self, st):
+        raise NotImplementedError
+
+    def pick(self, attacker):
+        heap = self.heap
+        while heap:
+            key, _, _, st = heap[0]
+            if st.hp > 0 and key == self.key(st):
+                return st
+            heapq.heappop(heap)
+        return None
+
+    def changed(self, st):
+        i = self.slot.get(id(st))
+        if i is not None and st.hp > 0:
+            heapq.heappush(self.heap, (self.key(st), st.init_order, i, st))
+
+class LowestHp(_LazyHeap):
+    def key(self, st):
+        return st.hp
+
+class Threat(_LazyHeap):
+    def key(self, st):
+        return -st.damage_dealt
+
+class UniformRandom(TargetPolicy):
+    def __init__(self, targets: list, rng):
+        super().__init__(targets, rng)
+        self.alive = list(targets)
+        self.pos = {id(st): i for i, st in enumerate(self.alive)}
+
+    def pick(self, attacker):
+        if not self.alive:
+            return None
+        return self.alive[int(self.rng.random() * len(self.alive))]
+
+    def changed(self, st):
+        i = self.pos.get(id(st))
+        if i is None or st.hp > 0:
+            return
+        # swap-remove
+        last = self.alive.pop()
+        if last is not st:
+            self.alive[i] = last
+            self.pos[id(last)] = i
+        del self.pos[id(st)]
+
+class WeightedRandom(TargetPolicy):
+    def __init__(self, targets: list, rng):
+        super().__init__(targets, rng)
+        self.slot = {id(st): i for i, st in enumerate(targets)}
+        self.n = len(targets)
+        self.weight = [0] * self.n
+        self.tree = [0] * (self.n + 1)
+        for i, st in enumerate(targets):
+            self._set(i, self.weight_of(st))
+
+    @staticmethod
+    def weight_of(st) -> int:
+        return st.damage_taken + 1 if st.hp > 0 else 0
+
+    def _set(self, i: int, w: int):
+        delta = w - self.weight[i]
+        self.weight[i] = w
+        j = i + 1
+        while j <= self.n:
+            self.tree[j] += delta
+            j += j & -j
+
+    def pick(self, attacker):
+        total = 0
+        j = self.n
+        while j > 0:
+            total += self.tree[j]
+            j -= j & -j
+        if total <= 0:
+            return None
+        # descend the Fenwick tree to the slot holding the r-th unit of weight
+        r = int(self.rng.random() * total)
+        pos = 0
+        step = 1 << self.n.bit_length()
+        while step:
+            nxt = pos + step
+            if nxt <= self.n and self.tree[nxt] <= r:
+                pos = nxt
+                r -= self.tree[nxt]
+            step >>= 1
+        return self.targets[pos]
+
+    def changed(self, st):
+        i = self.slot.get(id(st))
+        if i is not None:
+            self._set(i, self.weight_of(st))
+
+POLICIES = {
+    "bugbear_first": BugbearFirst,
+    "lowest_hp": LowestHp,
+    "threat": Threat,
+    "random": UniformRandom,
+    "weighted_random": WeightedRandom,
+}
+
+def get_policy(name: str):
+    """
+    Policy class for an encounter_template.target_selection_* value.
+    """
+    try:
+        return POLICIES[name]
+    except KeyError:
+        raise ValueError(f"Unknown targeting policy {name!r}, choose from {', '.join(POLICIES)}") from None
@@ -0,0 +1,462 @@
+"""
+NumPy block simulator: K battles of one encounter at a time, as array operations.
+
+Same rules and fixed targeting as combat_engine.simulate_battle (PCs: Bugbear first, then
+lowest goblin; monsters: lowest HP, ties to the earlier actor), but every initiative roll,
+attack d20, crit check and damage sum is done for the whole block at once, with per-battle
+alive masks. The random streams differ from the scalar engine, so results match in
+distribution, not run by run (see equivalence_check).
+
+    python src/vector_engine.py --check --runs 20000
+"""
+
+import argparse
+import math
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from combat_engine import Encounter, simulate_battle
+from dice import parse_dice
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DB_PATH = PROJECT_ROOT / "db" / "dnd_initiative_work.sqlite"
+
+ENCOUNTER_NAME = "L3 Trio vs 4 Goblins + 1 Bugbear"
+BLOCK_SIZE = 100_000
+
+WINNER_TIMEOUT, WINNER_PARTY, WINNER_MONSTERS = 0, 1, 2
+WINNER_NAMES = ("timeout", "party", "monsters")
+
+HUNTERS_MARK_DICE = parse_dice("1d6")
+OPENING_BURST_DICE = parse_dice("2d6")
+
+# Per-participant output columns, each (K, C)
+PARTICIPANT_FIELDS = (
+    "hp_end", "init_roll_d20", "init_total", "init_order",
+    "damage_dealt", "damage_taken", "attacks", "hits", "crits",
+    "opening_burst_triggered", "hunters_mark_cast", "hunters_mark_bonus_damage",
+)
+
+# Per-run output columns, each (K,)
+RUN_FIELDS = (
+    "winner", "party_victory", "rounds_taken", "total_damage_party", "total_damage_monsters",
+    "bugbear_killed_round",  # 0 = never killed
+    "damage_party_before_first_monster_turn",
+    "monsters_downed_before_first_monster_turn",
+    "party_downed_before_first_player_turn",
+)
+
+# -------------------------
+# Static encounter arrays
+# -------------------------
+
+class EncounterArrays:
+    """
+    Encounter specs as (C,) arrays, built once per encounter.
+    """
+
+    def __init__(self, encounter: Encounter):
+        cs = encounter.combatants
+        if (encounter.target_selection_pc, encounter.target_selection_mon) != ("bugbear_first", "lowest_hp"):
+            raise ValueError("vector engine only supports bugbear_first / lowest_hp targeting, got "
+                             f"{encounter.target_selection_pc} / {encounter.target_selection_mon}")
+        if encounter.acts_first:
+            raise ValueError("vector engine does not support acts_first")
+        for c in cs:
+            if c.quantity > 1:
+                raise ValueError(f"vector engine does not support grouped members, {c.name} has quantity {c.quantity}")
+            if not c.damage.is_simple:
+                raise ValueError(f"vector engine only supports plain NdS+M damage, got {c.damage!r} for {c.name}")
+
+        self.encounter = encounter
+        self.n = len(cs)
+        self.round_cap = encounter.round_cap
+        self.is_party = np.array([c.side == "party" for c in cs])
+        self.is_monster = ~self.is_party
+        self.ac = np.array([c.ac for c in cs], dtype=np.int64)
+        self.hp_start = np.array([c.hp_start for c in cs], dtype=np.int64)
+        self.init_mod = np.array([c.init_mod for c in cs], dtype=np.int64)
+        self.attack_bonus = np.array([c.attack_bonus for c in cs], dtype=np.int64)
+        self.crit_min = np.array([c.crit_min for c in cs], dtype=np.int64)
+        self.dice_n = np.array([c.damage.n for c in cs], dtype=np.int64)
+        self.dice_sides = np.array([c.damage.sides for c in cs], dtype=np.int64)
+        self.dice_mod = np.array([c.damage.mod for c in cs], dtype=np.int64)
+        self.has_hunters_mark = np.array([c.has_hunters_mark for c in cs])
+        self.has_assassinate_advantage = np.array([c.has_assassinate_advantage for c in cs])
+        self.has_opening_burst = np.array([c.has_opening_burst for c in cs])
+
+        names = [c.name for c in cs]
+        self.bugbear_index = names.index("Bugbear") if "Bugbear" in names else -1
+
+        # PC targeting as a fixed priority: Bugbear, then goblins by slot name, then anything else
+        big = 10 * self.n
+        rank = np.full(self.n, big, dtype=np.int64)
+        monster_names = sorted(
+            (c.name for c in cs if c.side == "monsters"),
+            key=lambda name: (name != "Bugbear", not name.startswith("Goblin_"), name),
+        )
+        for r, name in enumerate(monster_names):
+            rank[names.index(name)] = r
+        self.pc_target_rank = rank
+        self.no_target = big
+
+# -------------------------
+# Helpers
+# -------------------------
+
+def _roll_dice(gen: np.random.Generator, n: np.ndarray, sides: np.ndarray, mod: np.ndarray) -> np.ndarray:
+    """
+    Row-wise sum of n[i] dice with sides[i] faces, plus mod[i].
+    """
+    max_n = int(n.max()) if len(n) else 0
+    if max_n == 0:
+        return mod.copy()
+    rolls = gen.integers(1, sides[:, None] + 1, size=(len(n), max_n))
+    rolls[np.arange(max_n)[None, :] >= n[:, None]] = 0
+    return rolls.sum(axis=1) + mod
+
+def _empty_block(k: int, c: int) -> dict:
+    block = {f: np.zeros((k, c), dtype=np.int64) for f in PARTICIPANT_FIELDS}
+    block.update({f: np.zeros(k, dtype=np.int64) for f in RUN_FIELDS})
+    return block
+
+# -------------------------
+# One block of K battles
+# -------------------------
+
+def simulate_block(arrays: EncounterArrays, k: int, gen: np.random.Generator) -> dict:
+    """
+    Simulate k battles. Returns a dict of arrays: PARTICIPANT_FIELDS are (k, C) in
+    Encounter.combatants order, RUN_FIELDS are (k,).
+    """
+    c = arrays.n
+    out = _empty_block(k, c)
+    rows = np.arange(k)
+
+    # -------------------------
+    # Initiative: init_total desc, then init_mod desc, then random tie-break
+    # -------------------------
+    d20 = gen.integers(1, 21, size=(k, c))
+    init_total = d20 + arrays.init_mod
+    tie = gen.random((k, c))
+    init_mod = np.broadcast_to(arrays.init_mod, (k, c))
+    order = np.lexsort((tie, -init_mod, -init_total), axis=1)  # (k, C): combatant index per position
+    init_order = np.empty((k, c), dtype=np.int64)
+    init_order[rows[:, None], order] = np.arange(1, c + 1)
+
+    out["init_roll_d20"][:] = d20
+    out["init_total"][:] = init_total
+    out["init_order"][:] = init_order
+
+    # -------------------------
+    # Per-battle state
+    # -------------------------
+    hp = np.broadcast_to(arrays.hp_start, (k, c)).copy()
+    damage_dealt = out["damage_dealt"]
+    damage_taken = out["damage_taken"]
+    attacks = out["attacks"]
+    hits = out["hits"]
+    crits = out["crits"]
+    hm_cast = out["hunters_mark_cast"]
+    hm_bonus = out["hunters_mark_bonus_damage"]
+    burst_triggered = out["opening_burst_triggered"]
+
+    party_alive = np.full(k, int(arrays.is_party.sum()))
+    monsters_alive = np.full(k, int(arrays.is_monster.sum()))
+    marked_target = np.full(k, -1)
+    burst_available = np.ones(k, dtype=bool)
+    first_monster_acted = np.zeros(k, dtype=bool)
+    first_player_acted = np.zeros(k, dtype=bool)
+
+    winner = out["winner"]
+    rounds_taken = out["rounds_taken"]
+    bugbear_killed_round = out["bugbear_killed_round"]
+    dmg_before_monster = out["damage_party_before_first_monster_turn"]
+    mons_downed_before = out["monsters_downed_before_first_monster_turn"]
+    party_downed_before = out["party_downed_before_first_player_turn"]
+
+    done = np.zeros(k, dtype=bool)
+    pc_rank = arrays.pc_target_rank
+    # monster targeting key: hp first, then init_order
+    order_scale = c + 1
+
+    for round_no in range(1, arrays.round_cap + 1):
+        live = ~done
+        if not live.any():
+            break
+        rounds_taken[live] = round_no
+
+        for pos in range(c):
+            actor_all = order[:, pos]
+            idx = np.nonzero(~done & (hp[rows, actor_all] > 0))[0]
+            if len(idx) == 0:
+                continue
+            actor = actor_all[idx]
+            actor_party = arrays.is_party[actor]
+
+            first_monster_acted[idx[~actor_party]] = True
+            first_player_acted[idx[actor_party]] = True
+
+            hp_i = hp[idx]
+            alive_i = hp_i > 0
+
+            # PC target: highest-priority alive monster
+            pc_keys = np.where(alive_i & arrays.is_monster, pc_rank, arrays.no_target)
+            pc_target = pc_keys.argmin(axis=1)
+
+            # Ranger casts Hunter's Mark on its first turn of round 1
+            if round_no == 1:
+                casts = arrays.has_hunters_mark[actor] & (hm_cast[idx, actor] == 0)
+                if casts.any():
+                    marked_target[idx[casts]] = pc_target[casts]
+                    hm_cast[idx[casts], actor[casts]] = 1
+
+            # Monster target: lowest current HP PC, tie -> earlier init_order
+            mon_keys = np.where(alive_i & arrays.is_party, hp_i * order_scale + init_order[idx], np.iinfo(np.int64).max)
+            mon_target = mon_keys.argmin(axis=1)
+
+            target = np.where(actor_party, pc_target, mon_target)
+
+            # Attack roll
+            attacks[idx, actor] += 1
+            roll = gen.integers(1, 21, size=len(idx))
+
+            # Assassinate Advantage: round 1, target has not taken a turn yet
+            used_adv = np.zeros(len(idx), dtype=bool)
+            if round_no == 1:
+                used_adv = arrays.has_assassinate_advantage[actor] & (init_order[idx, target] > init_order[idx, actor])
+                if used_adv.any():
+                    second = gen.integers(1, 21, size=len(idx))
+                    roll = np.where(used_adv, np.maximum(roll, second), roll)
+
+            hit = (roll + arrays.attack_bonus[actor]) >= arrays.ac[target]
+            crit = roll >= arrays.crit_min[actor]
+
+            h = np.nonzero(hit)[0]
+            if len(h):
+                hi, ha, ht, hc = idx[h], actor[h], target[h], crit[h]
+                hits[hi, ha] += 1
+                crits[hi, ha] += hc
+
+                dmg = _roll_dice(gen, arrays.dice_n[ha] * (1 + hc), arrays.dice_sides[ha], arrays.dice_mod[ha])
+
+                # Hunter's Mark bonus damage (crit doubles the 1d6)
+                hm_hit = arrays.has_hunters_mark[ha] & (marked_target[hi] == ht)
+                if hm_hit.any():
+                    m = np.nonzero(hm_hit)[0]
+                    n_hm = np.full(len(m), HUNTERS_MARK_DICE.n) * (1 + hc[m])
+                    hm = _roll_dice(gen, n_hm, np.full(len(m), HUNTERS_MARK_DICE.sides), np.full(len(m), HUNTERS_MARK_DICE.mod))
+                    dmg[m] += hm
+                    hm_bonus[hi[m], ha[m]] += hm
+
+                # Opening burst (+2d6 once, never crits) on an advantaged hit
+                burst = arrays.has_opening_burst[ha] & burst_available[hi] & used_adv[h]
+                if burst.any():
+                    b = np.nonzero(burst)[0]
+                    dmg[b] += _roll_dice(
+                        gen,
+                        np.full(len(b), OPENING_BURST_DICE.n),
+                        np.full(len(b), OPENING_BURST_DICE.sides),
+                        np.full(len(b), OPENING_BURST_DICE.mod),
+                    )
+                    burst_triggered[hi[b], ha[b]] = 1
+                    burst_available[hi[b]] = False
+
+                # Apply damage
+                before = hp[hi, ht]
+                after = np.maximum(0, before - dmg)
+                hp[hi, ht] = after
+                damage_dealt[hi, ha] += dmg
+                damage_taken[hi, ht] += dmg
+                killed = (before > 0) & (after == 0)
+
+                target_party = arrays.is_party[ht]
+                party_alive[hi[killed & target_party]] -= 1
+                monsters_alive[hi[killed & ~target_party]] -= 1
+
+                # First-round tracking
+                party_actor = arrays.is_party[ha]
+                pre = party_actor & ~first_monster_acted[hi]
+                dmg_before_monster[hi[pre]] += dmg[pre]
+                mons_downed_before[hi[pre & killed & ~target_party]] += 1
+                pre_p = ~party_actor & ~first_player_acted[hi]
+                party_downed_before[hi[pre_p & killed & target_party]] += 1
+
+                # Track bugbear death
+                if arrays.bugbear_index >= 0:
+                    bb = (ht == arrays.bugbear_index) & (after == 0) & (bugbear_killed_round[hi] == 0)
+                    bugbear_killed_round[hi[bb]] = round_no
+
+            # Check end-of-fight mid-round
+            lost = party_alive[idx] == 0
+            won = ~lost & (monsters_alive[idx] == 0)
+            winner[idx[lost]] = WINNER_MONSTERS
+            winner[idx[won]] = WINNER_PARTY
+            done[idx[lost | won]] = True
+
+    out["hp_end"][:] = hp
+    out["party_victory"][:] = winner == WINNER_PARTY
+    out["total_damage_party"][:] = damage_dealt[:, arrays.is_party].sum(axis=1)
+    out["total_damage_monsters"][:] = damage_dealt[:, arrays.is_monster].sum(axis=1)
+    return out
+
+def simulate_many(encounter: Encounter, runs: int, seed: int | np.random.Generator, block_size: int = BLOCK_SIZE):
+    """
+    Yield result blocks covering `runs` battles, all drawn from one seeded PCG64 stream.
+    `seed` is an int, or a Generator to keep drawing from (simulate_combat.py passes one
+    across its --check-every chunks so the chunks do not repeat each other).
+    """
+    arrays = EncounterArrays(encounter)
+    gen = np.random.default_rng(seed)
+    remaining = runs
+    while remaining > 0:
+        k = min(block_size, remaining)
+        yield simulate_block(arrays, k, gen)
+        remaining -= k
+
+# -------------------------
+# Block -> table rows (same layout as simulate_combat.result_rows)
+# -------------------------
+
+def block_rows(encounter: Encounter, block: dict):
+    """
+    Yield (run_values, participant_rows, first_round_row) per battle in the block.
+    seed is None: vector runs are reproduced from the block seed, not per run.
+    """
+    cs = encounter.combatants
+    cols = {f: block[f].tolist() for f in PARTICIPANT_FIELDS}
+    run_cols = {f: block[f].tolist() for f in RUN_FIELDS}
+
+    for i in range(len(run_cols["winner"])):
+        participant_rows = []
+        for j, c in enumerate(cs):
+            hp_end = cols["hp_end"][i][j]
+            participant_rows.append((
+                c.side, c.name, c.template_type, c.pc_id, c.monster_key,
+                c.hp_start, hp_end, 1 if hp_end > 0 else 0,
+                cols["init_roll_d20"][i][j], c.init_mod, cols["init_total"][i][j], cols["init_order"][i][j],
+                cols["damage_dealt"][i][j], cols["damage_taken"][i][j], cols["attacks"][i][j],
+                cols["hits"][i][j], cols["crits"][i][j],
+                cols["opening_burst_triggered"][i][j], cols["hunters_mark_cast"][i][j],
+                cols["hunters_mark_bonus_damage"][i][j],
+            ))
+        bugbear_round = run_cols["bugbear_killed_round"][i]
+        run_values = (
+            None,
+            run_cols["party_victory"][i],
+            WINNER_NAMES[run_cols["winner"][i]],
+            run_cols["rounds_taken"][i],
+            run_cols["total_damage_party"][i],
+            run_cols["total_damage_monsters"][i],
+            bugbear_round if bugbear_round > 0 else None,
+        )
+        first_round_row = (
+            run_cols["damage_party_before_first_monster_turn"][i],
+            run_cols["monsters_downed_before_first_monster_turn"][i],
+            run_cols["party_downed_before_first_player_turn"][i],
+        )
+        yield run_values, participant_rows, first_round_row
+
+# -------------------------
+# Statistical equivalence check against the scalar engine
+# -------------------------
+
+def _scalar_block(encounter: Encounter, runs: int, seed: int) -> dict:
+    c = len(encounter.combatants)
+    out = _empty_block(runs, c)
+    rng = random.Random(seed)
+    for i in range(runs):
+        r = simulate_battle(encounter, rng)
+        out["winner"][i] = WINNER_NAMES.index(r.winner)
+        out["party_victory"][i] = r.party_victory
+        out["rounds_taken"][i] = r.rounds_taken
+        out["total_damage_party"][i] = r.total_damage_party
+        out["total_damage_monsters"][i] = r.total_damage_monsters
+        out["bugbear_killed_round"][i] = r.bugbear_killed_round or 0
+        out["damage_party_before_first_monster_turn"][i] = r.damage_party_before_first_monster_turn
+        out["monsters_downed_before_first_monster_turn"][i] = r.monsters_downed_before_first_monster_turn
+        out["party_downed_before_first_player_turn"][i] = r.party_downed_before_first_player_turn
+        for j, p in enumerate(r.participants):
+            for f in PARTICIPANT_FIELDS:
+                out[f][i, j] = getattr(p, f)
+    return out
+
+def _welch_z(a: np.ndarray, b: np.ndarray) -> float:
+    a = a.astype(float)
+    b = b.astype(float)
+    se = math.sqrt(a.var(ddof=1) / len(a) + b.var(ddof=1) / len(b))
+    if se == 0:
+        return 0.0 if a.mean() == b.mean() else math.inf
+    return (a.mean() - b.mean()) / se
+
+def equivalence_check(encounter: Encounter, runs: int = 20_000, seed: int = 1, z_limit: float = 4.0):
+    """
+    Run both engines and compare the means of every run field and every participant field
+    with a Welch z statistic. Returns (ok, report) where report is a list of
+    (metric, scalar_mean, vector_mean, z). z_limit=4 keeps the family-wise false alarm
+    rate low across the ~100 metrics.
+    """
+    scalar = _scalar_block(encounter, runs, seed)
+    vector = simulate_block(EncounterArrays(encounter), runs, np.random.default_rng(seed))
+
+    report = []
+    for f in RUN_FIELDS:
+        if f == "winner":
+            continue
+        report.append((f, scalar[f].mean(), vector[f].mean(), _welch_z(scalar[f], vector[f])))
+    for j, c in enumerate(encounter.combatants):
+        for f in PARTICIPANT_FIELDS:
+            report.append((f"{c.name}.{f}", scalar[f][:, j].mean(), vector[f][:, j].mean(),
+                           _welch_z(scalar[f][:, j], vector[f][:, j])))
+
+    ok = all(abs(z) <= z_limit for _, _, _, z in report)
+    return ok, report
+
+# -------------------------
+# CLI
+# -------------------------
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Vectorized block simulator (NumPy).")
+    parser.add_argument("--runs", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--block-size", type=int, default=BLOCK_SIZE)
+    parser.add_argument("--check", action="store_true", help="compare against the scalar engine instead")
+    parser.add_argument("--encounter", default=ENCOUNTER_NAME)
+    parser.add_argument("--db", type=Path, default=DB_PATH)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    import sqlite3
+    import time
+
+    from encounter_loader import load_encounter
+
+    args = parse_args(argv)
+    conn = sqlite3.connect(args.db, timeout=30)
+    _, encounter = load_encounter(conn, args.encounter)
+    conn.close()
+
+    if args.check:
+        ok, report = equivalence_check(encounter, runs=args.runs, seed=args.seed)
+        for metric, s_mean, v_mean, z in report:
+            flag = "  <-- differs" if abs(z) > 4.0 else ""
+            print(f"{metric:<55}{s_mean:>10.4f}{v_mean:>10.4f}{z:>8.2f}{flag}")
+        print("✅ vector engine matches scalar engine" if ok else "❌ vector engine differs from scalar engine")
+        sys.exit(0 if ok else 1)
+
+    t0 = time.perf_counter()
+    wins = 0
+    rounds = 0
+    for block in simulate_many(encounter, args.runs, args.seed, args.block_size):
+        wins += int(block["party_victory"].sum())
+        rounds += int(block["rounds_taken"].sum())
+    dt = time.perf_counter() - t0
+    print(f"{args.runs} runs in {dt:.2f}s ({args.runs / dt:,.0f} runs/s): "
+          f"party win rate {wins / args.runs:.4f}, avg rounds {rounds / args.runs:.3f}")
+
+if __name__ == "__main__":
+    main()